@@ -0,0 +1,22 @@
+"""
+Shared-secret check for operator endpoints
+"""
+import hmac
+
+from fastapi import HTTPException, Request
+
+from config import ADMIN_TOKEN
+
+
+def require_admin(request: Request):
+    """
+    Reject requests without the admin token
+
+    Raises:
+        HTTPException: 404 when no admin token is configured, 403 when it does not match
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,132 @@
+"""
+Token-bucket admission control keyed by wallet address and client IP
+"""
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Sequence
+
+from fastapi import HTTPException
+
+from config import (
+    RATE_LIMIT_ENABLED,
+    RATE_LIMITS,
+    RATE_LIMIT_JOB_TYPES,
+    RATE_LIMIT_MAX_BUCKETS,
+)
+
+# Idle buckets examined for eviction per check; keeps each check O(1)
+EVICTIONS_PER_CHECK = 2
+
+
+class RateLimiter:
+    """
+    Token buckets in an LRU map
+
+    Each bucket is [tokens, updated_at, full_at]. A bucket that has been
+    idle until `full_at` has refilled completely, so dropping it is
+    indistinguishable from keeping it; a few such buckets are evicted from
+    the cold end on every check. `max_buckets` is a hard cap on top.
+    """
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def check(self, key: Hashable, rate: float, burst: float, now: Optional[float] = None) -> float:
+        """
+        Take one token from a bucket
+
+        Returns:
+            0 if admitted, otherwise seconds until a token is available
+        """
+        return self.check_all((key,), rate, burst, now)
+
+    def check_all(
+        self,
+        keys: Sequence[Hashable],
+        rate: float,
+        burst: float,
+        now: Optional[float] = None,
+    ) -> float:
+        """
+        Take one token from every bucket in `keys`, or from none of them
+
+        Returns:
+            0 if admitted, otherwise seconds until every bucket has a token
+        """
+        if now is None:
+            now = time.monotonic()
+        buckets = self._buckets
+
+        held = []
+        for key in keys:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [burst, now, now]
+            else:
+                buckets.move_to_end(key)
+                tokens = bucket[0] + (now - bucket[1]) * rate
+                bucket[0] = burst if tokens > burst else tokens
+                bucket[1] = now
+            held.append(bucket)
+
+        lowest = min(bucket[0] for bucket in held)
+        admitted = lowest >= 1
+        for bucket in held:
+            if admitted:
+                bucket[0] -= 1
+            bucket[2] = now + (burst - bucket[0]) / rate
+
+        for _ in range(EVICTIONS_PER_CHECK):
+            oldest = next(iter(buckets.values()))
+            if oldest[2] > now and len(buckets) <= self.max_buckets:
+                break
+            buckets.popitem(last=False)
+
+        return 0.0 if admitted else (1 - lowest) / rate
+
+
+def check_rate_limit(
+    endpoint: str,
+    wallet: Optional[str] = None,
+    client_ip: Optional[str] = None,
+    job_type: Optional[str] = None,
+):
+    """
+    Admit a request or reject it with 429
+
+    Both the wallet and the client IP must have a token, and neither is
+    spent unless both do; a job type override replaces the endpoint's limit.
+
+    Raises:
+        HTTPException: 429 with Retry-After when a bucket is empty
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    rate, burst = RATE_LIMIT_JOB_TYPES.get(job_type) or RATE_LIMITS[endpoint]
+    scope = f"{endpoint}:{job_type}" if job_type in RATE_LIMIT_JOB_TYPES else endpoint
+
+    keys = []
+    if wallet:
+        # Claimed, not yet verified: until the payment signature is checked a
+        # client can rotate wallets to dodge this bucket, so only the IP
+        # bucket is a hard limit here
+        keys.append((scope, "wallet", wallet.lower()))
+    if client_ip:
+        keys.append((scope, "ip", client_ip))
+    if not keys:
+        return
+    wait = rate_limiter.check_all(keys, rate, burst)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, int(wait + 0.999)))},
+        )
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
@@ -32,6 +32,9 @@ PRICING = {
     "orderbook": 150000,        # 0.0015 MOVE
     "calculator": 100000,       # 0.001 MOVE
     "activity": 150000,         # 0.0015 MOVE
+    "backtest": 400000,         # 0.004 MOVE
+    "transform": 50000,         # 0.0005 MOVE
+    "pipeline": 0,              # billed once, at the sum of its stage prices
     "social_post": 500000,      # 0.005 MOVE
     "social_view": 200000,      # 0.002 MOVE
     "social_comment": 100000,   # 0.001 MOVE
@@ -48,3 +51,124 @@ PING_TIMEOUT = 5  # seconds per ping
 
 # Aptos transaction confirmation timeout
 TRANSACTION_CONFIRMATION_TIMEOUT = 30  # seconds
+TRANSACTION_POLL_INTERVAL = float(os.getenv("TRANSACTION_POLL_INTERVAL", "0.5"))  # seconds between lookups
+
+# Sentiment Configuration
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "500000"))  # cached post scores
+SENTIMENT_HALF_LIFE_SECONDS = int(os.getenv("SENTIMENT_HALF_LIFE", "21600"))  # 6 hours
+SENTIMENT_BULLISH_THRESHOLD = 0.05  # scores above are bullish
+SENTIMENT_BEARISH_THRESHOLD = -0.05  # scores below are bearish
+MAX_SENTIMENT_POSTS = 10000  # posts per job request
+SENTIMENT_BATCH_SIZE = 2000  # posts scored per batch
+
+# Activity Configuration
+ACTIVITY_TRADES_PER_MARKET = int(os.getenv("ACTIVITY_TRADES_PER_MARKET", "2000"))  # ring buffer size
+ACTIVITY_MAX_MARKETS = int(os.getenv("ACTIVITY_MAX_MARKETS", "1000"))  # least recently active evicted
+ACTIVITY_GLOBAL_INDEX_SIZE = int(os.getenv("ACTIVITY_GLOBAL_INDEX_SIZE", "500000"))
+ACTIVITY_POLL_INTERVAL = 0.25  # seconds between tail polls
+MAX_ACTIVITY_STREAM_SECONDS = 300  # longest paid tail
+MAX_ACTIVITY_TRADES = 1000  # trades per backfill
+
+# Rollup Configuration
+ROLLUP_WINDOW_SECONDS = 86400  # 24h rolling window
+ROLLUP_BUCKET_SECONDS = 300  # 5 minute buckets
+MAX_ROLLUP_TICKERS = 5000  # tickers per bulk request
+
+# Market Data Ingest Configuration
+# Upstream market API polled for trades and order books; empty disables ingest,
+# and with it the activity, market_data and backtest jobs that read what it stores
+MARKET_API_URL = os.getenv("MARKET_API_URL", "https://api.elections.kalshi.com/trade-api/v2")
+INGESTED_JOB_TYPES = ("activity", "market_data", "backtest")
+INGEST_INTERVAL = float(os.getenv("INGEST_INTERVAL", "2"))  # seconds between polls
+INGEST_BACKFILL_SECONDS = 300  # trades fetched on the first poll
+INGEST_PAGE_SIZE = 1000  # trades per upstream page
+INGEST_MAX_PAGES = 20  # pages per poll; older trades past this are skipped
+INGEST_MAX_ORDERBOOKS = 50  # order books refreshed per poll, most active markets first
+INGEST_MAX_CONNECTIONS = 8
+INGEST_TIMEOUT = 10  # seconds per upstream request
+
+# Historical Data Configuration
+HISTORY_DIR = os.getenv("HISTORY_DIR", "data/history")
+HISTORY_SEGMENT_ROWS = int(os.getenv("HISTORY_SEGMENT_ROWS", "1000000"))  # rows buffered before sealing
+HISTORY_COMPACT_TARGET_ROWS = int(os.getenv("HISTORY_COMPACT_TARGET_ROWS", "8000000"))
+HISTORY_COMPACT_EVERY_SEGMENTS = int(os.getenv("HISTORY_COMPACT_EVERY_SEGMENTS", "8"))  # seals between compactions
+HISTORY_CANDLE_SECONDS = 60  # candle width written from ingested trades
+
+# Backtest Configuration
+MAX_BACKTEST_MARKETS = 5000  # markets per backtest
+BACKTEST_BATCH_MARKETS = 250  # markets simulated between streamed results
+
+# WebSocket Configuration
+WS_STREAM_WINDOW = 64  # frames a stream may send before the client acks
+WS_MAX_STREAMS = 256  # concurrent job streams per connection
+WS_SEND_QUEUE_SIZE = 1024  # frames buffered for the socket writer
+
+# Async Job Configuration
+ASYNC_JOB_CONCURRENCY = int(os.getenv("ASYNC_JOB_CONCURRENCY", "16"))  # background jobs run at once
+RESULT_TTL_SECONDS = int(os.getenv("RESULT_TTL_SECONDS", "3600"))  # stored output kept after completion
+RESULT_MAX_JOBS = 10000  # stored results, oldest evicted first
+RESULT_MAX_BYTES_PER_JOB = 10 * 1024 * 1024  # output beyond this stops the job
+RESULT_MAX_TOTAL_BYTES = 256 * 1024 * 1024
+RESULT_DEFAULT_PAGE_SIZE = 100  # chunks per result page
+RESULT_MAX_PAGE_SIZE = 1000
+
+# Pipeline Configuration
+PIPELINE_MAX_STAGES = 8
+PIPELINE_BUFFER_SIZE = 64  # chunks buffered between stages before upstream blocks
+
+# Rate Limit Configuration
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMITS = {  # endpoint: (requests per second, burst), per wallet and per client IP
+    "request": (5.0, 20),
+    "verify_payment": (2.0, 10),
+    "execute": (10.0, 30),
+    "results": (20.0, 60),
+}
+RATE_LIMIT_JOB_TYPES = {  # job type overrides for the request endpoint
+    "backtest": (0.5, 5),
+    "pipeline": (1.0, 5),
+}
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "200000"))
+
+# Metrics Configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_LATENCY_BUCKETS = (  # seconds
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+METRICS_LOOP_LAG_INTERVAL = 0.5  # seconds between event loop lag probes
+
+# Admin Configuration
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # X-Admin-Token for /admin endpoints; empty disables them
+
+# Profiling and Tracing Configuration
+PROFILE_MAX_SECONDS = 60  # longest on-demand profile
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))  # fraction of jobs traced; 0 is off
+TRACE_MAX_TRACES = 1000  # most recent traces kept for dumping
+
+# Startup Configuration
+PRELOAD_ON_STARTUP = os.getenv("PRELOAD_ON_STARTUP", "true").lower() == "true"  # import job modules after startup
+CONNECTIVITY_CHECK_INTERVAL = 60  # seconds between background RPC checks
+
+# Audit Log Configuration
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "data/audit")
+AUDIT_SEGMENT_RECORDS = int(os.getenv("AUDIT_SEGMENT_RECORDS", "262144"))  # 40 MiB of 160-byte records
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "true").lower() == "true"  # fsync every group commit
+AUDIT_INDEX_MAX_LOAD = 0.7  # index files are rebuilt larger beyond this fill
+
+# Job Budget Configuration
+JOB_MAX_SECONDS = int(os.getenv("JOB_MAX_SECONDS", "300"))  # wall clock per run, queue wait excluded
+JOB_MAX_OUTPUT_BYTES = int(os.getenv("JOB_MAX_OUTPUT_BYTES", str(32 * 1024 * 1024)))  # streamed per run
+JOB_BUDGETS = {  # job type overrides: (max seconds, max output bytes)
+    "ping": (MAX_PING_COUNT * (PING_TIMEOUT + 1) + 10, 64 * 1024),
+    "activity": (MAX_ACTIVITY_STREAM_SECONDS + 30, JOB_MAX_OUTPUT_BYTES),
+}
+JOB_POOL_WORKERS = int(os.getenv("JOB_POOL_WORKERS", "2"))  # processes for CPU-bound job batches
+JOB_POOL_CPU_SECONDS = 10  # CPU time per pooled task
+JOB_POOL_MEMORY_BYTES = int(os.getenv("JOB_POOL_MEMORY_BYTES", str(2 * 1024 ** 3)))  # address space per worker
+
+# Drain and Handoff Configuration
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "30"))  # running streams get this long on shutdown
+DRAIN_RETRY_AFTER_SECONDS = 5  # Retry-After on job requests turned away while draining
+HANDOFF_DIR = os.getenv("HANDOFF_DIR", "data/handoff")  # snapshots of unexecuted jobs between processes
+HANDOFF_POLL_INTERVAL = 2.0  # seconds between checks for snapshots of exiting processes
@@ -0,0 +1,19 @@
+"""
+pytest setup for the test scripts
+
+Data directories point at a scratch directory before any test module
+imports config, so a full run never writes into the repo. Settings bound
+at import (admin token, rate limiting, the app's audit log) are patched
+by the tests that need them, which works whichever file imported config
+first.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix="x402-pytest-")
+atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+
+for name, path in (("HISTORY_DIR", "history"), ("AUDIT_LOG_DIR", "audit"), ("HANDOFF_DIR", "handoff")):
+    os.environ[name] = os.path.join(DATA_DIR, path)
@@ -0,0 +1,105 @@
+"""
+Activity job implementation
+"""
+import asyncio
+import json
+import time
+from typing import AsyncIterator
+from decimal import Decimal
+from .base import Job
+from config import (
+    PRICING,
+    TOKEN_DECIMALS_MULTIPLIER,
+    ACTIVITY_POLL_INTERVAL,
+    MAX_ACTIVITY_STREAM_SECONDS,
+    MAX_ACTIVITY_TRADES,
+)
+from marketdata.activity import activity_store
+
+# Global index entries scanned per tail poll
+TAIL_BATCH = 5000
+
+
+class ActivityJob(Job):
+    """Snapshot recent trades for markets, then tail new activity"""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "activity"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        # Return price in MOVE tokens (with 8 decimals)
+        return Decimal(PRICING.get("activity", 150000)) / Decimal(TOKEN_DECIMALS_MULTIPLIER)
+
+    def validate_params(self) -> tuple[bool, str]:
+        """Validate activity parameters"""
+        markets = self.params.get("markets")
+        since = self.params.get("since")
+        limit = self.params.get("limit", 50)
+        window = self.params.get("window", 3600)
+        duration = self.params.get("duration", 60)
+
+        if not isinstance(markets, list) or not markets:
+            return False, "Missing 'markets' parameter"
+
+        if not all(isinstance(ticker, str) and ticker for ticker in markets):
+            return False, "'markets' must be a list of tickers"
+
+        if not isinstance(limit, int) or limit < 0 or limit > MAX_ACTIVITY_TRADES:
+            return False, f"Limit must be between 0 and {MAX_ACTIVITY_TRADES}"
+
+        if since is not None and (isinstance(since, bool) or not isinstance(since, (int, float))):
+            return False, "since must be a number"
+
+        if not isinstance(window, (int, float)) or window <= 0:
+            return False, "Window must be a positive number of seconds"
+
+        if not isinstance(duration, (int, float)) or duration < 0 \
+                or duration > MAX_ACTIVITY_STREAM_SECONDS:
+            return False, f"Duration must be between 0 and {MAX_ACTIVITY_STREAM_SECONDS} seconds"
+
+        return True, ""
+
+    def _snapshot(self, ticker: str, now: float) -> dict:
+        since = self.params.get("since")
+        limit = self.params.get("limit", 50)
+        window = self.params.get("window", 3600)
+        if since is not None:
+            trades = activity_store.trades_since(ticker, since, limit)
+        else:
+            trades = activity_store.last_trades(ticker, limit)
+        return {
+            "market_ticker": ticker,
+            "trades": trades,
+            "window": activity_store.window(ticker, now - window),
+        }
+
+    async def execute(self) -> AsyncIterator[str]:
+        """Stream a snapshot per market, then new trades as they arrive"""
+        markets = self.params["markets"]
+        window = self.params.get("window", 3600)
+        duration = self.params.get("duration", 60)
+
+        # Start tailing from the current end so no trade is missed or repeated
+        cursor = activity_store.sequence
+        now = time.time()
+        for ticker in markets:
+            yield json.dumps({"event": "snapshot", **self._snapshot(ticker, now)}) + "\n"
+
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            if cursor >= activity_store.sequence:
+                await asyncio.sleep(ACTIVITY_POLL_INTERVAL)
+                continue
+            cursor, trades = activity_store.read_from(cursor, TAIL_BATCH, markets)
+            if not trades:
+                await asyncio.sleep(0)
+                continue
+            now = time.time()
+            touched = {trade["market_ticker"] for trade in trades}
+            yield json.dumps({
+                "event": "trades",
+                "trades": trades,
+                "windows": [activity_store.window(t, now - window) for t in touched],
+            }) + "\n"
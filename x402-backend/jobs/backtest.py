@@ -0,0 +1,136 @@
+"""
+Backtest job implementation
+"""
+import json
+import time
+from typing import AsyncIterator, Dict, List
+from decimal import Decimal
+import numpy as np
+from .base import Job
+from .workers import worker_pool
+from config import (
+    PRICING,
+    TOKEN_DECIMALS_MULTIPLIER,
+    MAX_BACKTEST_MARKETS,
+    BACKTEST_BATCH_MARKETS,
+)
+from marketdata.activity import parse_trade_time
+from marketdata.backtest import Strategy, run_backtest
+from marketdata.segments import SegmentReader, CANDLES_DIR, CANDLE_SCHEMA
+
+
+# Readers kept open per pool worker; refreshed before every batch
+_readers: Dict[str, SegmentReader] = {}
+
+
+def simulate_batch(directory: str, params: dict, tickers: List[str]) -> List[dict]:
+    """Load candles for a batch of markets and simulate them together; runs in a pool worker"""
+    reader = _readers.get(directory)
+    if reader is None:
+        reader = _readers[directory] = SegmentReader(directory, CANDLE_SCHEMA)
+    else:
+        reader.refresh()
+    strategy = Strategy.from_params(params["strategy"])
+    start = params.get("start", -np.inf)
+    end = params.get("end", np.inf)
+    close_times = params.get("close_times", {})
+
+    columns = [reader.scan(t, start, end, columns=["timestamp", "close", "volume"]) for t in tickers]
+    offsets = np.zeros(len(tickers) + 1, dtype=np.int64)
+    np.cumsum([len(c["close"]) for c in columns], out=offsets[1:])
+    results = run_backtest(
+        strategy,
+        np.concatenate([c["timestamp"] for c in columns]),
+        np.concatenate([c["close"] for c in columns]),
+        np.concatenate([c["volume"] for c in columns]),
+        offsets,
+        np.array([
+            parse_trade_time(close_times[t]) if t in close_times else np.inf
+            for t in tickers
+        ]),
+    )
+    return [
+        {
+            "market_ticker": ticker,
+            "bars": int(results["bars"][i]),
+            "trades": int(results["trades"][i]),
+            "wins": int(results["wins"][i]),
+            "pnl": round(float(results["pnl"][i]), 4),
+            "max_drawdown": round(float(results["max_drawdown"][i]), 4),
+            "bars_held": int(results["bars_held"][i]),
+        }
+        for i, ticker in enumerate(tickers)
+    ]
+
+
+class BacktestJob(Job):
+    """Simulate a threshold strategy over historical candles for many markets"""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "backtest"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        # Return price in MOVE tokens (with 8 decimals)
+        return Decimal(PRICING.get("backtest", 400000)) / Decimal(TOKEN_DECIMALS_MULTIPLIER)
+
+    def validate_params(self) -> tuple[bool, str]:
+        """Validate backtest parameters"""
+        markets = self.params.get("markets")
+        close_times = self.params.get("close_times", {})
+
+        if not isinstance(markets, list) or not markets:
+            return False, "Missing 'markets' parameter"
+
+        if len(markets) > MAX_BACKTEST_MARKETS:
+            return False, f"At most {MAX_BACKTEST_MARKETS} markets per backtest"
+
+        if not all(isinstance(ticker, str) and ticker for ticker in markets):
+            return False, "'markets' must be a list of tickers"
+
+        for key in ("start", "end"):
+            if not isinstance(self.params.get(key, 0), (int, float)):
+                return False, f"'{key}' must be epoch seconds"
+
+        if not isinstance(close_times, dict):
+            return False, "'close_times' must map tickers to close times"
+        try:
+            for value in close_times.values():
+                parse_trade_time(value)
+        except (TypeError, ValueError):
+            return False, "Close times must be epoch seconds or ISO 8601"
+
+        try:
+            Strategy.from_params(self.params.get("strategy"))
+        except ValueError as e:
+            return False, str(e)
+
+        return True, ""
+
+    async def execute(self) -> AsyncIterator[str]:
+        """Stream per-market results batch by batch, then a summary"""
+        markets = self.params["markets"]
+
+        started = time.perf_counter()
+        bars = trades = 0
+        pnl = 0.0
+        # Each batch runs in a pool worker under its CPU and memory limits;
+        # a disconnect mid-batch kills the worker instead of finishing it
+        for i in range(0, len(markets), BACKTEST_BATCH_MARKETS):
+            batch = markets[i:i + BACKTEST_BATCH_MARKETS]
+            results = await worker_pool.run(simulate_batch, CANDLES_DIR, self.params, batch)
+            for result in results:
+                bars += result["bars"]
+                trades += result["trades"]
+                pnl += result["pnl"]
+                yield json.dumps({"event": "market", **result}) + "\n"
+
+        yield json.dumps({
+            "event": "summary",
+            "markets": len(markets),
+            "bars": bars,
+            "trades": trades,
+            "pnl": round(pnl, 4),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }) + "\n"
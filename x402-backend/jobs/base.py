@@ -2,9 +2,12 @@
 Base class for all executable jobs
 """
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, Dict, Any
+from typing import AsyncIterator, Dict, Any, Optional
 from decimal import Decimal
 
+from metrics.tracing import NOOP_TRACE
+from .budget import JobBudget, budget_for
+
 
 class Job(ABC):
     """Abstract base class for jobs"""
@@ -12,6 +15,12 @@ class Job(ABC):
     def __init__(self, job_id: str, params: Dict[str, Any]):
         self.job_id = job_id
         self.params = params
+        # Lines of the previous stage's output when run inside a pipeline
+        self.input_stream: Optional[AsyncIterator[str]] = None
+        # time.monotonic() when payment was verified; start of the queue wait
+        self.paid_at: Optional[float] = None
+        # Spans of this job's trip through the x402 flow, if sampled
+        self.trace = NOOP_TRACE
 
     @classmethod
     @abstractmethod
@@ -25,6 +34,20 @@ class Job(ABC):
         """Return the price for this job in U tokens"""
         pass
 
+    @classmethod
+    def accepts_input(cls) -> bool:
+        """Whether the job can consume another job's output as a pipeline stage"""
+        return False
+
+    @classmethod
+    def budget(cls) -> JobBudget:
+        """Wall-clock and output limits for a run of this job type"""
+        return budget_for(cls.get_name())
+
+    def price(self) -> Decimal:
+        """Price of this job instance; defaults to the job type's price"""
+        return self.get_price()
+
     @abstractmethod
     async def execute(self) -> AsyncIterator[str]:
         """
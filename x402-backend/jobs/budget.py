@@ -0,0 +1,81 @@
+"""
+Wall-clock and output size budgets for job runs
+"""
+import asyncio
+from typing import AsyncIterator, NamedTuple
+
+from config import JOB_MAX_SECONDS, JOB_MAX_OUTPUT_BYTES, JOB_BUDGETS
+from metrics.jobs import output_size
+
+
+class BudgetExceeded(Exception):
+    """A job ran past its time budget or streamed more than its output budget"""
+
+
+class JobBudget(NamedTuple):
+    max_seconds: float
+    max_output_bytes: int
+
+
+def budget_for(job_type: str) -> JobBudget:
+    """Budget for a job type: its override in JOB_BUDGETS, or the defaults"""
+    return JobBudget(*JOB_BUDGETS.get(job_type, (JOB_MAX_SECONDS, JOB_MAX_OUTPUT_BYTES)))
+
+
+async def run_within_budget(job) -> AsyncIterator[str]:
+    """
+    Run `job.execute()` and stop it once it exceeds its budget
+
+    One timer per run: if the deadline passes while the job is producing a
+    chunk, the job is cancelled inside that await; if it passes while the
+    consumer holds a chunk, the run stops before asking for the next one.
+    Closing this generator (client disconnect, cancelled task) closes the
+    job's generator too, which tears down its subprocesses and pool tasks
+    before returning.
+
+    Raises:
+        BudgetExceeded: When the deadline passes or the output grows too large
+    """
+    budget = job.budget()
+    loop = asyncio.get_running_loop()
+    output = job.execute()
+    nbytes = 0
+    # The consumer's task; cancelled only while it waits on the job
+    task = asyncio.current_task()
+    producing = expired = False
+
+    def expire():
+        nonlocal expired
+        expired = True
+        if producing:
+            task.cancel()
+
+    timer = loop.call_at(loop.time() + budget.max_seconds, expire)
+    try:
+        while True:
+            if expired:
+                raise BudgetExceeded(f"Job exceeded its {budget.max_seconds:g} s time budget")
+            producing = True
+            try:
+                chunk = await output.__anext__()
+            except StopAsyncIteration:
+                return
+            except asyncio.CancelledError:
+                # Ours unless the task was also cancelled from outside
+                if expired and task.uncancel() == 0:
+                    raise BudgetExceeded(
+                        f"Job exceeded its {budget.max_seconds:g} s time budget"
+                    ) from None
+                raise
+            finally:
+                producing = False
+
+            nbytes += output_size(chunk)
+            if nbytes > budget.max_output_bytes:
+                raise BudgetExceeded(
+                    f"Job exceeded its {budget.max_output_bytes} byte output budget"
+                )
+            yield chunk
+    finally:
+        timer.cancel()
+        await output.aclose()
@@ -0,0 +1,145 @@
+"""
+Hand-off of unexecuted jobs from an exiting process to its replacement
+
+On shutdown, jobs that were requested but not executed (awaiting payment
+or paid) and async jobs cut short by the drain deadline are written to a
+snapshot file. Processes claim snapshots with an atomic rename, so each
+one is adopted exactly once, whether the replacement started before or
+after the old process exited.
+"""
+import json
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from config import HANDOFF_DIR
+from .registry import job_registry
+
+SNAPSHOT_VERSION = 1
+PREFIX = "handoff-"
+SUFFIX = ".json"
+
+
+def job_entry(job_info: Dict) -> Dict:
+    """Snapshot entry of a `pending_jobs` value"""
+    job = job_info["job"]
+    paid_at = None
+    if job.paid_at is not None:
+        # Monotonic clocks do not carry over between processes
+        paid_at = time.time() - (time.monotonic() - job.paid_at)
+    entry = {
+        "job_id": job.job_id,
+        "job_type": job.get_name(),
+        "params": job.params,
+        "mode": job_info.get("mode", "stream"),
+        "wallet_address": job_info["wallet_address"],
+        "price": str(job_info["price"]),
+        "expiry": job_info["expiry"].isoformat(),
+        "paid": job_info["paid"],
+        "paid_at": paid_at,
+    }
+    for key in ("payment_method", "tx_hash"):
+        if key in job_info:
+            entry[key] = job_info[key]
+    return entry
+
+
+def restore_entry(entry: Dict) -> Optional[Dict]:
+    """
+    Rebuild a `pending_jobs` value from a snapshot entry
+
+    Returns:
+        None if the entry expired, or its job type or params are no
+        longer accepted by this process
+    """
+    try:
+        expiry = datetime.fromisoformat(entry["expiry"])
+        if datetime.now(timezone.utc) > expiry:
+            return None
+        job_class = job_registry.get_job_class(entry["job_type"])
+        if job_class is None:
+            return None
+        job = job_class(job_id=entry["job_id"], params=entry["params"])
+        if not job.validate_params()[0]:
+            return None
+        if entry.get("paid_at") is not None:
+            job.paid_at = time.monotonic() - max(0.0, time.time() - entry["paid_at"])
+        job_info = {
+            "job": job,
+            "wallet_address": entry["wallet_address"],
+            "price": Decimal(entry["price"]),
+            "expiry": expiry,
+            "paid": bool(entry["paid"]),
+            "mode": entry.get("mode", "stream"),
+        }
+    except (KeyError, TypeError, ValueError, ArithmeticError):
+        return None
+    for key in ("payment_method", "tx_hash"):
+        if key in entry:
+            job_info[key] = entry[key]
+    return job_info
+
+
+def write_snapshot(entries: List[Dict], directory: str = HANDOFF_DIR) -> Optional[str]:
+    """
+    Durably write `entries` for another process to adopt
+
+    Returns:
+        The snapshot path, or None if there was nothing to hand off
+    """
+    if not entries:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    name = f"{PREFIX}{time.time_ns()}-{os.getpid()}{SUFFIX}"
+    path = os.path.join(directory, name)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "written_at": time.time(), "jobs": entries}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmp, path)
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return path
+
+
+def claim_snapshots(directory: str = HANDOFF_DIR) -> List[Dict]:
+    """
+    Take the entries of every snapshot in `directory`, oldest first
+
+    Each snapshot is renamed before it is read, so when several processes
+    look at once only one of them gets it. Unreadable snapshots are left
+    renamed for inspection.
+    """
+    try:
+        names = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(PREFIX) and name.endswith(SUFFIX)
+        )
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for name in names:
+        path = os.path.join(directory, name)
+        claimed = f"{path}.claimed-{os.getpid()}"
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue  # another process claimed it
+        try:
+            with open(claimed) as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"unknown version {snapshot.get('version')}")
+            entries.extend(snapshot["jobs"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"WARNING: Could not read job snapshot {claimed}: {e}")
+            continue
+        os.remove(claimed)
+    return entries
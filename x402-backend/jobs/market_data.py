@@ -0,0 +1,44 @@
+"""
+Market data job implementation
+"""
+from typing import AsyncIterator
+from decimal import Decimal
+from .base import Job
+from config import PRICING, TOKEN_DECIMALS_MULTIPLIER, MAX_ROLLUP_TICKERS
+from marketdata.rollups import rollup_store
+
+
+class MarketDataJob(Job):
+    """Return precomputed per-market rollups for a list of tickers"""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "market_data"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        # Return price in MOVE tokens (with 8 decimals)
+        return Decimal(PRICING.get("market_data", 100000)) / Decimal(TOKEN_DECIMALS_MULTIPLIER)
+
+    def validate_params(self) -> tuple[bool, str]:
+        """Validate market data parameters"""
+        tickers = self.params.get("tickers")
+
+        if not isinstance(tickers, list) or not tickers:
+            return False, "Missing 'tickers' parameter"
+
+        if len(tickers) > MAX_ROLLUP_TICKERS:
+            return False, f"At most {MAX_ROLLUP_TICKERS} tickers per request"
+
+        if not all(isinstance(ticker, str) for ticker in tickers):
+            return False, "'tickers' must be a list of strings"
+
+        return True, ""
+
+    def encode(self) -> bytes:
+        """Serialize the requested rollups from the precomputed buffers"""
+        return rollup_store.encode_many(self.params["tickers"])
+
+    async def execute(self) -> AsyncIterator[str]:
+        """Stream the rollups as one JSON document"""
+        yield self.encode().decode()
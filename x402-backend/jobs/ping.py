@@ -2,13 +2,28 @@
 Ping job implementation
 """
 import asyncio
+import contextlib
+import os
 import re
-from typing import AsyncIterator, Dict, Any
+import signal
+from typing import AsyncIterator, Dict, Any, List
 from decimal import Decimal
 from .base import Job
 from config import PRICING, MAX_PING_COUNT, PING_TIMEOUT
 
 
+def _kill_spawned(spawn: asyncio.Future) -> bool:
+    """Kill a ping process group if it is still running; True if it was"""
+    if spawn.cancelled() or spawn.exception() is not None:
+        return False
+    process = spawn.result()
+    if process.returncode is not None:
+        return False
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGKILL)
+    return True
+
+
 class PingJob(Job):
     """Ping a host and stream results"""
 
@@ -44,6 +59,12 @@ class PingJob(Job):
         pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9\-\.]*[a-zA-Z0-9])?$'
         return bool(re.match(pattern, host)) and len(host) <= 253
 
+    def command(self) -> List[str]:
+        """Build ping command (works on Linux)"""
+        host = self.params.get("host")
+        count = self.params.get("count", 4)
+        return ["ping", "-c", str(count), "-W", str(PING_TIMEOUT), host]
+
     async def execute(self) -> AsyncIterator[str]:
         """Execute ping command and stream output"""
         host = self.params.get("host")
@@ -51,16 +72,16 @@ class PingJob(Job):
 
         yield f"Starting ping to {host} ({count} packets)...\n"
 
+        # Start the process in its own group so teardown reaches all of it
+        spawn = asyncio.ensure_future(asyncio.create_subprocess_exec(
+            *self.command(),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        ))
         try:
-            # Build ping command (works on Linux)
-            cmd = ["ping", "-c", str(count), "-W", str(PING_TIMEOUT), host]
-
-            # Start the process
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            # Shielded: a spawn cancelled midway can leave its pipes open
+            process = await asyncio.shield(spawn)
 
             # Stream output line by line
             async for line in process.stdout:
@@ -80,3 +101,12 @@ class PingJob(Job):
 
         except Exception as e:
             yield f"\nError executing ping: {str(e)}\n"
+        finally:
+            # Client disconnected or the job ran out of budget. Killing itself
+            # never awaits. Reaping does, so the pipes get closed, but only
+            # after SIGKILL, which the process cannot delay. A spawn that has
+            # not finished yet is killed by a callback when it does.
+            if not spawn.done():
+                spawn.add_done_callback(_kill_spawned)
+            elif _kill_spawned(spawn):
+                await spawn.result().wait()
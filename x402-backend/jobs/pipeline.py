@@ -0,0 +1,152 @@
+"""
+Pipeline job implementation
+"""
+import asyncio
+from typing import AsyncIterator, List, Tuple
+from decimal import Decimal
+from .base import Job
+from config import (
+    PRICING,
+    TOKEN_DECIMALS_MULTIPLIER,
+    PIPELINE_MAX_STAGES,
+    PIPELINE_BUFFER_SIZE,
+)
+
+# Marks the end of a stage's output in the queue to the next stage
+_END = object()
+
+
+class PipelineError(Exception):
+    """A pipeline stage failed"""
+
+
+class _StageFailure:
+    def __init__(self, error: PipelineError):
+        self.error = error
+
+
+async def _read_lines(queue: asyncio.Queue) -> AsyncIterator[str]:
+    """Re-split an upstream stage's chunks into lines"""
+    pending = ""
+    while True:
+        item = await queue.get()
+        if item is _END:
+            break
+        if isinstance(item, _StageFailure):
+            raise item.error
+        pending += item
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+class PipelineJob(Job):
+    """
+    Chain registered jobs so each stage consumes the previous stage's output
+
+    Stages run concurrently, connected by bounded queues: a slow stage
+    blocks the ones before it. The pipeline is paid for once, at the sum
+    of its stage prices, and streams the last stage's output. Closing the
+    stream or a failing stage cancels every stage.
+    """
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "pipeline"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        # Return price in MOVE tokens (with 8 decimals)
+        return Decimal(PRICING.get("pipeline", 0)) / Decimal(TOKEN_DECIMALS_MULTIPLIER)
+
+    def price(self) -> Decimal:
+        stages, _ = self._build_stages()
+        return self.get_price() + sum((stage.price() for stage in stages), Decimal(0))
+
+    def _build_stages(self) -> Tuple[List[Job], List[asyncio.Queue]]:
+        """
+        Instantiate the stage jobs and the queues between them
+
+        Raises:
+            ValueError: If a stage is malformed
+        """
+        from .registry import job_registry
+
+        stages, queues = [], []
+        for index, spec in enumerate(self.params.get("stages") or []):
+            if not isinstance(spec, dict) or not isinstance(spec.get("params", {}), dict):
+                raise ValueError(f"Stage {index} must be an object with 'job_type' and 'params'")
+            job_type = spec.get("job_type")
+            job_class = job_registry.get_job_class(job_type)
+            if job_class is None or job_class is PipelineJob:
+                raise ValueError(f"Stage {index}: unknown job type: {job_type}")
+            if index > 0 and not job_class.accepts_input():
+                raise ValueError(f"Stage {index}: {job_type} cannot consume another job's output")
+
+            stage = job_class(job_id=f"{self.job_id}:{index}", params=spec.get("params", {}))
+            if index > 0:
+                queue = asyncio.Queue(maxsize=PIPELINE_BUFFER_SIZE)
+                queues.append(queue)
+                stage.input_stream = _read_lines(queue)
+            stages.append(stage)
+        return stages, queues
+
+    def validate_params(self) -> tuple[bool, str]:
+        """Validate the pipeline and every stage's parameters"""
+        specs = self.params.get("stages")
+
+        if not isinstance(specs, list) or len(specs) < 2:
+            return False, "A pipeline needs at least two 'stages'"
+
+        if len(specs) > PIPELINE_MAX_STAGES:
+            return False, f"At most {PIPELINE_MAX_STAGES} stages per pipeline"
+
+        try:
+            stages, _ = self._build_stages()
+        except ValueError as e:
+            return False, str(e)
+
+        for index, stage in enumerate(stages):
+            is_valid, error_msg = stage.validate_params()
+            if not is_valid:
+                return False, f"Stage {index} ({stage.get_name()}): {error_msg}"
+
+        return True, ""
+
+    async def _run_stage(self, index: int, stage: Job, output: asyncio.Queue):
+        """Feed one stage's output into the next stage's queue"""
+        chunks = stage.execute()
+        try:
+            async for chunk in chunks:
+                await output.put(chunk)
+            await output.put(_END)
+        except PipelineError as e:
+            await output.put(_StageFailure(e))
+        except Exception as e:
+            await output.put(_StageFailure(
+                PipelineError(f"Stage {index} ({stage.get_name()}) failed: {e}")
+            ))
+        finally:
+            await chunks.aclose()
+
+    async def execute(self) -> AsyncIterator[str]:
+        """Run all stages concurrently and stream the last one's output"""
+        stages, queues = self._build_stages()
+        final = stages.pop()
+        tasks = [
+            asyncio.create_task(self._run_stage(index, stage, queues[index]))
+            for index, stage in enumerate(stages)
+        ]
+        chunks = final.execute()
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            # Covers normal completion, client disconnect and stage failure
+            await chunks.aclose()
+            for task in tasks:
+                task.cancel()
+            # Wait for upstream stages to close their own jobs
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,9 +1,22 @@
 """
 Job registry for managing available job types
 """
-from typing import Dict, Type, Optional
+import importlib
+from typing import Dict, Type, Optional, Tuple
+from config import MARKET_API_URL, INGESTED_JOB_TYPES
 from .base import Job
-from .ping import PingJob
+
+# Built-in job types: name -> (module, class). Modules are imported on
+# first use so startup does not pay for numpy and friends.
+DEFAULT_JOBS: Dict[str, Tuple[str, str]] = {
+    "ping": ("jobs.ping", "PingJob"),
+    "sentiment": ("jobs.sentiment", "SentimentJob"),
+    "activity": ("jobs.activity", "ActivityJob"),
+    "market_data": ("jobs.market_data", "MarketDataJob"),
+    "backtest": ("jobs.backtest", "BacktestJob"),
+    "transform": ("jobs.transform", "TransformJob"),
+    "pipeline": ("jobs.pipeline", "PipelineJob"),
+}
 
 
 class JobRegistry:
@@ -11,23 +24,52 @@ class JobRegistry:
 
     def __init__(self):
         self._jobs: Dict[str, Type[Job]] = {}
+        self._lazy: Dict[str, Tuple[str, str]] = {}
         self._register_default_jobs()
 
     def _register_default_jobs(self):
         """Register built-in job types"""
-        self.register(PingJob)
+        for name, (module, class_name) in DEFAULT_JOBS.items():
+            # Without ingest their stores stay empty; they are not sold
+            if name in INGESTED_JOB_TYPES and not MARKET_API_URL:
+                continue
+            self.register_lazy(name, module, class_name)
 
     def register(self, job_class: Type[Job]):
         """Register a new job type"""
         job_name = job_class.get_name()
         self._jobs[job_name] = job_class
+        self._lazy.pop(job_name, None)
+
+    def unregister(self, job_name: str):
+        """Remove a job type, whether or not it has been imported yet"""
+        self._jobs.pop(job_name, None)
+        self._lazy.pop(job_name, None)
+
+    def register_lazy(self, job_name: str, module: str, class_name: str):
+        """Register a job type to be imported the first time it is looked up"""
+        if job_name not in self._jobs:
+            self._lazy[job_name] = (module, class_name)
 
     def get_job_class(self, job_name: str) -> Optional[Type[Job]]:
         """Get a job class by name"""
-        return self._jobs.get(job_name)
+        job_class = self._jobs.get(job_name)
+        spec = self._lazy.get(job_name) if job_class is None else None
+        if spec is not None:
+            # Stays listed as lazy until imported, so a concurrent preload never hides it
+            job_class = getattr(importlib.import_module(spec[0]), spec[1])
+            self._jobs[job_name] = job_class
+            self._lazy.pop(job_name, None)
+        return job_class
+
+    def load_all(self):
+        """Import every lazily registered job type"""
+        for job_name in list(self._lazy):
+            self.get_job_class(job_name)
 
     def list_jobs(self) -> Dict[str, Dict]:
         """List all available jobs with their details"""
+        self.load_all()
         return {
             name: {
                 "name": job_class.get_name(),
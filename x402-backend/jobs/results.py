@@ -0,0 +1,162 @@
+"""
+Bounded, expiring store for the output of background jobs
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from config import (
+    RESULT_TTL_SECONDS,
+    RESULT_MAX_JOBS,
+    RESULT_MAX_BYTES_PER_JOB,
+    RESULT_MAX_TOTAL_BYTES,
+)
+
+# Result states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TRUNCATED = "truncated"
+
+FINISHED = (COMPLETED, FAILED, CANCELLED, TRUNCATED)
+
+
+class JobResult:
+    """Output chunks and lifecycle of one background job"""
+
+    def __init__(self, job_id: str, job_type: str):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.status = QUEUED
+        self.chunks: List[str] = []
+        self.size = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def summary(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "error": self.error,
+            "total_chunks": len(self.chunks),
+            "bytes": self.size,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ResultStore:
+    """
+    Results keyed by job_id, bounded by count, per-job bytes and total bytes
+
+    Finished results expire `ttl` seconds after they finish. When a bound is
+    exceeded the oldest finished results are evicted first; running jobs are
+    never evicted.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RESULT_TTL_SECONDS,
+        max_jobs: int = RESULT_MAX_JOBS,
+        max_bytes_per_job: int = RESULT_MAX_BYTES_PER_JOB,
+        max_total_bytes: int = RESULT_MAX_TOTAL_BYTES,
+    ):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.max_bytes_per_job = max_bytes_per_job
+        self.max_total_bytes = max_total_bytes
+        self._results: "OrderedDict[str, JobResult]" = OrderedDict()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def create(self, job_id: str, job_type: str) -> JobResult:
+        result = JobResult(job_id, job_type)
+        replaced = self._results.pop(job_id, None)
+        if replaced is not None:
+            self.total_bytes -= replaced.size
+        self._results[job_id] = result
+        self._enforce_bounds()
+        return result
+
+    def append(self, result: JobResult, chunk: str) -> bool:
+        """
+        Store one output chunk
+
+        Returns:
+            False if the job exceeded its output budget (marked truncated)
+        """
+        size = len(chunk.encode())
+        if result.size + size > self.max_bytes_per_job:
+            self.finish(result, TRUNCATED, f"Output exceeded {self.max_bytes_per_job} bytes")
+            return False
+        result.chunks.append(chunk)
+        result.size += size
+        self.total_bytes += size
+        if self.total_bytes > self.max_total_bytes:
+            self._enforce_bounds()
+        return True
+
+    def finish(self, result: JobResult, status: str, error: Optional[str] = None):
+        result.status = status
+        result.error = error
+        result.finished_at = time.time()
+        # Keep the dict ordered by finish time for expiry and eviction
+        if result.job_id in self._results:
+            self._results.move_to_end(result.job_id)
+
+    def get(self, job_id: str) -> Optional[JobResult]:
+        result = self._results.get(job_id)
+        if result is not None and self._expired(result, time.time()):
+            self._remove(job_id)
+            return None
+        return result
+
+    def read(self, job_id: str, offset: int, limit: int) -> Optional[Dict]:
+        """One page of a job's output, with its status"""
+        result = self.get(job_id)
+        if result is None:
+            return None
+        chunks = result.chunks[offset:offset + limit]
+        end = offset + len(chunks)
+        return {
+            **result.summary(),
+            "offset": offset,
+            "chunks": chunks,
+            # More output may still arrive while the job runs
+            "next_offset": end if end < len(result.chunks) or not result.finished else None,
+        }
+
+    def evict_expired(self) -> int:
+        """Drop finished results past their TTL"""
+        now = time.time()
+        expired = [job_id for job_id, r in self._results.items() if self._expired(r, now)]
+        for job_id in expired:
+            self._remove(job_id)
+        return len(expired)
+
+    def _expired(self, result: JobResult, now: float) -> bool:
+        return result.finished and now - result.finished_at > self.ttl
+
+    def _remove(self, job_id: str):
+        result = self._results.pop(job_id)
+        self.total_bytes -= result.size
+
+    def _enforce_bounds(self):
+        if len(self._results) <= self.max_jobs and self.total_bytes <= self.max_total_bytes:
+            return
+        for job_id in [job_id for job_id, r in self._results.items() if r.finished]:
+            if len(self._results) <= self.max_jobs and self.total_bytes <= self.max_total_bytes:
+                break
+            self._remove(job_id)
@@ -0,0 +1,103 @@
+"""
+Background scheduler for paid jobs that run without a connected client
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from config import ASYNC_JOB_CONCURRENCY
+from metrics.jobs import job_started, job_finished
+from .base import Job
+from .budget import run_within_budget
+from .results import (
+    ResultStore, JobResult, RUNNING, COMPLETED, FAILED, CANCELLED,
+)
+
+
+class JobScheduler:
+    """
+    Run jobs as background tasks, at most `concurrency` at once
+
+    Output is written chunk by chunk to a ResultStore so clients can page
+    through it while the job is still running or after it finished.
+    """
+
+    def __init__(self, store: ResultStore, concurrency: int = ASYNC_JOB_CONCURRENCY):
+        self.store = store
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._jobs: Dict[str, Job] = {}
+
+    @property
+    def active(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, job: Job) -> JobResult:
+        """Queue a job; it starts as soon as a slot is free"""
+        result = self.store.create(job.job_id, job.get_name())
+        self._jobs[job.job_id] = job
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job, result))
+        return result
+
+    def cancel(self, job_id: str) -> bool:
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def _run(self, job: Job, result: JobResult):
+        started, events = None, 0
+        span = job.trace.span("queue")
+        try:
+            async with self._slots:
+                started = job_started(job, "async")
+                span.end()
+                span = job.trace.span("execute", transport="async")
+                result.status = RUNNING
+                result.started_at = time.time()
+                output = run_within_budget(job)
+                try:
+                    async for chunk in output:
+                        events += 1
+                        if not self.store.append(result, chunk):
+                            return
+                finally:
+                    await output.aclose()
+            self.store.finish(result, COMPLETED)
+        except asyncio.CancelledError:
+            self.store.finish(result, CANCELLED)
+        except Exception as e:
+            self.store.finish(result, FAILED, str(e))
+        finally:
+            self._tasks.pop(job.job_id, None)
+            self._jobs.pop(job.job_id, None)
+            if started is not None:
+                job_finished(job, "async", started, result.status, events, result.size)
+            span.end(outcome=result.status, events=events, bytes=result.size)
+            job.trace.finish()
+
+    async def shutdown(self, timeout: Optional[float] = None) -> List[Job]:
+        """
+        Cancel running jobs and wait for them to record their state
+
+        Returns:
+            The jobs cancelled before they completed, to hand off
+        """
+        jobs = list(self._jobs.values())
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        unfinished = []
+        for job in jobs:
+            result = self.store.get(job.job_id)
+            if result is not None and result.status == CANCELLED:
+                unfinished.append(job)
+        return unfinished
+
+
+# Global result store and scheduler instance
+result_store = ResultStore()
+scheduler = JobScheduler(result_store)
@@ -0,0 +1,102 @@
+"""
+Sentiment job implementation
+"""
+import asyncio
+import json
+from typing import AsyncIterator, List
+from decimal import Decimal
+from .base import Job
+from config import PRICING, TOKEN_DECIMALS_MULTIPLIER, MAX_SENTIMENT_POSTS, SENTIMENT_BATCH_SIZE
+from sentiment.engine import sentiment_engine
+
+
+class SentimentJob(Job):
+    """Score social posts and stream per-market sentiment aggregates"""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "sentiment"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        # Return price in MOVE tokens (with 8 decimals)
+        return Decimal(PRICING.get("sentiment", 300000)) / Decimal(TOKEN_DECIMALS_MULTIPLIER)
+
+    @classmethod
+    def accepts_input(cls) -> bool:
+        # Posts arrive as JSON lines from the previous pipeline stage
+        return True
+
+    def validate_params(self) -> tuple[bool, str]:
+        """Validate sentiment parameters"""
+        posts = self.params.get("posts", [])
+        markets = self.params.get("markets", [])
+
+        if not isinstance(posts, list) or not isinstance(markets, list):
+            return False, "'posts' and 'markets' must be lists"
+
+        if not posts and not markets and self.input_stream is None:
+            return False, "Provide 'posts' to score or 'markets' to query"
+
+        if len(posts) > MAX_SENTIMENT_POSTS:
+            return False, f"At most {MAX_SENTIMENT_POSTS} posts per request"
+
+        for post in posts:
+            if not isinstance(post, dict) or not post.get("market_ticker"):
+                return False, "Each post must be an object with a 'market_ticker'"
+            if not isinstance(post.get("content", ""), str):
+                return False, "Post 'content' must be a string"
+
+        return True, ""
+
+    async def _input_batches(self) -> AsyncIterator[List[dict]]:
+        """Group posts from the previous pipeline stage into scoring batches"""
+        batch = []
+        async for line in self.input_stream:
+            try:
+                post = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(post, dict) and post.get("market_ticker"):
+                batch.append(post)
+                if len(batch) >= SENTIMENT_BATCH_SIZE:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    async def _batches(self) -> AsyncIterator[List[dict]]:
+        posts = self.params.get("posts", [])
+        for start in range(0, len(posts), SENTIMENT_BATCH_SIZE):
+            yield posts[start:start + SENTIMENT_BATCH_SIZE]
+        if self.input_stream is not None:
+            async for batch in self._input_batches():
+                yield batch
+
+    async def execute(self) -> AsyncIterator[str]:
+        """Score posts in batches and stream the updated aggregates"""
+        posts = self.params.get("posts", [])
+        markets = list(self.params.get("markets", []))
+
+        if posts:
+            yield f"Scoring {len(posts)} posts...\n"
+
+        touched = {}
+        scored = 0
+        async for batch in self._batches():
+            try:
+                touched.update(sentiment_engine.ingest(batch))
+            except (KeyError, ValueError, TypeError) as e:
+                yield f"\nError scoring batch at offset {scored}: {str(e)}\n"
+                return
+            scored += len(batch)
+            # Let other streams run between batches
+            await asyncio.sleep(0)
+
+        for ticker in markets:
+            if ticker not in touched:
+                aggregate = sentiment_engine.get_market(ticker)
+                touched[ticker] = aggregate or {"market_ticker": ticker, "posts": 0}
+
+        for aggregate in touched.values():
+            yield json.dumps(aggregate) + "\n"
@@ -0,0 +1,80 @@
+"""
+Transform job implementation
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator
+from decimal import Decimal
+from .base import Job
+from config import PRICING, TOKEN_DECIMALS_MULTIPLIER
+
+
+class TransformJob(Job):
+    """Filter, project and reformat the JSON lines of the previous pipeline stage"""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "transform"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        # Return price in MOVE tokens (with 8 decimals)
+        return Decimal(PRICING.get("transform", 50000)) / Decimal(TOKEN_DECIMALS_MULTIPLIER)
+
+    @classmethod
+    def accepts_input(cls) -> bool:
+        return True
+
+    def validate_params(self) -> tuple[bool, str]:
+        """Validate transform parameters"""
+        fields = self.params.get("fields")
+        where = self.params.get("where", {})
+        output = self.params.get("format", "jsonl")
+
+        if self.input_stream is None:
+            return False, "Transform only runs as a pipeline stage"
+
+        if fields is not None and (
+            not isinstance(fields, list) or not all(isinstance(f, str) for f in fields)
+        ):
+            return False, "'fields' must be a list of field names"
+
+        if not isinstance(where, dict):
+            return False, "'where' must map fields to required values"
+
+        if output not in ("jsonl", "csv"):
+            return False, "Format must be 'jsonl' or 'csv'"
+
+        if output == "csv" and not fields:
+            return False, "CSV output needs 'fields'"
+
+        return True, ""
+
+    async def execute(self) -> AsyncIterator[str]:
+        """Stream matching records; lines that are not JSON objects are dropped"""
+        fields = self.params.get("fields")
+        where = self.params.get("where", {})
+        output = self.params.get("format", "jsonl")
+
+        if output == "csv":
+            yield ",".join(fields) + "\n"
+
+        async for line in self.input_stream:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if any(record.get(key) != value for key, value in where.items()):
+                continue
+            if fields:
+                record = {field: record.get(field) for field in fields}
+
+            if output == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer, lineterminator="\n").writerow(record.values())
+                yield buffer.getvalue()
+            else:
+                yield json.dumps(record) + "\n"
@@ -0,0 +1,192 @@
+"""
+Process pool for CPU-bound job work, with per-task CPU and memory limits
+
+Workers are forked from a forkserver with the job modules preloaded. Each
+worker caps its address space with RLIMIT_AS, and each task runs under a
+CPU time budget enforced by a profiling timer, so a runaway task fails on
+its own without taking the worker down. A task whose caller is cancelled
+(client disconnect, wall-clock budget) kills its worker instead of letting
+abandoned work keep a CPU busy; a fresh worker is forked when needed.
+"""
+import asyncio
+import multiprocessing
+import resource
+import signal
+from typing import Any, Callable, List, Optional
+
+from config import JOB_POOL_WORKERS, JOB_POOL_CPU_SECONDS, JOB_POOL_MEMORY_BYTES
+
+# Imported once by the forkserver so new workers start warm
+PRELOAD = ["jobs.workers", "jobs.backtest"]
+
+
+class WorkerError(Exception):
+    """A pooled task raised, exceeded its limits or lost its worker"""
+
+
+class _CpuBudgetExceeded(Exception):
+    pass
+
+
+def _on_cpu_budget(signum, frame):
+    raise _CpuBudgetExceeded()
+
+
+def _worker_main(conn, memory_bytes: Optional[int]):
+    """Run tasks from `conn` until the pool closes it"""
+    if memory_bytes:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+    signal.signal(signal.SIGPROF, _on_cpu_budget)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while True:
+        try:
+            fn, args, cpu_seconds = conn.recv()
+        except EOFError:
+            return
+        try:
+            signal.setitimer(signal.ITIMER_PROF, cpu_seconds)
+            try:
+                reply = (True, fn(*args))
+            finally:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+        except _CpuBudgetExceeded:
+            reply = (False, f"Task exceeded its {cpu_seconds:g} s CPU budget")
+        except MemoryError:
+            if memory_bytes:
+                reply = (False, f"Task exceeded the {memory_bytes // 2 ** 20} MiB worker memory limit")
+            else:
+                reply = (False, "Task ran out of memory")
+        except Exception as e:
+            reply = (False, f"{type(e).__name__}: {e}")
+        conn.send(reply)
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+
+class WorkerPool:
+    """
+    At most `max_workers` processes, each running one task at a time
+
+    Callers wait for a free worker; workers are forked lazily and kept
+    idle between tasks.
+    """
+
+    def __init__(self, max_workers: int = JOB_POOL_WORKERS, memory_bytes: Optional[int] = JOB_POOL_MEMORY_BYTES):
+        self.max_workers = max_workers
+        self.memory_bytes = memory_bytes
+        self.killed = 0
+        self._slots = asyncio.Semaphore(max_workers)
+        self._idle: List[_Worker] = []
+        self._busy: List[_Worker] = []
+        self._context = None
+
+    @property
+    def workers(self) -> int:
+        return len(self._idle) + len(self._busy)
+
+    async def run(self, fn: Callable, *args, cpu_seconds: float = JOB_POOL_CPU_SECONDS) -> Any:
+        """
+        Run `fn(*args)` in a worker process; both must be picklable
+
+        Raises:
+            WorkerError: If the task raised, ran out of CPU time or memory,
+                or its worker died
+        """
+        async with self._slots:
+            worker = self._idle.pop() if self._idle else await self._fork()
+            self._busy.append(worker)
+            try:
+                worker.conn.send((fn, args, cpu_seconds))
+                ok, value = await self._receive(worker)
+            except BaseException:
+                # The worker may still be running the task, so it goes
+                self._kill(worker)
+                raise
+            self._busy.remove(worker)
+            self._idle.append(worker)
+        if not ok:
+            raise WorkerError(value)
+        return value
+
+    async def _fork(self) -> _Worker:
+        # Forking waits on the forkserver, so it runs off the event loop
+        fork = asyncio.ensure_future(asyncio.to_thread(self._spawn))
+        try:
+            return await asyncio.shield(fork)
+        except asyncio.CancelledError:
+            # Let the fork finish so the new worker is parked, not leaked
+            fork.add_done_callback(self._park)
+            raise
+
+    def _park(self, fork: asyncio.Future):
+        if fork.cancelled() or fork.exception() is not None:
+            return
+        worker = fork.result()
+        self._idle.append(worker)
+        if self.workers > self.max_workers:
+            self._kill(worker)
+
+    def _spawn(self) -> _Worker:
+        if self._context is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD)
+            self._context = context
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, self.memory_bytes), daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, conn)
+
+    async def _receive(self, worker: _Worker):
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = worker.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(fd)
+        # A large result takes a while to unpickle, so it is read off the loop
+        read = asyncio.ensure_future(asyncio.to_thread(worker.conn.recv))
+        try:
+            return await asyncio.shield(read)
+        except EOFError:
+            raise WorkerError(f"Worker exited with code {worker.process.exitcode}") from None
+        except asyncio.CancelledError:
+            # The caller kills the worker and closes the pipe; SIGKILL ends the
+            # read promptly, and the pipe must not close under it
+            worker.process.kill()
+            await asyncio.wait({read})
+            if not read.cancelled():
+                read.exception()
+            raise
+
+    def _kill(self, worker: _Worker):
+        if worker in self._busy:
+            self._busy.remove(worker)
+        elif worker in self._idle:
+            self._idle.remove(worker)
+        else:
+            return  # already killed by shutdown()
+        worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+        worker.process.close()
+        self.killed += 1
+
+    def shutdown(self):
+        """Kill every worker; the pool forks new ones if used again"""
+        for worker in self._busy + self._idle:
+            self._kill(worker)
+
+
+# Global worker pool instance
+worker_pool = WorkerPool()
@@ -1,24 +1,46 @@
 """
 x402 PoC - FastAPI Backend
 """
+import json
+import sys
 import uuid
+import time
 import asyncio
+import importlib
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Optional
-from fastapi import FastAPI, HTTPException, Request
+from typing import Dict, List, Optional, Set
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from contextlib import asynccontextmanager
 
 from config import (
     HOST, PORT, CORS_ORIGINS, PAYMENT_TIMEOUT_SECONDS,
-    PAYMENT_RECIPIENT_ADDRESS, CHAIN_ID
+    PAYMENT_RECIPIENT_ADDRESS, CHAIN_ID,
+    RESULT_DEFAULT_PAGE_SIZE, RESULT_MAX_PAGE_SIZE,
+    PROFILE_MAX_SECONDS, TRACE_MAX_TRACES,
+    PRELOAD_ON_STARTUP, CONNECTIVITY_CHECK_INTERVAL,
+    TOKEN_DECIMALS_MULTIPLIER,
+    DRAIN_TIMEOUT_SECONDS, DRAIN_RETRY_AFTER_SECONDS, HANDOFF_POLL_INTERVAL,
+    MARKET_API_URL,
 )
+from jobs.base import Job
+from jobs.handoff import job_entry, restore_entry, write_snapshot, claim_snapshots
 from jobs.registry import job_registry
-from payments.base_token import PaymentVerifier
-from payments.x402_auth import verify_payment_signature, parse_x_payment_header
+from jobs.scheduler import scheduler, result_store
+from jobs.workers import worker_pool
+from auth.rate_limit import check_rate_limit
+from metrics.registry import metrics
+from metrics.loop_lag import loop_lag_monitor
+from metrics.profiler import profiler
+from metrics.tracing import tracer
+from auth.admin import require_admin
+from payments.x402_auth import verify_payment_signature, parse_x_payment_header, TX_HASH_PATTERN
+from payments.audit_log import audit_log, AuditLog, JOB_ID_BYTES
+from streaming.drain import drain
 from streaming.sse import create_sse_response
+from streaming.websocket import JobMultiplexer
 
 
 # Pydantic models
@@ -26,42 +48,251 @@ class JobRequest(BaseModel):
     job_type: str
     params: Dict
     wallet_address: str
-    job_id: Optional[str] = None  # Client-provided job ID for x402
+    # Client-provided job ID for x402; printable ASCII so it fits the audit log
+    job_id: Optional[str] = Field(default=None, pattern=rf"^[\x21-\x7e]{{1,{JOB_ID_BYTES}}}$")
+    mode: str = "stream"  # "stream" (SSE/WebSocket) or "async" (stored results)
 
 
 class PaymentConfirmation(BaseModel):
     job_id: str
-    tx_hash: str
+    # Checked up front; the audit log only stores well-formed hashes
+    tx_hash: str = Field(pattern=TX_HASH_PATTERN)
 
 
 # In-memory storage for pending jobs
 pending_jobs: Dict[str, Dict] = {}
-payment_verifier: Optional[PaymentVerifier] = None
+# Job IDs whose payment is being recorded, held until the job is stored
+recording_job_ids: Set[str] = set()
+payment_verifier = None  # payments.base_token.PaymentVerifier, created on first use
+rpc_connected: Optional[bool] = None  # result of the last background connectivity check
+
+
+def get_payment_verifier():
+    """
+    Payment backend, imported on first use
+
+    Keeps aiohttp out of the cold start import path.
+    """
+    global payment_verifier
+    if payment_verifier is None:
+        from payments.base_token import PaymentVerifier
+        payment_verifier = PaymentVerifier()
+    return payment_verifier
+
+
+async def get_audit_log() -> AuditLog:
+    """
+    Payment audit log, opened off the event loop on first use
+
+    Raises:
+        HTTPException: 503 if the log cannot be opened; payments are
+            refused rather than taken unrecorded
+    """
+    if not audit_log.is_open:
+        try:
+            await asyncio.to_thread(audit_log.open)
+        except (OSError, RuntimeError) as e:
+            raise HTTPException(
+                status_code=503, detail=f"Audit log unavailable: {e}",
+                headers={"Retry-After": str(DRAIN_RETRY_AFTER_SECONDS)},
+            )
+    return audit_log
+
+
+def job_id_in_use(job_id: str) -> bool:
+    """Whether a job awaiting payment or execution, or a stored result, has this ID"""
+    return (
+        job_id in pending_jobs or job_id in recording_job_ids
+        or result_store.get(job_id) is not None
+    )
+
+
+def octas(price) -> int:
+    return int(price * TOKEN_DECIMALS_MULTIPLIER)
+
+
+async def warm_up():
+    """
+    Preload what paid requests need, then keep checking RPC connectivity
+
+    Runs once the app is already serving; imports go through a worker
+    thread so the event loop keeps answering meanwhile.
+    """
+    global rpc_connected
+    try:
+        await get_audit_log()
+    except HTTPException as e:
+        print(f"WARNING: {e.detail}")
+    if PRELOAD_ON_STARTUP:
+        await asyncio.to_thread(importlib.import_module, "payments.base_token")
+        await asyncio.to_thread(job_registry.load_all)
+
+    while True:
+        connected = await get_payment_verifier().is_connected()
+        if connected != rpc_connected:
+            if not connected:
+                print("WARNING: Not connected to Movement Bedrock Testnet!")
+            else:
+                print("Connected to Movement Bedrock Testnet")
+        rpc_connected = connected
+        await asyncio.sleep(CONNECTIVITY_CHECK_INTERVAL)
+
+
+async def ingest_market_data():
+    """Feed the stores the activity, market_data and backtest jobs read from the upstream API"""
+    # aiohttp and numpy load in a worker thread, after startup
+    feed = await asyncio.to_thread(importlib.import_module, "marketdata.feed")
+    await feed.market_feed.run()
+
+
+async def adopt(entry: Dict, log: AuditLog) -> bool:
+    """
+    Take over one job handed off by another process
+
+    A paid job's payment stays in the audit log, recorded again here if no
+    shard has it, so the transaction cannot pay for anything else; paid
+    async jobs start right away.
+    """
+    job_info = restore_entry(entry)
+    if job_info is None:
+        return False
+    job = job_info["job"]
+    if job_id_in_use(job.job_id):
+        return False
+    tx_hash = job_info.get("tx_hash")
+    try:
+        if job_info["paid"] and tx_hash:
+            record = log.lookup_tx(tx_hash)
+            if record is None:
+                recording_job_ids.add(job.job_id)
+                try:
+                    await asyncio.to_thread(log.record_payment, tx_hash, job.job_id, job.get_name(),
+                                            job_info["wallet_address"], octas(job_info["price"]))
+                finally:
+                    recording_job_ids.discard(job.job_id)
+            elif record.job_id != job.job_id:
+                return False
+        if job_info["paid"] and job_info["mode"] == "async":
+            log.record_execute(job.job_id, job.get_name())
+            scheduler.submit(job)
+            return True
+    except ValueError:
+        return False
+    pending_jobs[job.job_id] = job_info
+    return True
+
+
+async def adopt_handoffs():
+    """Background task adopting jobs from snapshots of exiting processes"""
+    while True:
+        # Starts after a poll interval so startup serves requests first
+        await asyncio.sleep(HANDOFF_POLL_INTERVAL)
+        # A draining process would only hand them off again
+        if drain.active:
+            continue
+        # Claimed only once the log is ours, so adopted payments can be recorded
+        try:
+            log = await get_audit_log()
+        except HTTPException:
+            continue
+        entries = await asyncio.to_thread(claim_snapshots)
+        if entries:
+            adopted = 0
+            for entry in entries:
+                adopted += await adopt(entry, log)
+            print(f"Adopted {adopted} of {len(entries)} handed-off jobs")
+
+
+def handoff_entries(unfinished: List[Job]) -> List[Dict]:
+    """Snapshot entries of the jobs this process accepted but did not execute"""
+    now = datetime.now(timezone.utc)
+    entries = [
+        job_entry(info) for info in pending_jobs.values()
+        if not info.get("executed") and now <= info["expiry"]
+    ]
+    # Async jobs cut short by the drain deadline run again from the start
+    expiry = now + timedelta(seconds=PAYMENT_TIMEOUT_SECONDS)
+    for job in unfinished:
+        payments = [record for record in audit_log.lookup_job(job.job_id) if record.event == "payment"]
+        if not payments:
+            continue
+        entries.append(job_entry({
+            "job": job,
+            "wallet_address": payments[-1].sender,
+            "price": job.price(),
+            "expiry": expiry,
+            "paid": True,
+            "mode": "async",
+            "tx_hash": payments[-1].tx_hash,
+        }))
+    return entries
+
+
+def pending_job_stats() -> Dict[str, Dict[tuple, float]]:
+    """Count and oldest age of pending jobs by payment state, computed at scrape time"""
+    now = datetime.now(timezone.utc)
+    counts = {("awaiting_payment",): 0, ("paid",): 0}
+    oldest = {("awaiting_payment",): 0.0, ("paid",): 0.0}
+    for info in list(pending_jobs.values()):
+        state = ("paid",) if info["paid"] else ("awaiting_payment",)
+        counts[state] += 1
+        age = PAYMENT_TIMEOUT_SECONDS - (info["expiry"] - now).total_seconds()
+        oldest[state] = max(oldest[state], age)
+    return {"count": counts, "oldest": oldest}
+
+
+metrics.gauge(
+    "x402_pending_jobs",
+    "Jobs awaiting payment or execution",
+    labels=("state",),
+    collect=lambda: pending_job_stats()["count"],
+)
+metrics.gauge(
+    "x402_pending_job_oldest_age_seconds",
+    "Age of the oldest pending job",
+    labels=("state",),
+    collect=lambda: pending_job_stats()["oldest"],
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    global payment_verifier
-
-    # Startup
+    # Startup; nothing here waits on the network
     print("Starting x402 Payment System...")
-    payment_verifier = PaymentVerifier()
-
-    is_connected = await payment_verifier.is_connected()
-    if not is_connected:
-        print("WARNING: Not connected to Movement Bedrock Testnet!")
-    else:
-        print("Connected to Movement Bedrock Testnet")
+    warm_up_task = asyncio.create_task(warm_up())
 
     # Start background cleanup task
     cleanup_task = asyncio.create_task(cleanup_expired_jobs())
+    handoff_task = asyncio.create_task(adopt_handoffs())
+    ingest_task = asyncio.create_task(ingest_market_data()) if MARKET_API_URL else None
+    loop_lag_monitor.start()
 
     yield
 
-    # Shutdown
+    # Shutdown; streams have finished or reached the drain deadline by now
     print("Shutting down x402 Payment System...")
+    warm_up_task.cancel()
     cleanup_task.cancel()
+    handoff_task.cancel()
+    await loop_lag_monitor.stop()
+    # Async jobs get what is left of the deadline; the rest are handed off
+    drain.start()
+    await drain.wait_idle(lambda: scheduler.active)
+    unfinished = await scheduler.shutdown(timeout=5)
+    worker_pool.shutdown()
+    entries = handoff_entries(unfinished)
+    path = await asyncio.to_thread(write_snapshot, entries)
+    if path:
+        print(f"Handed off {len(entries)} unexecuted jobs in {path}")
+    # Kept running until here so draining activity streams still see trades
+    if ingest_task is not None:
+        ingest_task.cancel()
+    # Only an ingesting process buffers history; importing it here would load numpy
+    ingest = sys.modules.get("marketdata.ingest")
+    if ingest is not None:
+        await asyncio.to_thread(ingest.flush_history)
+    await asyncio.to_thread(audit_log.close)
 
 
 # Create FastAPI app
@@ -82,16 +313,139 @@ app.add_middleware(
 )
 
 
+def client_ip(request: Request) -> Optional[str]:
+    """Address of the connecting client"""
+    return request.client.host if request.client else None
+
+
 @app.get("/")
 async def root():
-    """Health check endpoint"""
-    return {
+    """Health check endpoint; 503 while draining so load balancers move traffic away"""
+    health = {
         "service": "x402 Payment System",
-        "status": "running",
+        "status": "draining" if drain.active else "running",
         "network": "Movement Bedrock Testnet",
         "chain_id": CHAIN_ID,
-        "connected": await payment_verifier.is_connected() if payment_verifier else False
+        "connected": rpc_connected is True
     }
+    if drain.active:
+        return JSONResponse(status_code=503, content=health)
+    return health
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(
+    request: Request,
+    seconds: float = Query(default=10, gt=0, le=PROFILE_MAX_SECONDS),
+    mode: str = Query(default="cpu", pattern="^(cpu|wall)$"),
+):
+    """
+    Sample stacks for `seconds` and return them collapsed
+
+    Feed the output to flamegraph.pl or speedscope. 'cpu' samples only
+    while the process is on CPU; 'wall' also shows blocking and idle time.
+    One profile at a time.
+    """
+    require_admin(request)
+    try:
+        profiler.start(mode)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        stacks = profiler.stop()
+    return PlainTextResponse(stacks)
+
+
+@app.post("/admin/drain")
+async def admin_drain(request: Request, timeout: float = Query(default=DRAIN_TIMEOUT_SECONDS, gt=0)):
+    """
+    Stop taking job requests ahead of a restart, e.g. from a pre-stop hook
+
+    Health checks fail from now on. Running streams have until `timeout`
+    seconds after the first call; on exit, jobs not executed by then are
+    handed off to the next process.
+    """
+    require_admin(request)
+    drain.start(timeout)
+    return drain.status()
+
+
+@app.delete("/admin/drain")
+async def admin_undrain(request: Request):
+    """Take job requests again, e.g. when a deploy is called off"""
+    require_admin(request)
+    if not drain.stop():
+        raise HTTPException(status_code=409, detail="Server is shutting down")
+    return drain.status()
+
+
+@app.get("/admin/traces")
+async def admin_traces(
+    request: Request,
+    limit: int = Query(default=100, ge=1, le=TRACE_MAX_TRACES),
+):
+    """Most recent sampled job traces, newest first"""
+    require_admin(request)
+    return {"sample_rate": tracer.sample_rate, "traces": tracer.dump(limit)}
+
+
+@app.post("/admin/traces/sample-rate")
+async def admin_trace_sample_rate(request: Request, rate: float = Query(ge=0, le=1)):
+    """Change the fraction of jobs traced; 0 turns tracing off"""
+    require_admin(request)
+    tracer.sample_rate = rate
+    return {"sample_rate": rate}
+
+
+@app.get("/admin/audit/lookup")
+async def admin_audit_lookup(
+    request: Request,
+    tx_hash: Optional[str] = None,
+    job_id: Optional[str] = None,
+):
+    """Audit records of a transaction or a job"""
+    require_admin(request)
+    log = await get_audit_log()
+    if tx_hash is not None:
+        record = log.lookup_tx(tx_hash)
+        return {"records": [record.to_dict()] if record else []}
+    if job_id is not None:
+        return {"records": [record.to_dict() for record in log.lookup_job(job_id)]}
+    raise HTTPException(status_code=400, detail="Pass tx_hash or job_id")
+
+
+@app.get("/admin/audit/export")
+async def admin_audit_export(
+    request: Request,
+    start: int = Query(default=0, ge=0),
+    shard: Optional[str] = None,
+):
+    """Durable audit records of one shard (this process's by default) from `start` on, as NDJSON"""
+    require_admin(request)
+    log = await get_audit_log()
+    try:
+        records = log.export(start, shard)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown audit log shard: {shard}")
+    # A plain iterator; Starlette reads it from a worker thread
+    lines = (json.dumps(record.to_dict()) + "\n" for record in records)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@app.get("/admin/audit/reconcile")
+async def admin_audit_reconcile(request: Request, limit: int = Query(default=100, ge=0, le=10000)):
+    """Payment totals and paid jobs that never executed"""
+    require_admin(request)
+    log = await get_audit_log()
+    return await asyncio.to_thread(log.reconcile, limit)
 
 
 @app.get("/api/jobs")
@@ -113,25 +467,48 @@ async def request_job(job_request: JobRequest, request: Request):
     - With X-PAYMENT header: Verify signature and authorize immediately
     - Without X-PAYMENT: Return 402 Payment Required with payment details
     """
+    # A draining instance sends new work elsewhere before allocating anything
+    if drain.active:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is restarting; retry shortly",
+            headers={"Retry-After": str(DRAIN_RETRY_AFTER_SECONDS)},
+        )
+
+    # Admission control runs before any job state is allocated
+    check_rate_limit(
+        "request",
+        wallet=job_request.wallet_address,
+        client_ip=client_ip(request),
+        job_type=job_request.job_type,
+    )
+
     # Validate job type
     job_class = job_registry.get_job_class(job_request.job_type)
     if not job_class:
         raise HTTPException(status_code=400, detail=f"Unknown job type: {job_request.job_type}")
 
+    if job_request.mode not in ("stream", "async"):
+        raise HTTPException(status_code=400, detail="Mode must be 'stream' or 'async'")
+
     # Get or generate job ID
     # For x402, client provides job_id; for traditional flow, we generate it
     job_id = job_request.job_id or str(uuid.uuid4())
+    if job_id_in_use(job_id):
+        raise HTTPException(status_code=409, detail="Job ID already in use")
 
     # Create job instance for validation
     job = job_class(job_id=job_id, params=job_request.params)
+    trace = job.trace = tracer.start(job_id, job_type=job_request.job_type, mode=job_request.mode)
 
     # Validate parameters
-    is_valid, error_msg = job.validate_params()
+    with trace.span("validate"):
+        is_valid, error_msg = job.validate_params()
     if not is_valid:
         raise HTTPException(status_code=400, detail=error_msg)
 
     # Get price
-    price = job_class.get_price()
+    price = job.price()
     # Note: price is in MOVE tokens with 8 decimals, not wei (18 decimals)
 
     # Check for X-PAYMENT header (x402 signature-based payment)
@@ -139,31 +516,68 @@ async def request_job(job_request: JobRequest, request: Request):
 
     if x_payment:
         # Parse payment data
-        payment_data = parse_x_payment_header(x_payment)
+        with trace.span("parse_header"):
+            payment_data = parse_x_payment_header(x_payment)
         if not payment_data:
             raise HTTPException(status_code=400, detail="Invalid X-PAYMENT header format")
 
         # Verify signature
-        is_valid, signer_address, error_msg = verify_payment_signature(
-            payment_data,
-            job_id,
-            amount_wei
-        )
+        with trace.span("verify_signature"):
+            is_valid, signer_address, error_msg = verify_payment_signature(
+                payment_data,
+                job_id,
+                str(price)
+            )
 
         if is_valid:
             # Transaction hash received - verify on-chain
             tx_hash = payment_data.get("tx_hash")
-            
+
+            # A transaction pays for one job only
+            log = await get_audit_log()
+            if log.lookup_tx(tx_hash) is not None:
+                raise HTTPException(status_code=409, detail="Transaction already used for a payment")
+
             # Verify transaction on blockchain
-            success, verified_hash = await payment_verifier.verify_payment(
-                from_address=signer_address,
-                expected_amount=price,
-                tx_hash=tx_hash,
-                timeout=60  # 60 second timeout for block confirmation
-            )
+            with trace.span("verify_payment") as span:
+                success, verified_hash = await get_payment_verifier().verify_payment(
+                    from_address=signer_address,
+                    expected_amount=price,
+                    tx_hash=tx_hash,
+                    timeout=60  # 60 second timeout for block confirmation
+                )
+                span.set(verified=success)
 
             if success:
+                # Checked again; a concurrent request may have used them meanwhile
+                if job_id_in_use(job_id):
+                    raise HTTPException(status_code=409, detail="Job ID already in use")
+                recording_job_ids.add(job_id)
+                try:
+                    recorded = await asyncio.to_thread(
+                        log.record_payment, verified_hash, job_id, job.get_name(), signer_address, octas(price),
+                    )
+                finally:
+                    recording_job_ids.discard(job_id)
+                if recorded is None:
+                    raise HTTPException(status_code=409, detail="Transaction already used for a payment")
+                job.paid_at = time.monotonic()
+                if job_request.mode == "async":
+                    # Payment verified - run in the background right away
+                    with trace.span("store"):
+                        log.record_execute(job_id, job.get_name())
+                        scheduler.submit(job)
+                    return {
+                        "status": "accepted",
+                        "job_id": job_id,
+                        "message": "Payment verified, job running in background",
+                        "signer": signer_address,
+                        "tx_hash": verified_hash,
+                        "result_url": f"/api/jobs/results/{job_id}"
+                    }
+
                 # Payment verified - authorize immediately
+                span = trace.span("store")
                 expiry = datetime.now(timezone.utc) + timedelta(seconds=PAYMENT_TIMEOUT_SECONDS)
                 pending_jobs[job_id] = {
                     "job": job,
@@ -174,6 +588,7 @@ async def request_job(job_request: JobRequest, request: Request):
                     "payment_method": "x402_transaction",
                     "tx_hash": verified_hash
                 }
+                span.end()
 
                 return {
                     "status": "authorized",
@@ -188,14 +603,17 @@ async def request_job(job_request: JobRequest, request: Request):
 
     # No X-PAYMENT header - traditional flow
     # Store pending job
+    span = trace.span("store")
     expiry = datetime.now(timezone.utc) + timedelta(seconds=PAYMENT_TIMEOUT_SECONDS)
     pending_jobs[job_id] = {
         "job": job,
         "wallet_address": job_request.wallet_address,
         "price": price,
         "expiry": expiry,
-        "paid": False
+        "paid": False,
+        "mode": job_request.mode
     }
+    span.end()
 
     # Return 402 Payment Required
     return JSONResponse(
@@ -216,7 +634,7 @@ async def request_job(job_request: JobRequest, request: Request):
 
 
 @app.post("/api/jobs/verify-payment")
-async def verify_payment(confirmation: PaymentConfirmation):
+async def verify_payment(confirmation: PaymentConfirmation, request: Request):
     """
     Verify payment and return execution URL
     """
@@ -227,6 +645,8 @@ async def verify_payment(confirmation: PaymentConfirmation):
         raise HTTPException(status_code=404, detail="Job not found")
 
     job_info = pending_jobs[job_id]
+    # One call, so the wallet and IP tokens are taken together or not at all
+    check_rate_limit("verify_payment", wallet=job_info["wallet_address"], client_ip=client_ip(request))
 
     # Check if expired
     if datetime.now(timezone.utc) > job_info["expiry"]:
@@ -240,16 +660,45 @@ async def verify_payment(confirmation: PaymentConfirmation):
             "execution_url": f"/api/jobs/execute/{job_id}"
         }
 
+    log = await get_audit_log()
+    if log.lookup_tx(confirmation.tx_hash) is not None:
+        raise HTTPException(status_code=409, detail="Transaction already used for a payment")
+
     # Verify payment on blockchain (30 second check per attempt)
-    success, tx_hash = await payment_verifier.verify_payment(
-        from_address=job_info["wallet_address"],
-        expected_amount=job_info["price"],
-        timeout=30  # Longer timeout for blockchain confirmation
-    )
+    trace = job_info["job"].trace
+    with trace.span("verify_payment") as span:
+        success, tx_hash = await get_payment_verifier().verify_payment(
+            from_address=job_info["wallet_address"],
+            expected_amount=job_info["price"],
+            tx_hash=confirmation.tx_hash,
+            timeout=30  # Longer timeout for blockchain confirmation
+        )
+        span.set(verified=success)
 
     if success:
+        job = job_info["job"]
+        recorded = await asyncio.to_thread(
+            log.record_payment, tx_hash, job_id, job.get_name(), job_info["wallet_address"],
+            octas(job_info["price"]),
+        )
+        if recorded is None:
+            raise HTTPException(status_code=409, detail="Transaction already used for a payment")
         job_info["paid"] = True
+        job_info["job"].paid_at = time.monotonic()
         job_info["tx_hash"] = tx_hash
+
+        if job_info.get("mode") == "async":
+            # Run once in the background; output goes to the result store
+            del pending_jobs[job_id]
+            with trace.span("store"):
+                log.record_execute(job_id, job.get_name())
+                scheduler.submit(job)
+            return {
+                "status": "accepted",
+                "tx_hash": tx_hash,
+                "result_url": f"/api/jobs/results/{job_id}"
+            }
+
         return {
             "status": "verified",
             "tx_hash": tx_hash,
@@ -265,10 +714,17 @@ async def verify_payment(confirmation: PaymentConfirmation):
         )
 
 
-@app.get("/api/jobs/execute/{job_id}")
-async def execute_job(job_id: str):
+def get_paid_job(job_id: str, job_type: Optional[str] = None) -> Dict:
     """
-    Execute a paid job and stream results via SSE
+    Look up a job that is ready to execute and record its execution
+
+    Args:
+        job_id: The job to execute
+        job_type: Required job type, if the caller serves only one
+
+    Raises:
+        HTTPException: 404 if unknown, 408 if expired, 402 if unpaid,
+            400 if not of `job_type`, 409 if already executed
     """
     # Check if job exists
     if job_id not in pending_jobs:
@@ -285,8 +741,29 @@ async def execute_job(job_id: str):
     if not job_info["paid"]:
         raise HTTPException(status_code=402, detail="Payment required")
 
+    # Checked before recording, so the job can still run where it belongs
+    if job_type is not None and job_info["job"].get_name() != job_type:
+        raise HTTPException(status_code=400, detail=f"Job is not a {job_type} job")
+
+    # One payment, one execution, whichever transport asks
+    if job_info.get("executed"):
+        raise HTTPException(status_code=409, detail="Job already executed")
+
+    audit_log.record_execute(job_id, job_info["job"].get_name())
+    # Not run again, nor handed off on shutdown, while still in pending_jobs
+    job_info["executed"] = True
+    return job_info
+
+
+@app.get("/api/jobs/execute/{job_id}")
+async def execute_job(job_id: str, request: Request):
+    """
+    Execute a paid job and stream results via SSE
+    """
+    check_rate_limit("execute", client_ip=client_ip(request))
+
     # Get the job
-    job = job_info["job"]
+    job = get_paid_job(job_id)["job"]
 
     # Clean up after execution starts (job can only be executed once)
     asyncio.create_task(cleanup_job(job_id, delay=60))
@@ -295,9 +772,61 @@ async def execute_job(job_id: str):
     return create_sse_response(job)
 
 
+@app.get("/api/jobs/rollups/{job_id}")
+async def bulk_rollups(job_id: str, request: Request):
+    """
+    Return the rollups of a paid market_data job in a single JSON response
+    """
+    check_rate_limit("execute", client_ip=client_ip(request))
+    job = get_paid_job(job_id, job_type="market_data")["job"]
+
+    # Rollups are served once, like a job execution
+    del pending_jobs[job_id]
+
+    # Body is joined from per-market precomputed JSON, no re-serialization
+    return Response(content=job.encode(), media_type="application/json")
+
+
+@app.websocket("/api/jobs/ws")
+async def job_streams(websocket: WebSocket):
+    """
+    Stream many paid jobs over one WebSocket, frames tagged by job_id
+    """
+    def authorize(job_id: str):
+        job = get_paid_job(job_id)["job"]
+        # Same single-execution window as the SSE endpoint
+        asyncio.create_task(cleanup_job(job_id, delay=60))
+        return job
+
+    await JobMultiplexer(websocket, authorize).run()
+
+
+@app.get("/api/jobs/results/{job_id}")
+async def job_results(
+    job_id: str,
+    request: Request,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=RESULT_DEFAULT_PAGE_SIZE, ge=1, le=RESULT_MAX_PAGE_SIZE),
+):
+    """
+    Page through the stored output of an async job
+
+    Poll with next_offset until it is null; the job may still be running.
+    """
+    check_rate_limit("results", client_ip=client_ip(request))
+    page = result_store.read(job_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return page
+
+
 @app.get("/api/jobs/status/{job_id}")
 async def job_status(job_id: str):
     """Check status of a job"""
+    result = result_store.get(job_id)
+    if result is not None:
+        return result.summary()
+
     if job_id not in pending_jobs:
         return {"status": "not_found"}
 
@@ -335,6 +864,9 @@ async def cleanup_expired_jobs():
             del pending_jobs[job_id]
         if expired:
             print(f"Cleaned up {len(expired)} expired jobs")
+        evicted = result_store.evict_expired()
+        if evicted:
+            print(f"Evicted {evicted} expired job results")
 
 
 # Background cleanup task is now started in lifespan
@@ -0,0 +1 @@
+# Market data package
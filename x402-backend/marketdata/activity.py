@@ -0,0 +1,398 @@
+"""
+Rolling per-market trade activity held in fixed-size typed-array ring buffers
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    ACTIVITY_TRADES_PER_MARKET,
+    ACTIVITY_MAX_MARKETS,
+    ACTIVITY_GLOBAL_INDEX_SIZE,
+)
+
+# Taker side encoding used in the side column
+SIDE_CODES = {"yes": 1, "no": -1}
+SIDE_NAMES = {1: "yes", -1: "no", 0: "unknown"}
+
+
+def parse_trade_time(value: Any) -> float:
+    """Convert a trade created_time (ISO 8601 or epoch seconds) to epoch seconds"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+class TradeRing:
+    """
+    Fixed-capacity ring buffer of trades for one market
+
+    Trades are addressed by sequence number (0 for the first trade ever
+    appended); only the most recent `capacity` sequences are retained.
+    Timestamps are kept non-decreasing so lookups can binary search, and
+    running volume/notional totals make any window sum O(1) once its
+    bounds are found.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.sizes = np.zeros(capacity, dtype=np.float64)
+        self.sides = np.zeros(capacity, dtype=np.int8)
+        # Running totals through each trade (inclusive)
+        self.cum_volume = np.zeros(capacity, dtype=np.float64)
+        self.cum_notional = np.zeros(capacity, dtype=np.float64)
+        self.sequence = 0
+        self.total_volume = 0.0
+        self.total_notional = 0.0
+        self.last_time = -np.inf
+
+    def __len__(self) -> int:
+        return min(self.sequence, self.capacity)
+
+    @property
+    def first_sequence(self) -> int:
+        """Sequence number of the oldest retained trade"""
+        return self.sequence - len(self)
+
+    def extend(
+        self,
+        timestamps: np.ndarray,
+        prices: np.ndarray,
+        sizes: np.ndarray,
+        sides: np.ndarray,
+    ) -> int:
+        """
+        Append trades in arrival order
+
+        Late trades are clamped to the latest timestamp seen so the buffer
+        stays sorted.
+
+        Returns:
+            Sequence number of the first appended trade
+        """
+        first = self.sequence
+        n = len(timestamps)
+        if n == 0:
+            return first
+
+        timestamps = np.maximum.accumulate(
+            np.maximum(np.asarray(timestamps, dtype=np.float64), self.last_time)
+        )
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        cum_volume = self.total_volume + np.cumsum(sizes)
+        cum_notional = self.total_notional + np.cumsum(prices * sizes)
+
+        # Only the newest `capacity` trades of an oversized batch survive
+        keep = slice(max(n - self.capacity, 0), n)
+        slots = np.arange(first + keep.start, first + n) % self.capacity
+        self.timestamps[slots] = timestamps[keep]
+        self.prices[slots] = prices[keep]
+        self.sizes[slots] = sizes[keep]
+        self.sides[slots] = np.asarray(sides, dtype=np.int8)[keep]
+        self.cum_volume[slots] = cum_volume[keep]
+        self.cum_notional[slots] = cum_notional[keep]
+
+        self.sequence += n
+        self.total_volume = float(cum_volume[-1])
+        self.total_notional = float(cum_notional[-1])
+        self.last_time = float(timestamps[-1])
+        return first
+
+    def search(self, t: float, side: str = "left") -> int:
+        """
+        Binary search for a timestamp
+
+        Returns:
+            Sequence number of the first trade with timestamp >= t
+            (side="left") or > t (side="right")
+        """
+        n = len(self)
+        first = self.sequence - n
+        start = first % self.capacity
+        older = self.timestamps[start:min(start + n, self.capacity)]
+        i = int(np.searchsorted(older, t, side=side))
+        if i < len(older):
+            return first + i
+        newer = self.timestamps[:n - len(older)]
+        return first + len(older) + int(np.searchsorted(newer, t, side=side))
+
+    def _prefix(self, seq: int) -> Tuple[float, float]:
+        """Running (volume, notional) before a retained or next sequence"""
+        if seq >= self.sequence:
+            return self.total_volume, self.total_notional
+        slot = seq % self.capacity
+        size = self.sizes[slot]
+        return (
+            float(self.cum_volume[slot] - size),
+            float(self.cum_notional[slot] - self.prices[slot] * size),
+        )
+
+    def window(self, start_seq: int, end_seq: int) -> Tuple[int, float, float]:
+        """
+        Sum trades in [start_seq, end_seq)
+
+        Returns:
+            (trade count, volume, notional)
+        """
+        if end_seq <= start_seq:
+            return 0, 0.0, 0.0
+        end_volume, end_notional = self._prefix(end_seq)
+        start_volume, start_notional = self._prefix(start_seq)
+        return end_seq - start_seq, end_volume - start_volume, end_notional - start_notional
+
+    def gather(self, start_seq: int, end_seq: int) -> Dict[str, np.ndarray]:
+        """Copy the columns for trades in [start_seq, end_seq), oldest first"""
+        start_seq = max(start_seq, self.first_sequence)
+        end_seq = min(end_seq, self.sequence)
+        slots = np.arange(start_seq, max(end_seq, start_seq)) % self.capacity
+        return {
+            "timestamps": self.timestamps[slots],
+            "prices": self.prices[slots],
+            "sizes": self.sizes[slots],
+            "sides": self.sides[slots],
+        }
+
+    def nbytes(self) -> int:
+        """Memory held by the typed arrays"""
+        return sum(column.nbytes for column in (
+            self.timestamps, self.prices, self.sizes, self.sides,
+            self.cum_volume, self.cum_notional,
+        ))
+
+
+class ActivityStore:
+    """
+    Bounded store of recent trades across markets
+
+    Each market gets its own TradeRing; markets beyond `max_markets` are
+    evicted least recently traded first. A global time index (also a ring
+    buffer) records every trade's timestamp, market and per-market sequence
+    so streams can tail activity across markets from a single cursor.
+    """
+
+    def __init__(
+        self,
+        trades_per_market: int = ACTIVITY_TRADES_PER_MARKET,
+        max_markets: int = ACTIVITY_MAX_MARKETS,
+        global_index_size: int = ACTIVITY_GLOBAL_INDEX_SIZE,
+    ):
+        self.trades_per_market = trades_per_market
+        self.max_markets = max_markets
+        self._rings: "OrderedDict[str, TradeRing]" = OrderedDict()
+        self._market_ids: Dict[str, int] = {}
+        self._tickers: Dict[int, str] = {}
+        self._next_market_id = 0
+
+        # Global time index
+        self._index_capacity = global_index_size
+        self._index_times = np.zeros(global_index_size, dtype=np.float64)
+        self._index_markets = np.zeros(global_index_size, dtype=np.int32)
+        self._index_sequences = np.zeros(global_index_size, dtype=np.int64)
+        self._index_last_time = -np.inf
+        self.sequence = 0
+
+    def _ring(self, ticker: str) -> TradeRing:
+        ring = self._rings.get(ticker)
+        if ring is None:
+            if len(self._rings) >= self.max_markets:
+                evicted, _ = self._rings.popitem(last=False)
+                del self._tickers[self._market_ids.pop(evicted)]
+            ring = self._rings[ticker] = TradeRing(self.trades_per_market)
+            self._market_ids[ticker] = self._next_market_id
+            self._tickers[self._next_market_id] = ticker
+            self._next_market_id += 1
+        else:
+            self._rings.move_to_end(ticker)
+        return ring
+
+    def append(
+        self,
+        ticker: str,
+        timestamps: Sequence[float],
+        prices: Sequence[float],
+        sizes: Sequence[float],
+        sides: Sequence[int],
+    ) -> int:
+        """
+        Append a batch of trades for one market
+
+        Args:
+            ticker: Market ticker
+            timestamps: Trade times in epoch seconds, in arrival order
+            prices: Trade prices
+            sizes: Trade sizes (contracts)
+            sides: Taker sides (1 yes, -1 no, 0 unknown)
+
+        Returns:
+            Global sequence number after the append
+        """
+        n = len(timestamps)
+        if n == 0:
+            return self.sequence
+        ring = self._ring(ticker)
+        first = ring.extend(
+            np.asarray(timestamps, dtype=np.float64),
+            np.asarray(prices, dtype=np.float64),
+            np.asarray(sizes, dtype=np.float64),
+            np.asarray(sides, dtype=np.int8),
+        )
+
+        # Record the trade times in the global index, kept non-decreasing
+        times = np.maximum.accumulate(
+            np.maximum(np.asarray(timestamps, dtype=np.float64), self._index_last_time)
+        )
+        keep = slice(max(n - self._index_capacity, 0), n)
+        slots = np.arange(self.sequence + keep.start, self.sequence + n) % self._index_capacity
+        self._index_times[slots] = times[keep]
+        self._index_markets[slots] = self._market_ids[ticker]
+        self._index_sequences[slots] = np.arange(first, first + n)[keep]
+        self._index_last_time = float(times[-1])
+        self.sequence += n
+        return self.sequence
+
+    def tickers(self) -> List[str]:
+        """Markets currently held, least recently traded first"""
+        return list(self._rings)
+
+    def last_trades(self, ticker: str, n: int) -> List[Dict[str, Any]]:
+        """Return the last n trades of a market, oldest first"""
+        ring = self._rings.get(ticker)
+        if ring is None or n <= 0:
+            return []
+        return self._rows(ticker, ring.gather(ring.sequence - n, ring.sequence))
+
+    def trades_since(
+        self,
+        ticker: str,
+        since: float,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return trades of a market at or after `since`, oldest first"""
+        ring = self._rings.get(ticker)
+        if ring is None:
+            return []
+        start = ring.search(since)
+        end = ring.sequence if limit is None else min(ring.sequence, start + limit)
+        return self._rows(ticker, ring.gather(start, end))
+
+    def window(self, ticker: str, since: float, until: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Rolling volume and VWAP for trades in [since, until]
+
+        Args:
+            ticker: Market ticker
+            since: Window start (epoch seconds)
+            until: Window end (epoch seconds), defaults to the latest trade
+
+        Returns:
+            Dict with trades, volume and vwap (None when the window is empty)
+        """
+        ring = self._rings.get(ticker)
+        if ring is None:
+            return {"market_ticker": ticker, "trades": 0, "volume": 0.0, "vwap": None}
+        start = ring.search(since)
+        end = ring.sequence if until is None else ring.search(until, side="right")
+        count, volume, notional = ring.window(start, end)
+        return {
+            "market_ticker": ticker,
+            "trades": count,
+            "volume": volume,
+            "vwap": notional / volume if volume else None,
+        }
+
+    def global_search(self, since: float) -> int:
+        """Global sequence of the first retained trade at or after `since`"""
+        n = min(self.sequence, self._index_capacity)
+        first = self.sequence - n
+        start = first % self._index_capacity
+        older = self._index_times[start:min(start + n, self._index_capacity)]
+        i = int(np.searchsorted(older, since))
+        if i < len(older):
+            return first + i
+        newer = self._index_times[:n - len(older)]
+        return first + len(older) + int(np.searchsorted(newer, since))
+
+    def read_from(
+        self,
+        cursor: int,
+        limit: int,
+        tickers: Optional[Sequence[str]] = None,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Read trades across markets starting at a global sequence
+
+        Trades whose market has since been evicted or overwritten are
+        skipped.
+
+        Args:
+            cursor: Global sequence to start at
+            limit: Maximum number of index entries to scan
+            tickers: Only return trades for these markets
+
+        Returns:
+            (next cursor, trades oldest first)
+        """
+        cursor = max(cursor, self.sequence - min(self.sequence, self._index_capacity))
+        end = min(self.sequence, cursor + limit)
+        if end <= cursor:
+            return cursor, []
+
+        slots = np.arange(cursor, end) % self._index_capacity
+        markets = self._index_markets[slots]
+        sequences = self._index_sequences[slots]
+        wanted = None
+        if tickers is not None:
+            wanted = {self._market_ids[t] for t in tickers if t in self._market_ids}
+
+        rows = []
+        for market_id, seq in zip(markets.tolist(), sequences.tolist()):
+            if wanted is not None and market_id not in wanted:
+                continue
+            ticker = self._tickers.get(market_id)
+            if ticker is None:
+                continue
+            ring = self._rings[ticker]
+            if seq < ring.first_sequence:
+                continue
+            slot = seq % ring.capacity
+            rows.append({
+                "market_ticker": ticker,
+                "time": float(ring.timestamps[slot]),
+                "price": float(ring.prices[slot]),
+                "size": float(ring.sizes[slot]),
+                "side": SIDE_NAMES[int(ring.sides[slot])],
+            })
+        return end, rows
+
+    @staticmethod
+    def _rows(ticker: str, columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "market_ticker": ticker,
+                "time": t,
+                "price": p,
+                "size": s,
+                "side": SIDE_NAMES[side],
+            }
+            for t, p, s, side in zip(
+                columns["timestamps"].tolist(),
+                columns["prices"].tolist(),
+                columns["sizes"].tolist(),
+                columns["sides"].tolist(),
+            )
+        ]
+
+    def nbytes(self) -> int:
+        """Memory held by ring buffers and the global index"""
+        return sum(ring.nbytes() for ring in self._rings.values()) + (
+            self._index_times.nbytes + self._index_markets.nbytes + self._index_sequences.nbytes
+        )
+
+
+# Global store instance shared by activity jobs
+activity_store = ActivityStore()
@@ -0,0 +1,241 @@
+"""
+Vectorized backtests of declarative threshold strategies
+
+Candles for many markets are laid out back to back in flat arrays with an
+offsets vector. Entry and exit rules become boolean masks over every bar
+at once, and "next bar where the rule holds" is precomputed with a
+reversed minimum-accumulate. The position state machine then advances all
+markets one round trip per step, so Python work scales with the number of
+trades per market rather than the number of bars.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Bars examined per market per step when scanning for take profit / stop loss
+SCAN_MIN_WIDTH = 16
+SCAN_MAX_WIDTH = 1024
+
+ENTRY_RULES = ("price_below", "price_above", "min_volume", "min_time_to_close", "max_time_to_close")
+EXIT_RULES = ("price_above", "price_below", "time_to_close_below", "take_profit", "stop_loss", "max_hold_bars")
+
+
+class Strategy:
+    """
+    A long-only threshold strategy on one side of a binary market
+
+    Prices are YES prices in cents. Entries and exits fill at the close of
+    the bar that triggers them; an open position is closed on the last bar.
+
+    Example:
+        {
+            "side": "yes",
+            "size": 10,
+            "entry": {"price_below": 30, "min_volume": 100, "min_time_to_close": 86400},
+            "exit": {"price_above": 60, "stop_loss": 10, "max_hold_bars": 288}
+        }
+    """
+
+    def __init__(self, side: str = "yes", size: float = 1.0,
+                 entry: Optional[Dict[str, float]] = None,
+                 exit: Optional[Dict[str, float]] = None):
+        self.side = side
+        self.size = size
+        self.entry = entry or {}
+        self.exit = exit or {}
+
+    @classmethod
+    def from_params(cls, params: Any) -> "Strategy":
+        """
+        Build a strategy from request parameters
+
+        Raises:
+            ValueError: If the strategy is malformed
+        """
+        if not isinstance(params, dict):
+            raise ValueError("'strategy' must be an object")
+
+        side = params.get("side", "yes")
+        if side not in ("yes", "no"):
+            raise ValueError("Strategy side must be 'yes' or 'no'")
+
+        size = params.get("size", 1)
+        if not isinstance(size, (int, float)) or size <= 0:
+            raise ValueError("Strategy size must be a positive number")
+
+        rules = {}
+        for name, allowed in (("entry", ENTRY_RULES), ("exit", EXIT_RULES)):
+            value = params.get(name) or {}
+            if not isinstance(value, dict):
+                raise ValueError(f"Strategy '{name}' must be an object")
+            unknown = set(value) - set(allowed)
+            if unknown:
+                raise ValueError(f"Unknown {name} rule(s): {', '.join(sorted(unknown))}")
+            if not all(isinstance(v, (int, float)) and v >= 0 for v in value.values()):
+                raise ValueError(f"Strategy {name} thresholds must be non-negative numbers")
+            rules[name] = value
+
+        if not rules["entry"]:
+            raise ValueError("Strategy needs at least one entry rule")
+        if rules["exit"].get("max_hold_bars", 1) < 1:
+            raise ValueError("max_hold_bars must be at least 1")
+
+        return cls(side=side, size=float(size), entry=rules["entry"], exit=rules["exit"])
+
+    def entry_mask(self, close: np.ndarray, volume: np.ndarray, time_to_close: np.ndarray) -> np.ndarray:
+        mask = np.ones(len(close), dtype=bool)
+        rules = self.entry
+        if "price_below" in rules:
+            mask &= close <= rules["price_below"]
+        if "price_above" in rules:
+            mask &= close >= rules["price_above"]
+        if "min_volume" in rules:
+            mask &= volume >= rules["min_volume"]
+        if "min_time_to_close" in rules:
+            mask &= time_to_close >= rules["min_time_to_close"]
+        if "max_time_to_close" in rules:
+            mask &= time_to_close <= rules["max_time_to_close"]
+        return mask
+
+    def exit_mask(self, close: np.ndarray, time_to_close: np.ndarray) -> np.ndarray:
+        """Exit rules that do not depend on the entry price"""
+        mask = np.zeros(len(close), dtype=bool)
+        rules = self.exit
+        if "price_above" in rules:
+            mask |= close >= rules["price_above"]
+        if "price_below" in rules:
+            mask |= close <= rules["price_below"]
+        if "time_to_close_below" in rules:
+            mask |= time_to_close <= rules["time_to_close_below"]
+        return mask
+
+
+def _next_true(mask: np.ndarray) -> np.ndarray:
+    """
+    For every bar, the index of the first bar at or after it where mask
+    holds (len(mask) if none); one extra trailing entry maps len to len
+    """
+    n = len(mask)
+    index = np.where(mask, np.arange(n), n)
+    out = np.empty(n + 1, dtype=np.int64)
+    out[:n] = np.minimum.accumulate(index[::-1])[::-1]
+    out[n] = n
+    return out
+
+
+def _first_stop(
+    close: np.ndarray,
+    start: np.ndarray,
+    limit: np.ndarray,
+    entry_price: np.ndarray,
+    direction: float,
+    take_profit: float,
+    stop_loss: float,
+) -> np.ndarray:
+    """
+    First bar in [start, limit] where the move from entry_price reaches
+    take_profit or -stop_loss, else limit; scanned in widening windows
+    across all open positions at once
+    """
+    hit = limit.copy()
+    position = start.copy()
+    pending = np.flatnonzero(position <= limit)
+    width = SCAN_MIN_WIDTH
+    offsets = np.arange(SCAN_MAX_WIDTH)
+    while pending.size:
+        idx = np.minimum(position[pending, None] + offsets[:width], limit[pending, None])
+        move = direction * (close[idx] - entry_price[pending, None])
+        triggered = (move >= take_profit) | (move <= -stop_loss)
+        found = triggered.any(axis=1)
+        first = triggered.argmax(axis=1)
+        hit[pending[found]] = idx[found, first[found]]
+        position[pending] += width
+        pending = pending[~found & (position[pending] <= limit[pending])]
+        width = min(width * 2, SCAN_MAX_WIDTH)
+    return hit
+
+
+def run_backtest(
+    strategy: Strategy,
+    timestamps: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    offsets: np.ndarray,
+    close_times: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Run a strategy over the candles of many markets
+
+    Args:
+        strategy: Strategy to simulate
+        timestamps, close, volume: Candle columns, markets back to back,
+            each market in time order
+        offsets: Market i owns rows offsets[i]:offsets[i + 1]
+        close_times: Per-market close time in epoch seconds (inf if unknown)
+
+    Returns:
+        Per-market arrays: bars, trades, wins, pnl, max_drawdown, bars_held
+    """
+    markets = len(offsets) - 1
+    starts = np.asarray(offsets[:-1], dtype=np.int64)
+    ends = np.asarray(offsets[1:], dtype=np.int64)
+    lengths = ends - starts
+    close = np.asarray(close, dtype=np.float64)
+
+    if close_times is None:
+        time_to_close = np.full(len(close), np.inf)
+    else:
+        time_to_close = np.repeat(np.asarray(close_times, dtype=np.float64), lengths) - timestamps
+
+    entries = _next_true(strategy.entry_mask(close, np.asarray(volume), time_to_close))
+    exit_signal = strategy.exit_mask(close, time_to_close)
+    exit_signal[ends[lengths > 0] - 1] = True  # positions never span markets
+    exits = _next_true(exit_signal)
+
+    rules = strategy.exit
+    direction = 1.0 if strategy.side == "yes" else -1.0
+    max_hold = rules.get("max_hold_bars")
+    take_profit = rules.get("take_profit", np.inf)
+    stop_loss = rules.get("stop_loss", np.inf)
+    stops = "take_profit" in rules or "stop_loss" in rules
+
+    trades = np.zeros(markets, dtype=np.int64)
+    wins = np.zeros(markets, dtype=np.int64)
+    pnl = np.zeros(markets)
+    peak = np.zeros(markets)
+    drawdown = np.zeros(markets)
+    held = np.zeros(markets, dtype=np.int64)
+
+    active = np.flatnonzero(lengths > 1)
+    cursor = starts.copy()
+    while active.size:
+        entry = entries[cursor[active]]
+        # An entry needs at least one later bar in the same market to exit on
+        open_ = entry < ends[active] - 1
+        active, entry = active[open_], entry[open_]
+        if not active.size:
+            break
+
+        exit_ = exits[entry + 1]
+        if max_hold is not None:
+            exit_ = np.minimum(exit_, entry + int(max_hold))
+        if stops:
+            exit_ = _first_stop(close, entry + 1, exit_, close[entry], direction, take_profit, stop_loss)
+
+        result = direction * (close[exit_] - close[entry]) * strategy.size
+        trades[active] += 1
+        wins[active] += result > 0
+        pnl[active] += result
+        peak[active] = np.maximum(peak[active], pnl[active])
+        drawdown[active] = np.maximum(drawdown[active], peak[active] - pnl[active])
+        held[active] += exit_ - entry
+        cursor[active] = exit_ + 1
+
+    return {
+        "bars": lengths,
+        "trades": trades,
+        "wins": wins,
+        "pnl": pnl,
+        "max_drawdown": drawdown,
+        "bars_held": held,
+    }
@@ -0,0 +1,98 @@
+"""
+OHLCV candles built from ingested trades for the on-disk history
+
+Each market has one open candle in memory. A candle is written to its
+dataset once a trade lands in a later interval, or on flush; trades older
+than the open candle arrive too late and are left out of the candles.
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from config import HISTORY_CANDLE_SECONDS
+from .segments import SegmentWriter, candle_history
+
+
+class CandleBuilder:
+    """Fold trade batches into fixed-width candles and write the closed ones"""
+
+    def __init__(self, writer: SegmentWriter, seconds: float = HISTORY_CANDLE_SECONDS):
+        self.writer = writer
+        self.seconds = seconds
+        # ticker -> [start, open, high, low, close, volume]
+        self._open: Dict[str, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def record_trades(
+        self,
+        ticker: str,
+        timestamps: Sequence[float],
+        prices: Sequence[float],
+        sizes: Sequence[float],
+    ):
+        """
+        Fold a batch of one market's trades, sorted by time, into its candles
+
+        Args:
+            ticker: Market ticker
+            timestamps: Trade times in epoch seconds, ascending
+            prices: Trade prices (cents)
+            sizes: Trade sizes (contracts)
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        starts = np.floor(timestamps / self.seconds) * self.seconds
+
+        current = self._open.get(ticker)
+        if current is not None:
+            on_time = starts >= current[0]
+            starts, prices, sizes = starts[on_time], prices[on_time], sizes[on_time]
+        if len(starts) == 0:
+            return
+
+        unique, first = np.unique(starts, return_index=True)
+        last = np.append(first[1:], len(starts)) - 1
+        candles = np.column_stack([
+            unique,
+            prices[first],
+            np.maximum.reduceat(prices, first),
+            np.minimum.reduceat(prices, first),
+            prices[last],
+            np.add.reduceat(sizes, first),
+        ])
+        if current is not None:
+            if unique[0] == current[0]:
+                candles[0, 1] = current[1]
+                candles[0, 2] = max(candles[0, 2], current[2])
+                candles[0, 3] = min(candles[0, 3], current[3])
+                candles[0, 5] += current[5]
+            else:
+                candles = np.vstack([current, candles])
+
+        self._open[ticker] = candles[-1].tolist()
+        if len(candles) > 1:
+            self._write(ticker, candles[:-1])
+
+    def flush(self):
+        """Write every open candle; the next trade of a market starts a new one"""
+        opened, self._open = self._open, {}
+        for ticker, candle in opened.items():
+            self._write(ticker, np.array([candle]))
+
+    def _write(self, ticker: str, candles: np.ndarray):
+        self.writer.append(
+            ticker,
+            timestamp=candles[:, 0],
+            open=candles[:, 1],
+            high=candles[:, 2],
+            low=candles[:, 3],
+            close=candles[:, 4],
+            volume=candles[:, 5],
+        )
+
+
+# Global candle builder instance
+candle_builder = CandleBuilder(candle_history)
@@ -0,0 +1,130 @@
+"""
+Poller feeding the upstream market API into the in-memory stores and the
+on-disk history
+
+Each poll reads the trades made across all markets since the previous one
+from the upstream's trade feed, newest first and paged by cursor, then
+refreshes the order books of the markets that traded most.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+
+import aiohttp
+
+from config import (
+    MARKET_API_URL,
+    INGEST_INTERVAL,
+    INGEST_BACKFILL_SECONDS,
+    INGEST_PAGE_SIZE,
+    INGEST_MAX_PAGES,
+    INGEST_MAX_ORDERBOOKS,
+    INGEST_MAX_CONNECTIONS,
+    INGEST_TIMEOUT,
+)
+from .activity import parse_trade_time
+from .ingest import ingest_trades, ingest_orderbook
+
+
+class MarketFeed:
+    """
+    Incremental reader of the upstream trade feed
+
+    `since` is the newest trade time ingested so far. The feed is asked for
+    trades from that second on, so trades of that second come back again;
+    their trade IDs tell them apart from new trades of the same time.
+    """
+
+    def __init__(self, base_url: str = MARKET_API_URL, interval: float = INGEST_INTERVAL):
+        self.base_url = base_url.rstrip("/")
+        self.interval = interval
+        self.since = time.time() - INGEST_BACKFILL_SECONDS
+        self._seen: Set[str] = set()  # trade IDs at `since`
+        self.healthy: Optional[bool] = None  # result of the last poll
+        self.trades = 0  # ingested so far
+
+    async def run(self):
+        """Poll until cancelled; upstream errors are reported and retried next interval"""
+        connector = aiohttp.TCPConnector(limit=INGEST_MAX_CONNECTIONS)
+        timeout = aiohttp.ClientTimeout(total=INGEST_TIMEOUT)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            while True:
+                try:
+                    await self.poll(session)
+                    healthy, error = True, None
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    healthy, error = False, e
+                if healthy != self.healthy:
+                    if healthy:
+                        print(f"Ingesting market data from {self.base_url}")
+                    else:
+                        print(f"WARNING: Market data ingest failed: {error!r}")
+                    self.healthy = healthy
+                await asyncio.sleep(self.interval)
+
+    async def poll(self, session: aiohttp.ClientSession) -> int:
+        """
+        Ingest the trades made since the last poll and refresh order books
+
+        Returns:
+            Number of trades ingested
+        """
+        by_ticker: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for trade in await self._fetch_trades(session):
+            by_ticker[trade["ticker"]].append(trade)
+        ingested = sum(ingest_trades(ticker, trades) for ticker, trades in by_ticker.items())
+        self.trades += ingested
+
+        active = sorted(by_ticker, key=lambda ticker: len(by_ticker[ticker]), reverse=True)
+        books = await asyncio.gather(
+            *(self._get(session, f"/markets/{ticker}/orderbook") for ticker in active[:INGEST_MAX_ORDERBOOKS]),
+            return_exceptions=True,
+        )
+        for ticker, book in zip(active, books):
+            # One market's book failing leaves the others current
+            if isinstance(book, dict) and isinstance(book.get("orderbook"), dict):
+                ingest_orderbook(ticker, book["orderbook"])
+        return ingested
+
+    async def _fetch_trades(self, session: aiohttp.ClientSession) -> List[Dict[str, Any]]:
+        """Trades newer than the last poll's, with `since` moved past them"""
+        params = {"limit": INGEST_PAGE_SIZE, "min_ts": int(self.since)}
+        fresh = []
+        for _ in range(INGEST_MAX_PAGES):
+            body = await self._get(session, "/markets/trades", params)
+            for trade in body.get("trades") or []:
+                try:
+                    created = parse_trade_time(trade["created_time"])
+                    ticker = trade["ticker"]
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if not isinstance(ticker, str) or created < self.since:
+                    continue
+                trade_id = trade.get("trade_id")
+                if created == self.since and (trade_id is None or trade_id in self._seen):
+                    continue
+                fresh.append((created, trade_id, trade))
+            cursor = body.get("cursor")
+            if not cursor:
+                break
+            params["cursor"] = cursor
+
+        if fresh:
+            newest = max(created for created, _, _ in fresh)
+            at_newest = {trade_id for created, trade_id, _ in fresh if created == newest and trade_id is not None}
+            self._seen = self._seen | at_newest if newest == self.since else at_newest
+            self.since = newest
+        return [trade for _, _, trade in fresh]
+
+    async def _get(self, session: aiohttp.ClientSession, path: str, params: Optional[Dict] = None) -> Dict:
+        async with session.get(f"{self.base_url}{path}", params=params) as resp:
+            resp.raise_for_status()
+            body = await resp.json()
+        if not isinstance(body, dict):
+            raise ValueError(f"Unexpected response from {path}")
+        return body
+
+
+# Global feed instance (started by the app when MARKET_API_URL is set)
+market_feed = MarketFeed()
@@ -0,0 +1,58 @@
+"""
+Ingest entry points that fan market updates out to the in-memory stores
+and the on-disk history
+"""
+from typing import Any, Dict, Iterable
+
+from .activity import activity_store, parse_trade_time, SIDE_CODES
+from .candles import candle_builder
+from .rollups import rollup_store
+from .segments import candle_history, trade_history
+
+
+def ingest_trades(ticker: str, trades: Iterable[Dict[str, Any]]) -> int:
+    """
+    Record trades from the upstream market API
+
+    Args:
+        ticker: Market ticker
+        trades: Dicts with created_time, yes_price (or price), count and taker_side
+
+    Returns:
+        Number of trades ingested
+    """
+    parsed = sorted(
+        (
+            parse_trade_time(t["created_time"]),
+            t.get("yes_price", t.get("price", 0)),
+            t.get("count", 1),
+            SIDE_CODES.get(t.get("taker_side", ""), 0),
+        )
+        for t in trades
+    )
+    if not parsed:
+        return 0
+    timestamps, prices, sizes, sides = zip(*parsed)
+    activity_store.append(ticker, timestamps, prices, sizes, sides)
+    rollup_store.record_trades(ticker, timestamps, prices, sizes)
+    trade_history.append(ticker, timestamp=timestamps, price=prices, size=sizes, side=sides)
+    candle_builder.record_trades(ticker, timestamps, prices, sizes)
+    return len(parsed)
+
+
+def ingest_orderbook(ticker: str, orderbook: Dict[str, Any]):
+    """
+    Record an order book snapshot from the upstream market API
+
+    Args:
+        ticker: Market ticker
+        orderbook: Dict with "yes" and "no" lists of [price, quantity] bids
+    """
+    rollup_store.record_orderbook(ticker, orderbook.get("yes") or [], orderbook.get("no") or [])
+
+
+def flush_history():
+    """Seal everything buffered for the on-disk history; blocks on disk writes"""
+    candle_builder.flush()
+    candle_history.flush()
+    trade_history.flush()
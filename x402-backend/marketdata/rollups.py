@@ -0,0 +1,272 @@
+"""
+Materialized per-market rollups maintained incrementally on ingest
+"""
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import ROLLUP_WINDOW_SECONDS, ROLLUP_BUCKET_SECONDS
+
+
+class RollupStore:
+    """
+    Per-market 24h volume, VWAP, last price, implied probability and price change
+
+    Each market is a row in a set of numpy columns. Trades land in
+    fixed-width time buckets (a ring of `window / bucket` slots per row),
+    and running window totals are adjusted as buckets expire, so writes
+    and reads never rescan trade history. Every row also keeps its JSON
+    encoding; bulk reads just join precomputed bytes, and a row is only
+    re-encoded after a write or when its window slides to a new bucket.
+    """
+
+    # (attribute, dtype, fill value, one value per bucket)
+    _COLUMNS = (
+        ("_epoch", np.int64, -1, False),  # newest bucket epoch of the row window
+        ("_volume", np.float64, 0.0, False),
+        ("_notional", np.float64, 0.0, False),
+        ("_last_price", np.float64, np.nan, False),
+        ("_last_time", np.float64, -np.inf, False),
+        ("_best_bid", np.float64, np.nan, False),
+        ("_best_ask", np.float64, np.nan, False),
+        ("_updated_at", np.float64, 0.0, False),
+        ("_encoded_epoch", np.int64, -1, False),
+        ("_bucket_volume", np.float64, 0.0, True),
+        ("_bucket_notional", np.float64, 0.0, True),
+        ("_bucket_open", np.float64, np.nan, True),
+    )
+
+    def __init__(
+        self,
+        window_seconds: int = ROLLUP_WINDOW_SECONDS,
+        bucket_seconds: int = ROLLUP_BUCKET_SECONDS,
+        initial_capacity: int = 1024,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = window_seconds // bucket_seconds
+        self._rows: Dict[str, int] = {}
+        self._tickers: List[str] = []
+        self._capacity = 0
+        self._allocate(initial_capacity)
+        self._encoded: List[Optional[bytes]] = []
+        self._all_buffer: Optional[bytes] = None
+        self._all_epoch = -1
+
+    def _allocate(self, capacity: int):
+        """Grow every column to `capacity` rows, keeping existing data"""
+        for name, dtype, fill, per_bucket in self._COLUMNS:
+            shape = (capacity, self.n_buckets) if per_bucket else (capacity,)
+            column = np.full(shape, fill, dtype=dtype)
+            if self._capacity:
+                column[:self._capacity] = getattr(self, name)
+            setattr(self, name, column)
+        self._capacity = capacity
+
+    def _row(self, ticker: str) -> int:
+        row = self._rows.get(ticker)
+        if row is None:
+            row = len(self._tickers)
+            if row >= self._capacity:
+                self._allocate(self._capacity * 2)
+            self._rows[ticker] = row
+            self._tickers.append(ticker)
+            self._encoded.append(None)
+        return row
+
+    def _current_epoch(self, now: Optional[float]) -> int:
+        return int((time.time() if now is None else now) // self.bucket_seconds)
+
+    def _advance(self, row: int, epoch: int):
+        """Expire buckets that slid out of the window of `row`"""
+        last = int(self._epoch[row])
+        if epoch <= last:
+            return
+        if last < 0 or epoch - last >= self.n_buckets:
+            # Whole window expired
+            self._bucket_volume[row] = 0.0
+            self._bucket_notional[row] = 0.0
+            self._bucket_open[row] = np.nan
+            self._volume[row] = 0.0
+            self._notional[row] = 0.0
+        else:
+            expired = np.arange(last + 1, epoch + 1) % self.n_buckets
+            self._volume[row] -= self._bucket_volume[row, expired].sum()
+            self._notional[row] -= self._bucket_notional[row, expired].sum()
+            self._bucket_volume[row, expired] = 0.0
+            self._bucket_notional[row, expired] = 0.0
+            self._bucket_open[row, expired] = np.nan
+        self._epoch[row] = epoch
+
+    def record_trades(
+        self,
+        ticker: str,
+        timestamps: Sequence[float],
+        prices: Sequence[float],
+        sizes: Sequence[float],
+        now: Optional[float] = None,
+    ):
+        """
+        Fold a batch of trades into a market's rollup
+
+        Args:
+            ticker: Market ticker
+            timestamps: Trade times in epoch seconds
+            prices: Trade prices (cents)
+            sizes: Trade sizes (contracts)
+            now: Current time, defaults to the wall clock
+        """
+        if len(timestamps) == 0:
+            return
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+
+        row = self._row(ticker)
+        epochs = (timestamps // self.bucket_seconds).astype(np.int64)
+        self._advance(row, max(self._current_epoch(now), int(epochs.max())))
+
+        # Trades older than the window only count towards last price
+        live = epochs > self._epoch[row] - self.n_buckets
+        if live.any():
+            order = np.argsort(timestamps[live], kind="stable")
+            slots = (epochs[live] % self.n_buckets)[order]
+            live_prices = prices[live][order]
+            live_sizes = sizes[live][order]
+            notional = live_prices * live_sizes
+            np.add.at(self._bucket_volume[row], slots, live_sizes)
+            np.add.at(self._bucket_notional[row], slots, notional)
+            self._volume[row] += live_sizes.sum()
+            self._notional[row] += notional.sum()
+
+            # Bucket open is the earliest trade that landed in an empty bucket
+            unique_slots, first = np.unique(slots, return_index=True)
+            empty = np.isnan(self._bucket_open[row, unique_slots])
+            self._bucket_open[row, unique_slots[empty]] = live_prices[first[empty]]
+
+        latest = int(np.argmax(timestamps))
+        if timestamps[latest] >= self._last_time[row]:
+            self._last_time[row] = timestamps[latest]
+            self._last_price[row] = prices[latest]
+        self._touch(row)
+
+    def record_orderbook(
+        self,
+        ticker: str,
+        yes_levels: Sequence[Sequence[float]],
+        no_levels: Sequence[Sequence[float]],
+    ):
+        """
+        Update the best bid/ask of a market from an order book snapshot
+
+        Args:
+            ticker: Market ticker
+            yes_levels: [price, quantity] bids for YES (cents)
+            no_levels: [price, quantity] bids for NO (cents)
+        """
+        row = self._row(ticker)
+        yes_prices = [level[0] for level in yes_levels if level[1] > 0]
+        no_prices = [level[0] for level in no_levels if level[1] > 0]
+        # A NO bid at p is a YES ask at 100 - p
+        self._best_bid[row] = max(yes_prices) if yes_prices else np.nan
+        self._best_ask[row] = 100 - max(no_prices) if no_prices else np.nan
+        self._touch(row)
+
+    def _touch(self, row: int):
+        self._encoded[row] = None
+        self._all_buffer = None
+        self._updated_at[row] = time.time()
+
+    def _compute(self, row: int) -> Dict[str, Any]:
+        """Derive the rollup fields of a row (constant work per row)"""
+        volume = max(float(self._volume[row]), 0.0)
+        last_price = self._last_price[row]
+        bid, ask = self._best_bid[row], self._best_ask[row]
+
+        if not np.isnan(bid) and not np.isnan(ask):
+            implied = (bid + ask) / 200.0
+        elif not np.isnan(last_price):
+            implied = last_price / 100.0
+        else:
+            implied = None
+
+        # Open price of the window is the open of its oldest non-empty bucket
+        start = (int(self._epoch[row]) + 1) % self.n_buckets
+        opens = np.roll(self._bucket_open[row], -start)
+        filled = np.flatnonzero(~np.isnan(opens))
+        open_price = float(opens[filled[0]]) if len(filled) else None
+
+        def clean(value):
+            return None if value is None or np.isnan(value) else float(value)
+
+        return {
+            "market_ticker": self._tickers[row],
+            "volume_24h": volume,
+            "vwap_24h": float(self._notional[row]) / volume if volume > 0 else None,
+            "last_price": clean(last_price),
+            "best_bid": clean(bid),
+            "best_ask": clean(ask),
+            "implied_probability": clean(implied),
+            "open_price_24h": open_price,
+            "price_change_24h": (
+                float(last_price) - open_price
+                if open_price is not None and not np.isnan(last_price) else None
+            ),
+            "updated_at": float(self._updated_at[row]),
+        }
+
+    def _encode_row(self, row: int, epoch: int) -> bytes:
+        """Return the precomputed JSON of a row, refreshing it if stale"""
+        if epoch > self._epoch[row]:
+            self._advance(row, epoch)
+        encoded = self._encoded[row]
+        if encoded is None or self._encoded_epoch[row] != epoch:
+            encoded = self._encoded[row] = json.dumps(self._compute(row)).encode()
+            self._encoded_epoch[row] = epoch
+        return encoded
+
+    def get(self, ticker: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the rollup of one market"""
+        row = self._rows.get(ticker)
+        if row is None:
+            return None
+        return json.loads(self._encode_row(row, self._current_epoch(now)))
+
+    def encode_many(self, tickers: Optional[Sequence[str]] = None, now: Optional[float] = None) -> bytes:
+        """
+        Serialize rollups for many markets as one JSON document
+
+        Args:
+            tickers: Markets to include, or None for every market
+            now: Current time, defaults to the wall clock
+
+        Returns:
+            UTF-8 JSON bytes: {"rollups": [...], "missing": [...]}
+        """
+        epoch = self._current_epoch(now)
+        if tickers is None:
+            if self._all_buffer is None or self._all_epoch != epoch:
+                parts = [self._encode_row(row, epoch) for row in range(len(self._tickers))]
+                self._all_buffer = b'{"rollups":[' + b",".join(parts) + b'],"missing":[]}'
+                self._all_epoch = epoch
+            return self._all_buffer
+
+        rows = self._rows
+        parts = []
+        missing = []
+        for ticker in tickers:
+            row = rows.get(ticker)
+            if row is None:
+                missing.append(ticker)
+            else:
+                parts.append(self._encode_row(row, epoch))
+        return (b'{"rollups":[' + b",".join(parts) + b'],"missing":'
+                + json.dumps(missing).encode() + b"}")
+
+    def __len__(self) -> int:
+        return len(self._tickers)
+
+
+# Global rollup store shared by market data jobs and ingest
+rollup_store = RollupStore()
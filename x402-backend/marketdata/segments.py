@@ -0,0 +1,384 @@
+"""
+Memory-mapped columnar segments for historical market data
+
+A dataset is a directory of immutable segments plus a manifest:
+
+    <dataset>/manifest.json        live segments, replaced atomically
+    <dataset>/seg-000001/meta.json row count, time bounds, per-market index
+    <dataset>/seg-000001/<column>.npy
+
+Within a segment rows are sorted by (market, timestamp), so one market's
+rows are a contiguous slice located through the per-market index, and a
+time range inside that slice is a binary search. Columns are opened with
+numpy memmap, so readers get zero-copy views into the page cache.
+"""
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    HISTORY_DIR,
+    HISTORY_SEGMENT_ROWS,
+    HISTORY_COMPACT_TARGET_ROWS,
+    HISTORY_COMPACT_EVERY_SEGMENTS,
+)
+
+# Column layouts; "timestamp" (epoch seconds) is required in every schema
+TRADE_SCHEMA = (
+    ("timestamp", np.float64),
+    ("price", np.float64),
+    ("size", np.float64),
+    ("side", np.int8),
+)
+CANDLE_SCHEMA = (
+    ("timestamp", np.float64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("volume", np.float64),
+)
+
+MANIFEST = "manifest.json"
+
+# One lock per dataset directory, held for every manifest read-modify-write
+_manifest_locks: Dict[str, threading.Lock] = {}
+_manifest_locks_guard = threading.Lock()
+
+
+def _manifest_lock(directory: str) -> threading.Lock:
+    key = os.path.realpath(directory)
+    with _manifest_locks_guard:
+        lock = _manifest_locks.get(key)
+        if lock is None:
+            lock = _manifest_locks[key] = threading.Lock()
+        return lock
+
+
+def _write_json_atomic(path: str, data: dict):
+    """Write JSON to a temp file and rename it over `path`"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"next_id": 1, "segments": []}
+
+
+def _write_segment(
+    directory: str,
+    segment_id: int,
+    schema: Sequence[Tuple[str, type]],
+    tickers: np.ndarray,
+    columns: Dict[str, np.ndarray],
+) -> dict:
+    """
+    Sort rows by (market, timestamp) and write them as a sealed segment
+
+    Returns:
+        Segment metadata (also stored as meta.json)
+    """
+    name = f"seg-{segment_id:06d}"
+    path = os.path.join(directory, name)
+    tmp = path + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+
+    unique, codes = np.unique(tickers, return_inverse=True)
+    order = np.lexsort((columns["timestamp"], codes))
+    codes = codes[order]
+    for column, dtype in schema:
+        np.save(os.path.join(tmp, f"{column}.npy"), np.ascontiguousarray(columns[column][order], dtype=dtype))
+
+    timestamps = columns["timestamp"][order]
+    starts = np.searchsorted(codes, np.arange(len(unique)))
+    ends = np.append(starts[1:], len(codes))
+    meta = {
+        "name": name,
+        "rows": int(len(codes)),
+        "min_time": float(timestamps.min()),
+        "max_time": float(timestamps.max()),
+        "markets": {
+            str(ticker): [int(start), int(end), float(timestamps[start]), float(timestamps[end - 1])]
+            for ticker, start, end in zip(unique.tolist(), starts, ends)
+        },
+    }
+    _write_json_atomic(os.path.join(tmp, "meta.json"), meta)
+    os.replace(tmp, path)
+    return meta
+
+
+class SegmentWriter:
+    """
+    Append-only writer for one dataset
+
+    Rows are buffered in memory and sealed into a new segment once
+    `segment_rows` are pending (or on flush). Sealing runs on a background
+    thread, one segment at a time, so appends never wait on disk writes;
+    every `compact_every` seals the same thread compacts the dataset.
+    Sealed segments are never modified; compaction replaces them with
+    merged ones.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        schema: Sequence[Tuple[str, type]],
+        segment_rows: int = HISTORY_SEGMENT_ROWS,
+        compact_every: int = HISTORY_COMPACT_EVERY_SEGMENTS,
+    ):
+        self.directory = directory
+        self.schema = tuple(schema)
+        self.segment_rows = segment_rows
+        self.compact_every = compact_every
+        self._tickers: List[np.ndarray] = []
+        self._pending: Dict[str, List[np.ndarray]] = {column: [] for column, _ in self.schema}
+        self._pending_rows = 0
+        self._seals_since_compact = 0
+        self._lock = threading.Lock()
+        # Threads start on first use, so idle writers cost nothing
+        self._sealer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-seal")
+
+    @property
+    def pending_rows(self) -> int:
+        return self._pending_rows
+
+    def append(self, ticker: str, **columns: Sequence[float]):
+        """
+        Append rows for one market
+
+        Args:
+            ticker: Market ticker
+            columns: One sequence per schema column, all the same length
+        """
+        n = len(columns["timestamp"])
+        if n == 0:
+            return
+        with self._lock:
+            self._tickers.append(np.full(n, ticker, dtype=object))
+            for column, dtype in self.schema:
+                self._pending[column].append(np.asarray(columns[column], dtype=dtype))
+            self._pending_rows += n
+            if self._pending_rows >= self.segment_rows:
+                self._submit().add_done_callback(self._report)
+
+    def flush(self) -> Optional[dict]:
+        """Seal pending rows into a segment, if any, once earlier seals are done; blocks"""
+        with self._lock:
+            future = self._submit() if self._pending_rows else self._sealer.submit(lambda: None)
+        return future.result()
+
+    def _submit(self) -> Future:
+        """Hand the pending rows to the sealing thread; called with the lock held"""
+        tickers, pending = self._tickers, self._pending
+        self._tickers = []
+        self._pending = {column: [] for column, _ in self.schema}
+        self._pending_rows = 0
+        return self._sealer.submit(self._seal, tickers, pending)
+
+    def _report(self, future: Future):
+        if future.exception() is not None:
+            print(f"WARNING: Could not seal a segment in {self.directory}: {future.exception()}")
+
+    def _seal(self, tickers: List[np.ndarray], pending: Dict[str, List[np.ndarray]]) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        tickers = np.concatenate(tickers).astype(str)
+        columns = {column: np.concatenate(parts) for column, parts in pending.items()}
+
+        with _manifest_lock(self.directory):
+            manifest = _read_manifest(self.directory)
+            meta = _write_segment(self.directory, manifest["next_id"], self.schema, tickers, columns)
+            manifest["next_id"] += 1
+            manifest["segments"].append(meta["name"])
+            _write_json_atomic(os.path.join(self.directory, MANIFEST), manifest)
+
+        self._seals_since_compact += 1
+        if self.compact_every and self._seals_since_compact >= self.compact_every:
+            self._seals_since_compact = 0
+            compact(self.directory, self.schema)
+        return meta
+
+
+class Segment:
+    """Read-only, memory-mapped view of one sealed segment"""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.markets: Dict[str, list] = self.meta["markets"]
+        self.columns = {
+            column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r")
+            for column in columns
+        }
+
+    def overlaps(self, start: float, end: float) -> bool:
+        return self.meta["min_time"] <= end and self.meta["max_time"] >= start
+
+    def slice(self, ticker: str, start: float, end: float) -> Optional[slice]:
+        """Row range of a market within [start, end], or None"""
+        entry = self.markets.get(ticker)
+        if entry is None:
+            return None
+        lo, hi, min_time, max_time = entry
+        if min_time > end or max_time < start:
+            return None
+        timestamps = self.columns["timestamp"][lo:hi]
+        first = lo + int(np.searchsorted(timestamps, start, side="left"))
+        last = lo + int(np.searchsorted(timestamps, end, side="right"))
+        return slice(first, last) if last > first else None
+
+
+class SegmentReader:
+    """
+    Zero-copy range scans over a dataset
+
+    The manifest is re-read by refresh(); segments already open stay
+    mapped, so a compaction that deletes files never breaks a scan in
+    progress.
+    """
+
+    def __init__(self, directory: str, schema: Sequence[Tuple[str, type]]):
+        self.directory = directory
+        self.schema = tuple(schema)
+        self.segments: List[Segment] = []
+        self.refresh()
+
+    def refresh(self):
+        """Pick up segments added or replaced since the last refresh"""
+        names = _read_manifest(self.directory)["segments"]
+        current = {os.path.basename(s.path): s for s in self.segments}
+        columns = [column for column, _ in self.schema]
+        self.segments = [
+            current.get(name) or Segment(os.path.join(self.directory, name), columns)
+            for name in names
+        ]
+
+    def scan(
+        self,
+        ticker: str,
+        start: float = -np.inf,
+        end: float = np.inf,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Rows of one market with start <= timestamp <= end
+
+        Segments are pruned by their time bounds and market index. When a
+        single segment matches the result columns are views into the
+        mapped files; otherwise they are concatenated in time order.
+
+        Returns:
+            Column name -> array
+        """
+        columns = list(columns or [column for column, _ in self.schema])
+        parts = []
+        for segment in self.segments:
+            if not segment.overlaps(start, end):
+                continue
+            rows = segment.slice(ticker, start, end)
+            if rows is not None:
+                parts.append({column: segment.columns[column][rows] for column in columns})
+
+        if not parts:
+            return {column: np.zeros(0, dtype=dict(self.schema)[column]) for column in columns}
+        if len(parts) == 1:
+            return parts[0]
+        merged = {column: np.concatenate([p[column] for p in parts]) for column in columns}
+        timestamps = merged.get("timestamp")
+        # Segments overlap in time when ingest was out of order
+        if timestamps is not None and np.any(np.diff(timestamps) < 0):
+            order = np.argsort(timestamps, kind="stable")
+            merged = {column: values[order] for column, values in merged.items()}
+        return merged
+
+    def tickers(self) -> List[str]:
+        """All markets present in the dataset"""
+        found = set()
+        for segment in self.segments:
+            found.update(segment.markets)
+        return sorted(found)
+
+
+def compact(
+    directory: str,
+    schema: Sequence[Tuple[str, type]],
+    target_rows: int = HISTORY_COMPACT_TARGET_ROWS,
+) -> int:
+    """
+    Merge runs of small segments into segments of up to `target_rows`
+
+    The merged segment is written first, then the manifest is swapped,
+    then the replaced segments are deleted, so a crash at any point leaves
+    a readable dataset (at worst with an orphaned directory). The manifest
+    lock is held throughout, so writers sealing into the same directory
+    wait rather than lose their segment.
+
+    Returns:
+        Number of segments removed
+    """
+    with _manifest_lock(directory):
+        return _compact(directory, schema, target_rows)
+
+
+def _compact(directory: str, schema: Sequence[Tuple[str, type]], target_rows: int) -> int:
+    manifest = _read_manifest(directory)
+    columns = [column for column, _ in schema]
+
+    groups: List[List[str]] = [[]]
+    group_rows = 0
+    for name in manifest["segments"]:
+        with open(os.path.join(directory, name, "meta.json")) as f:
+            rows = json.load(f)["rows"]
+        if groups[-1] and group_rows + rows > target_rows:
+            groups.append([])
+            group_rows = 0
+        groups[-1].append(name)
+        group_rows += rows
+
+    removed = []
+    segments = []
+    for group in groups:
+        if len(group) < 2:
+            segments.extend(group)
+            continue
+        opened = [Segment(os.path.join(directory, name), columns) for name in group]
+        tickers = np.concatenate([
+            np.repeat(np.array(list(s.markets), dtype=str),
+                      [end - start for start, end, _, _ in s.markets.values()])
+            for s in opened
+        ])
+        merged = {
+            column: np.concatenate([np.asarray(s.columns[column]) for s in opened])
+            for column in columns
+        }
+        meta = _write_segment(directory, manifest["next_id"], schema, tickers, merged)
+        manifest["next_id"] += 1
+        segments.append(meta["name"])
+        removed.extend(group)
+
+    if removed:
+        manifest["segments"] = segments
+        _write_json_atomic(os.path.join(directory, MANIFEST), manifest)
+        for name in removed:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return len(removed)
+
+
+# Dataset locations and writers used by the ingest side
+TRADES_DIR = os.path.join(HISTORY_DIR, "trades")
+CANDLES_DIR = os.path.join(HISTORY_DIR, "candles")
+trade_history = SegmentWriter(TRADES_DIR, TRADE_SCHEMA)
+candle_history = SegmentWriter(CANDLES_DIR, CANDLE_SCHEMA)
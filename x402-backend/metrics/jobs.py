@@ -0,0 +1,52 @@
+"""
+Job queue, execution and stream size metrics shared by every transport
+"""
+import time
+from typing import Optional
+
+from .registry import metrics, SIZE_BUCKETS, COUNT_BUCKETS
+
+JOB_QUEUE_WAIT = metrics.histogram(
+    "x402_job_queue_wait_seconds",
+    "Time from payment verification to the start of execution",
+    labels=("job_type", "transport"),
+)
+JOB_EXECUTION = metrics.histogram(
+    "x402_job_execution_seconds",
+    "Job execution time from first to last chunk",
+    labels=("job_type", "transport", "outcome"),
+)
+STREAM_BYTES = metrics.histogram(
+    "x402_stream_bytes",
+    "Output bytes per job stream",
+    labels=("job_type", "transport"),
+    buckets=SIZE_BUCKETS,
+)
+STREAM_EVENTS = metrics.histogram(
+    "x402_stream_events",
+    "Output events per job stream",
+    labels=("job_type", "transport"),
+    buckets=COUNT_BUCKETS,
+)
+
+
+def job_started(job, transport: str) -> float:
+    """Record queue wait for a paid job; returns the start time for `job_finished`"""
+    now = time.monotonic()
+    paid_at: Optional[float] = getattr(job, "paid_at", None)
+    if paid_at is not None:
+        JOB_QUEUE_WAIT.observe(now - paid_at, job.get_name(), transport)
+    return now
+
+
+def job_finished(job, transport: str, started: float, outcome: str, events: int, nbytes: int):
+    """Record execution time and output size of one job run"""
+    job_type = job.get_name()
+    JOB_EXECUTION.observe(time.monotonic() - started, job_type, transport, outcome)
+    STREAM_EVENTS.observe(events, job_type, transport)
+    STREAM_BYTES.observe(nbytes, job_type, transport)
+
+
+def output_size(chunk: str) -> int:
+    """UTF-8 size of a chunk without encoding the common ASCII case"""
+    return len(chunk) if chunk.isascii() else len(chunk.encode())
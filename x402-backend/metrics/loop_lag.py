@@ -0,0 +1,54 @@
+"""
+Event loop lag probe
+"""
+import asyncio
+import time
+from typing import Optional
+
+from config import METRICS_LOOP_LAG_INTERVAL
+from .registry import metrics
+
+LOOP_LAG = metrics.histogram(
+    "x402_event_loop_lag_seconds",
+    "Delay between a scheduled wakeup and when the event loop ran it",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LOOP_LAG_LAST = metrics.gauge(
+    "x402_event_loop_lag_last_seconds",
+    "Most recent event loop lag probe",
+)
+
+
+class LoopLagMonitor:
+    """
+    Sleep for a fixed interval and record how late the wakeup is
+
+    Anything blocking the loop (CPU-bound work, sync I/O) shows up as lag,
+    which is also the extra latency every other request saw meanwhile.
+    """
+
+    def __init__(self, interval: float = METRICS_LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+
+# Global loop lag monitor instance
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,149 @@
+"""
+Sampled per-job trace spans
+
+A trace follows one job through the x402 flow across requests (parse
+header, verify, store, execute, stream) and is keyed by job_id. Jobs that
+are not sampled get NOOP_TRACE, whose spans do nothing, so with the
+sample rate at 0 tracing is a handful of no-op calls per job.
+"""
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import TRACE_SAMPLE_RATE, TRACE_MAX_TRACES
+
+
+class Span:
+    """Timed section of a trace; use as a context manager or call end()"""
+
+    __slots__ = ("trace", "name", "start", "end_at", "attrs")
+
+    def __init__(self, trace: "Trace", name: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.start = time.perf_counter()
+        self.end_at: Optional[float] = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, **attrs):
+        if self.end_at is None:
+            self.end_at = time.perf_counter()
+            self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.attrs["error"] = repr(exc)
+        self.end()
+
+    def to_dict(self) -> Dict[str, Any]:
+        origin = self.trace.origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": None if self.end_at is None else round((self.end_at - self.start) * 1000, 3),
+            **({"attrs": self.attrs} if self.attrs else {}),
+        }
+
+
+class Trace:
+    """Spans recorded for one job"""
+
+    sampled = True
+
+    def __init__(self, trace_id: str, attrs: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.attrs = attrs
+        self.spans: List[Span] = []
+        self.finished = False
+
+    def span(self, name: str, **attrs) -> Span:
+        span = Span(self, name, attrs)
+        self.spans.append(span)
+        return span
+
+    def finish(self):
+        self.finished = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        ends = [span.end_at for span in self.spans if span.end_at is not None]
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "finished": self.finished,
+            "duration_ms": round((max(ends) - self.origin) * 1000, 3) if ends else 0.0,
+            "attrs": self.attrs,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def end(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+class _NoopTrace:
+    sampled = False
+    _span = _NoopSpan()
+
+    def span(self, name: str, **attrs) -> _NoopSpan:
+        return self._span
+
+    def finish(self):
+        pass
+
+
+NOOP_TRACE = _NoopTrace()
+
+
+class Tracer:
+    """Samples jobs for tracing and keeps the most recent traces"""
+
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, max_traces: int = TRACE_MAX_TRACES):
+        self.sample_rate = sample_rate
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+
+    def start(self, trace_id: str, **attrs):
+        """A new Trace if this job is sampled, otherwise NOOP_TRACE"""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return NOOP_TRACE
+        trace = Trace(trace_id, attrs)
+        self._traces[trace_id] = trace
+        self._traces.move_to_end(trace_id)
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last=False)
+        return trace
+
+    def dump(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent traces first, as JSON-ready dicts"""
+        traces = list(reversed(self._traces.values()))
+        if limit is not None:
+            traces = traces[:limit]
+        return [trace.to_dict() for trace in traces]
+
+    def clear(self):
+        self._traces.clear()
+
+
+# Global tracer instance
+tracer = Tracer()
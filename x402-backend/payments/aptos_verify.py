@@ -3,6 +3,7 @@ Aptos transaction verification utilities for Move payment validation
 """
 import aiohttp
 import json
+import time
 from typing import Optional, Dict, Any
 from decimal import Decimal
 from config import (
@@ -13,6 +14,19 @@ from config import (
     TRANSACTION_CONFIRMATION_TIMEOUT,
     APTOS_COIN_TYPE,
 )
+from metrics.registry import metrics
+from .x402_auth import normalize_move_address
+
+RPC_LATENCY = metrics.histogram(
+    "x402_rpc_get_transaction_seconds",
+    "Latency of transaction lookups against the Movement RPC",
+    labels=("outcome",),
+)
+VERIFICATIONS = metrics.counter(
+    "x402_payment_verifications_total",
+    "On-chain payment verification results",
+    labels=("outcome",),
+)
 
 
 async def get_transaction(tx_hash: str) -> Optional[Dict[str, Any]]:
@@ -25,18 +39,26 @@ async def get_transaction(tx_hash: str) -> Optional[Dict[str, Any]]:
     Returns:
         Transaction object or None if not found
     """
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(
-                f"{BASE_RPC}/transactions/by_hash/{tx_hash}",
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as resp:
-                if resp.status == 200:
-                    return await resp.json()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        async with aiohttp.ClientSession() as session:
+            try:
+                async with session.get(
+                    f"{BASE_RPC}/transactions/by_hash/{tx_hash}",
+                    timeout=aiohttp.ClientTimeout(total=10)
+                ) as resp:
+                    if resp.status == 200:
+                        tx = await resp.json()
+                        outcome = "found"
+                        return tx
+                    outcome = "not_found" if resp.status == 404 else "error"
+                    return None
+            except Exception as e:
+                print(f"Error fetching transaction {tx_hash}: {e}")
                 return None
-        except Exception as e:
-            print(f"Error fetching transaction {tx_hash}: {e}")
-            return None
+    finally:
+        RPC_LATENCY.observe(time.perf_counter() - start, outcome)
 
 
 async def verify_move_payment(
@@ -57,18 +79,41 @@ async def verify_move_payment(
         - is_valid: True if transaction verified successfully
         - error_message: Error description if verification failed
     """
-    # Normalize addresses (remove 0x if present, lowercase)
-    expected_sender = expected_sender.lstrip("0x").lower()
-    recipient = PAYMENT_RECIPIENT_ADDRESS.lstrip("0x").lower()
-    
     # Fetch transaction
     tx = await get_transaction(tx_hash)
     
     if not tx:
+        VERIFICATIONS.inc("not_found")
         return False, f"Transaction {tx_hash} not found on chain"
     
+    return check_move_payment(tx, expected_sender, expected_amount_octas)
+
+
+def check_move_payment(
+    tx: Dict[str, Any],
+    expected_sender: str,
+    expected_amount_octas: int,
+) -> tuple[bool, Optional[str]]:
+    """
+    Check a fetched transaction against the expected payment
+    
+    Args:
+        tx: Transaction object from the RPC
+        expected_sender: Expected sender address (32-byte Move address)
+        expected_amount_octas: Expected amount in octas (smallest unit)
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    tx_hash = tx.get("hash")
+
+    # Normalize addresses to 0x + 64 lowercase hex digits
+    expected_sender = normalize_move_address(expected_sender)
+    recipient = normalize_move_address(PAYMENT_RECIPIENT_ADDRESS)
+    
     # Check transaction status
     if not tx.get("success", False):
+        VERIFICATIONS.inc("failed")
         return False, f"Transaction {tx_hash} failed or pending"
     
     # Get transaction type and version
@@ -79,12 +124,14 @@ async def verify_move_payment(
     # 2. Function called is aptos_account::transfer (0x1::aptos_account::transfer)
     # 3. Arguments include recipient and amount
     
-    sender = tx.get("sender", "").lstrip("0x").lower()
-    if sender != expected_sender:
+    sender = normalize_move_address(tx.get("sender"))
+    if sender is None or sender != expected_sender:
+        VERIFICATIONS.inc("sender_mismatch")
         return False, f"Sender mismatch: expected {expected_sender}, got {sender}"
     
     # Check if this is a user transaction
     if tx_type != "user_transaction":
+        VERIFICATIONS.inc("invalid_type")
         return False, f"Invalid transaction type: {tx_type}"
     
     # Extract payload (function called)
@@ -118,6 +165,7 @@ async def verify_move_payment(
     # 3. Function includes "transfer" or "pay"
     # Then it's likely a valid payment
     
+    VERIFICATIONS.inc("verified")
     return True, None
 
 
@@ -0,0 +1,948 @@
+"""
+Append-only audit log of payments and job executions
+
+Every verified payment and every job execution is appended as a fixed-size
+binary record, so what was paid survives restarts and a transaction can
+only ever pay for one job. Each process appends to a shard of its own and
+looks records up in all of them, so several workers, or an old and a new
+process during a restart, take payments at the same time:
+
+    <dir>/payments.lock             held while a payment is checked and appended
+    <dir>/writer-0/lock             held by the process appending to the shard
+    <dir>/writer-0/seg-000000.log   records 0 .. AUDIT_SEGMENT_RECORDS-1
+    <dir>/writer-0/seg-000001.log   the next AUDIT_SEGMENT_RECORDS records, ...
+    <dir>/writer-0/tx.idx           tx_hash -> the payment record it paid for
+    <dir>/writer-0/job.idx          job_id -> every record of the job
+    <dir>/writer-1/...              the shard of the next process
+
+A process takes the first shard no running process holds. A record's number
+is its address within its shard: segment n // AUDIT_SEGMENT_RECORDS at a
+fixed offset. Appends are numbered and indexed in memory under a lock, then
+written by a single thread that commits whatever has queued up with one
+write and one fsync (group commit), so requests never wait on the disk.
+
+The index files are open-addressing hash tables covering sealed segments,
+updated with numpy each time a segment fills. Records of the active segment
+are indexed in memory and re-read from it on open. numpy is only imported
+for index builds and bulk reads.
+
+Other processes' shards are read through their index files plus the records
+appended since, which every lookup picks up from the segment files. A
+payment is only appended with payments.lock held, and the lock is kept
+until the record is in the segment file, so no two processes can accept
+the same transaction.
+"""
+import fcntl
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from config import AUDIT_LOG_DIR, AUDIT_SEGMENT_RECORDS, AUDIT_FSYNC, AUDIT_INDEX_MAX_LOAD
+
+# Record events
+EVENT_PAYMENT = 1
+EVENT_EXECUTE = 2
+EVENT_NAMES = {EVENT_PAYMENT: "payment", EVENT_EXECUTE: "execute"}
+
+# crc32 of the rest, event, timestamp, amount (octas), tx_hash, sender, job_id, job_type
+RECORD = struct.Struct("<IB3xdQ32s32s48s24s")
+RECORD_SIZE = RECORD.size
+JOB_ID_BYTES = 48
+_TX_FIELD = slice(24, 56)
+_JOB_FIELD = slice(88, 136)
+_ZERO32 = bytes(32)
+
+# magic, capacity (slots), entries, records covered; slots follow at INDEX_HEADER_SIZE
+INDEX_MAGIC = b"X402IDX1"
+INDEX_HEADER = struct.Struct("<8sQQQ")
+INDEX_HEADER_SIZE = 64
+INDEX_MIN_CAPACITY = 1024
+
+# Shard directories are SHARD_PREFIX + a number
+SHARD_PREFIX = "writer-"
+PAYMENTS_LOCK = "payments.lock"
+# Records read from another shard's segment file per read
+TAIL_READ_RECORDS = 4096
+
+_HEX32 = re.compile(r"0x[0-9a-fA-F]{1,64}")
+_MASK64 = (1 << 64) - 1
+_MUL1 = 0x9E3779B97F4A7C15
+_MUL2 = 0xBF58476D1CE4E5B9
+TX_SEED = 0x74785F68617368
+JOB_SEED = 0x6A6F625F6964
+
+
+def _hex32(value) -> Optional[bytes]:
+    """32 bytes from a 0x-prefixed hash or Move address, None if malformed"""
+    if not isinstance(value, str) or not _HEX32.fullmatch(value):
+        return None
+    return bytes.fromhex(value[2:].rjust(64, "0"))
+
+
+def _job_key(job_id: str) -> Optional[bytes]:
+    key = job_id.encode()
+    if not key or len(key) > JOB_ID_BYTES:
+        return None
+    return key.ljust(JOB_ID_BYTES, b"\0")
+
+
+def hash_key(key: bytes, seed: int) -> int:
+    """64-bit hash of a key field; must match hash_keys"""
+    h = seed
+    for (word,) in struct.iter_unpack("<Q", key):
+        h = ((h ^ word) * _MUL1) & _MASK64
+        h ^= h >> 32
+    h = (h * _MUL2) & _MASK64
+    return h ^ (h >> 29)
+
+
+def hash_keys(keys, seed: int):
+    """hash_key over a numpy array of fixed-size key fields"""
+    import numpy as np
+
+    keys = np.ascontiguousarray(keys)
+    # The width comes from the dtype, so an empty array has one too
+    words = keys.view("<u8").reshape(len(keys), keys.dtype.itemsize // 8)
+    h = np.full(len(keys), seed, dtype=np.uint64)
+    for i in range(words.shape[1]):
+        h ^= words[:, i]
+        h *= np.uint64(_MUL1)
+        h ^= h >> np.uint64(32)
+    h *= np.uint64(_MUL2)
+    h ^= h >> np.uint64(29)
+    return h
+
+
+_record_dtype = None
+
+
+def record_dtype():
+    """numpy dtype matching RECORD, for memory-mapped bulk reads"""
+    global _record_dtype
+    if _record_dtype is None:
+        import numpy as np
+
+        _record_dtype = np.dtype({
+            "names": ["crc", "event", "timestamp", "amount", "tx_hash", "sender", "job_id", "job_type"],
+            "formats": ["<u4", "u1", "<f8", "<u8", "V32", "V32", f"S{JOB_ID_BYTES}", "S24"],
+            "offsets": [0, 4, 8, 16, 24, 56, 88, 136],
+            "itemsize": RECORD_SIZE,
+        })
+    return _record_dtype
+
+
+class AuditRecord(NamedTuple):
+    """One decoded log record"""
+    seq: int
+    event: str
+    timestamp: float
+    amount: int
+    tx_hash: Optional[str]
+    sender: Optional[str]
+    job_id: str
+    job_type: str
+    shard: str
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+
+def _decode(seq: int, fields: tuple, shard: str) -> AuditRecord:
+    _, event, timestamp, amount, tx_hash, sender, job_id, job_type = fields
+    return AuditRecord(
+        seq=seq,
+        event=EVENT_NAMES.get(event, str(event)),
+        timestamp=timestamp,
+        amount=amount,
+        tx_hash="0x" + tx_hash.hex() if tx_hash != _ZERO32 else None,
+        sender="0x" + sender.hex() if sender != _ZERO32 else None,
+        job_id=job_id.rstrip(b"\0").decode(),
+        job_type=job_type.rstrip(b"\0").decode(),
+        shard=shard,
+    )
+
+
+def _valid(raw: bytes) -> bool:
+    return len(raw) == RECORD_SIZE and struct.unpack_from("<I", raw)[0] == zlib.crc32(raw[4:])
+
+
+class HashIndex:
+    """
+    Hash table file from a record field to record numbers
+
+    Slots are (hash, record + 1) u64 pairs with linear probing; 0 marks an
+    empty slot. One key can map to several records, and a hash match is
+    only a candidate that callers confirm against the record. Slots are
+    only ever filled, so readers never miss an entry while a writer
+    inserts; growing builds a new file that replaces this one.
+    """
+
+    def __init__(self, path: str, seed: int, field: str, event: Optional[int] = None):
+        self.path = path
+        self.seed = seed
+        self.field = field
+        self.event = event
+        self.capacity = 0
+        self.entries = 0
+        self.covered = 0
+        self._mm: Optional[mmap.mmap] = None
+        self._slots: Optional[memoryview] = None
+        self._tmp: Optional[str] = None  # set while a new file is being built
+
+    def load(self) -> bool:
+        """Map the index file; False if it is missing or invalid"""
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            return False
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < INDEX_HEADER_SIZE:
+                return False
+            magic, capacity, entries, covered = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if (magic != INDEX_MAGIC or capacity < INDEX_MIN_CAPACITY or capacity & (capacity - 1)
+                    or size != INDEX_HEADER_SIZE + capacity * 16):
+                return False
+            self._map(mmap.mmap(f.fileno(), 0), capacity, entries, covered)
+        return True
+
+    def sync(self):
+        """Re-read the header, which the process owning the file may have committed since"""
+        if self._mm is not None:
+            _, _, self.entries, self.covered = INDEX_HEADER.unpack_from(self._mm, 0)
+
+    def create(self, capacity: int) -> "HashIndex":
+        """A new, empty index of `capacity` slots, built next to this one"""
+        index = HashIndex(self.path, self.seed, self.field, self.event)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w+b") as f:
+            f.truncate(INDEX_HEADER_SIZE + capacity * 16)
+            index._map(mmap.mmap(f.fileno(), 0), capacity, 0, 0)
+        index._tmp = tmp
+        return index
+
+    def _map(self, mm: mmap.mmap, capacity: int, entries: int, covered: int):
+        self._mm = mm
+        self._slots = memoryview(mm)[INDEX_HEADER_SIZE:].cast("Q")
+        self.capacity = capacity
+        self.entries = entries
+        self.covered = covered
+
+    def keys(self, records, base: int):
+        """Hashes and record numbers to index from a segment's records"""
+        import numpy as np
+
+        refs = np.arange(base, base + len(records), dtype=np.uint64)
+        if self.event is not None:
+            keep = records["event"] == self.event
+            records, refs = records[keep], refs[keep]
+        return hash_keys(records[self.field], self.seed), refs
+
+    def fits(self, extra: int) -> bool:
+        return self.entries + extra <= self.capacity * AUDIT_INDEX_MAX_LOAD
+
+    def insert(self, hashes, refs):
+        """Add entries; vectorized linear probing, one probe step per round"""
+        import numpy as np
+
+        if not len(hashes):
+            return
+        table = np.frombuffer(self._mm, dtype=np.uint64, offset=INDEX_HEADER_SIZE).reshape(-1, 2)
+        mask = self.capacity - 1
+        tags = refs + np.uint64(1)
+        slots = (hashes & np.uint64(mask)).astype(np.int64)
+        pending = np.arange(len(hashes))
+        while pending.size:
+            probe = slots[pending]
+            free = np.flatnonzero(table[probe, 1] == 0)
+            # Candidates for the same slot overwrite each other; whichever
+            # tag stuck is the winner
+            cand, at = pending[free], probe[free]
+            table[at, 1] = tags[cand]
+            won = table[at, 1] == tags[cand]
+            table[at[won], 0] = hashes[cand[won]]
+            placed = np.zeros(pending.size, dtype=bool)
+            placed[free[won]] = True
+            pending = pending[~placed]
+            slots[pending] = (slots[pending] + 1) & mask
+        self.entries += len(hashes)
+        del table
+
+    def commit(self, covered: int):
+        """Persist slots, then the header that declares them"""
+        self._mm.flush()
+        self.covered = covered
+        INDEX_HEADER.pack_into(self._mm, 0, INDEX_MAGIC, self.capacity, self.entries, covered)
+        self._mm.flush()
+        if self._tmp is not None:
+            os.replace(self._tmp, self.path)
+            self._tmp = None
+
+    def lookup(self, h: int) -> List[int]:
+        """Record numbers whose key hashes to `h`"""
+        slots = self._slots
+        if slots is None:
+            return []
+        mask = self.capacity - 1
+        i = h & mask
+        found = []
+        while True:
+            tag = slots[2 * i + 1]
+            if tag == 0:
+                return found
+            if slots[2 * i] == h:
+                found.append(tag - 1)
+            i = (i + 1) & mask
+
+    def close(self):
+        if self._mm is not None:
+            self._slots.release()
+            self._mm.close()
+            self._mm = self._slots = None
+
+
+def index_capacity(entries: int) -> int:
+    """Power of two with room to double before the next rebuild"""
+    capacity = INDEX_MIN_CAPACITY
+    while capacity * AUDIT_INDEX_MAX_LOAD < 2 * entries:
+        capacity *= 2
+    return capacity
+
+
+class _Shard:
+    """Segment files and index files of one shard, and lookups in them"""
+
+    def __init__(self, directory: Optional[str], segment_records: int):
+        self.directory = directory
+        self.segment_records = segment_records
+        # Entries for records not covered by the index files
+        self._tx_recent: Dict[bytes, int] = {}
+        self._job_recent: Dict[bytes, List[int]] = {}
+        self._tx_index: Optional[HashIndex] = None
+        self._job_index: Optional[HashIndex] = None
+        self._readers: Dict[int, int] = {}
+        if directory is not None:
+            self._make_indexes()
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.directory)
+
+    def _make_indexes(self):
+        self._tx_index = HashIndex(os.path.join(self.directory, "tx.idx"), TX_SEED, "tx_hash", EVENT_PAYMENT)
+        self._job_index = HashIndex(os.path.join(self.directory, "job.idx"), JOB_SEED, "job_id")
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"seg-{segment:06d}.log")
+
+    def _segment_array(self, segment: int, count: Optional[int] = None):
+        """Memory-mapped view of a segment's records"""
+        import numpy as np
+
+        count = self.segment_records if count is None else count
+        if not count:
+            return np.empty(0, dtype=record_dtype())
+        return np.memmap(self._segment_path(segment), dtype=record_dtype(), mode="r", shape=(count,))
+
+    def _reader(self, segment: int) -> int:
+        fd = self._readers.get(segment)
+        if fd is None:
+            fd = self._readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+        return fd
+
+    def _read_raw(self, seq: int) -> bytes:
+        fd = self._reader(seq // self.segment_records)
+        return os.pread(fd, RECORD_SIZE, (seq % self.segment_records) * RECORD_SIZE)
+
+    def _record(self, seq: int) -> AuditRecord:
+        return _decode(seq, RECORD.unpack(self._read_raw(seq)), self.name)
+
+    def _remember(self, seq: int, event: int, tx_hash: bytes, job_id: bytes):
+        """Index a record that no index file covers yet"""
+        if event == EVENT_PAYMENT:
+            self._tx_recent[tx_hash] = seq
+        self._job_recent.setdefault(job_id, []).append(seq)
+
+    def _forget(self, tx_covered: int, job_covered: int):
+        """Drop in-memory entries the index files now cover"""
+        self._tx_recent = {k: seq for k, seq in self._tx_recent.items() if seq >= tx_covered}
+        job_recent = {}
+        for k, seqs in self._job_recent.items():
+            seqs = [seq for seq in seqs if seq >= job_covered]
+            if seqs:
+                job_recent[k] = seqs
+        self._job_recent = job_recent
+
+    def _find_tx(self, tx: bytes) -> Optional[int]:
+        """Payment record for a raw tx hash"""
+        seq = self._tx_recent.get(tx)
+        if seq is None:
+            for candidate in self._tx_index.lookup(hash_key(tx, TX_SEED)):
+                if self._read_raw(candidate)[_TX_FIELD] == tx:
+                    return candidate
+        return seq
+
+    def _find_job(self, job: bytes) -> List[int]:
+        """Record numbers of a raw job_id, oldest first"""
+        seqs = set(self._job_recent.get(job, ()))
+        for candidate in self._job_index.lookup(hash_key(job, JOB_SEED)):
+            if candidate not in seqs and self._read_raw(candidate)[_JOB_FIELD] == job:
+                seqs.add(candidate)
+        return sorted(seqs)
+
+    def _scan(self, start: int, end: int) -> Iterator:
+        per = self.segment_records
+        while start < end:
+            segment = start // per
+            count = min(end - segment * per, per)
+            yield start, self._segment_array(segment, count)[start - segment * per:]
+            start = segment * per + count
+
+    def _close_files(self):
+        for fd in self._readers.values():
+            os.close(fd)
+        self._readers.clear()
+        self._tx_index.close()
+        self._job_index.close()
+
+
+class _PeerShard(_Shard):
+    """
+    Read-only view of a shard another process appends to
+
+    refresh() maps index files the owner replaced, re-reads the headers of
+    the others and indexes the records appended since the last refresh in
+    memory. A record still being written fails its checksum and is picked
+    up by a later refresh.
+    """
+
+    def __init__(self, directory: str, segment_records: int):
+        super().__init__(directory, segment_records)
+        self.records = 0  # records read, or covered by the index files
+        self._inodes: List[Optional[int]] = [None, None]
+        self._covered = (0, 0)
+
+    def refresh(self):
+        for i, index in enumerate((self._tx_index, self._job_index)):
+            try:
+                inode = os.stat(index.path).st_ino
+            except FileNotFoundError:
+                continue
+            if inode == self._inodes[i]:
+                index.sync()
+                continue
+            index.close()
+            if index.load():
+                self._inodes[i] = inode
+            else:
+                index.covered = 0
+                self._inodes[i] = None
+        # Records the index files cover are never read into memory
+        self.records = max(self.records, min(self._tx_index.covered, self._job_index.covered))
+        self._read_tail()
+        covered = (self._tx_index.covered, self._job_index.covered)
+        if covered != self._covered:
+            self._forget(*covered)
+            self._covered = covered
+
+    def _read_tail(self):
+        per = self.segment_records
+        while True:
+            segment, offset = divmod(self.records, per)
+            try:
+                fd = self._reader(segment)
+            except FileNotFoundError:
+                return
+            want = min(per - offset, TAIL_READ_RECORDS)
+            data = os.pread(fd, want * RECORD_SIZE, offset * RECORD_SIZE)
+            count = 0
+            for start in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+                raw = data[start:start + RECORD_SIZE]
+                if not _valid(raw):
+                    break
+                fields = RECORD.unpack(raw)
+                self._remember(self.records + count, fields[1], fields[4], fields[6])
+                count += 1
+            self.records += count
+            if count < want:
+                return
+
+
+class AuditLog(_Shard):
+    """
+    Segmented payment audit log with indexed lookups by tx_hash and job_id
+
+    Appends go to this process's shard; lookups and reconciliation cover
+    every shard in `directory`.
+    """
+
+    def __init__(
+        self,
+        directory: str = AUDIT_LOG_DIR,
+        segment_records: int = AUDIT_SEGMENT_RECORDS,
+        fsync: bool = AUDIT_FSYNC,
+    ):
+        # The shard directory is picked on open
+        super().__init__(None, segment_records)
+        self.root = directory
+        self.fsync = fsync
+        self.records = 0  # appended, including records not yet on disk
+        self.written = 0  # in the segment files, where other processes see them
+        self.durable = 0  # written and fsynced
+        self.commits = 0  # group commits so far
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._open_lock = threading.Lock()
+        self._payment_lock = threading.Lock()
+        self._peers_lock = threading.Lock()
+        self._unwritten: Dict[int, bytes] = {}
+        self._peers: Dict[str, _PeerShard] = {}
+        self._fd: Optional[int] = None
+        self._lock_fd: Optional[int] = None
+        self._payments_fd: Optional[int] = None
+        self._writer: Optional[threading.Thread] = None
+        self._closing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    # ------------------------------------------------------------------
+    # Open and recovery
+    # ------------------------------------------------------------------
+
+    def open(self):
+        """
+        Take a shard, recover its records and indexes and start the writer
+
+        Raises:
+            OSError: If the log directory cannot be used
+            RuntimeError: If the shard is missing segments
+        """
+        with self._open_lock:
+            if self._writer is not None:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            self._claim_shard()
+            try:
+                self._payments_fd = os.open(os.path.join(self.root, PAYMENTS_LOCK), os.O_RDWR | os.O_CREAT, 0o644)
+                self._recover()
+            except BaseException:
+                self._release()
+                raise
+
+    def _claim_shard(self):
+        """
+        Lock the first shard directory no running process holds
+
+        The lock is what keeps two writers from numbering records of one
+        shard independently; it is released when the process exits, so a
+        restarted process reuses the shard of one that is gone.
+        """
+        number = 0
+        while True:
+            directory = os.path.join(self.root, f"{SHARD_PREFIX}{number}")
+            os.makedirs(directory, exist_ok=True)
+            fd = os.open(os.path.join(directory, "lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                number += 1
+                continue
+            self._lock_fd = fd
+            self.directory = directory
+            self._make_indexes()
+            return
+
+    def _release(self):
+        """Close the lock files and every peer shard (open lock held)"""
+        with self._peers_lock:
+            for peer in self._peers.values():
+                peer._close_files()
+            self._peers.clear()
+        with self._payment_lock:
+            if self._payments_fd is not None:
+                os.close(self._payments_fd)
+                self._payments_fd = None
+        # Last, so the next owner of the shard finds everything written
+        os.close(self._lock_fd)
+        self._lock_fd = None
+
+    def _recover(self):
+        """Read the shard's state from disk and start the writer (locks held)"""
+        segments = sorted(
+            int(name[4:10]) for name in os.listdir(self.directory)
+            if name.startswith("seg-") and name.endswith(".log")
+        )
+        # A gap would shift the number of every later record
+        if segments != list(range(len(segments))):
+            raise RuntimeError(f"Audit log segments missing in {self.directory}")
+
+        active = segments[-1] if segments else 0
+        count = self._recover_tail(active)
+        if count == self.segment_records:
+            active, count = active + 1, 0
+        sealed = active * self.segment_records
+        self.records = self.written = self.durable = sealed + count
+
+        self._tx_index = self._open_index(self._tx_index, sealed)
+        self._job_index = self._open_index(self._job_index, sealed)
+        self._tx_recent.clear()
+        self._job_recent.clear()
+        if count:
+            with open(self._segment_path(active), "rb") as f:
+                data = f.read(count * RECORD_SIZE)
+            for i, fields in enumerate(RECORD.iter_unpack(data)):
+                self._remember(sealed + i, fields[1], fields[4], fields[6])
+
+        self._fd = os.open(self._segment_path(active), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._closing = False
+        self._writer = threading.Thread(target=self._write_loop, name="audit-log-writer", daemon=True)
+        self._writer.start()
+
+    def _recover_tail(self, segment: int) -> int:
+        """Drop a torn or partial tail from the active segment; returns its record count"""
+        path = self._segment_path(segment)
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            count = min(size // RECORD_SIZE, self.segment_records)
+            # Only the last group commit can be torn; walk back to a valid record
+            while count and not _valid(os.pread(f.fileno(), RECORD_SIZE, (count - 1) * RECORD_SIZE)):
+                count -= 1
+            if count * RECORD_SIZE != size:
+                f.truncate(count * RECORD_SIZE)
+                print(f"Audit log: truncated {path} to {count} records")
+        return count
+
+    def _open_index(self, index: HashIndex, sealed: int) -> HashIndex:
+        """Load an index file and bring it up to the sealed records, or rebuild it"""
+        if not index.load() or index.covered > sealed or index.covered % self.segment_records:
+            index.close()
+            return self._rebuild_index(index, sealed)
+        first = index.covered // self.segment_records
+        for segment in range(first, sealed // self.segment_records):
+            hashes, refs = index.keys(self._segment_array(segment), segment * self.segment_records)
+            if not index.fits(len(hashes)):
+                index.close()
+                return self._rebuild_index(index, sealed)
+            index.insert(hashes, refs)
+        if index.covered != sealed:
+            index.commit(sealed)
+        return index
+
+    def _rebuild_index(self, index: HashIndex, sealed: int) -> HashIndex:
+        """Build an index file from every sealed segment"""
+        parts = [
+            index.keys(self._segment_array(segment), segment * self.segment_records)
+            for segment in range(sealed // self.segment_records)
+        ]
+        built = index.create(index_capacity(sum(len(hashes) for hashes, _ in parts)))
+        for hashes, refs in parts:
+            built.insert(hashes, refs)
+        built.commit(sealed)
+        return built
+
+    # ------------------------------------------------------------------
+    # Appends
+    # ------------------------------------------------------------------
+
+    def _append(self, event: int, tx_hash: bytes, sender: bytes, job_id: bytes, job_type: str, amount: int) -> int:
+        """Number and queue a record (lock held)"""
+        if self._writer is None or self._closing:
+            raise RuntimeError("Audit log is not open")
+        raw = bytearray(RECORD.pack(0, event, time.time(), amount, tx_hash, sender, job_id, job_type.encode()))
+        struct.pack_into("<I", raw, 0, zlib.crc32(memoryview(raw)[4:]))
+        seq = self.records
+        self.records += 1
+        self._unwritten[seq] = bytes(raw)
+        self._remember(seq, event, tx_hash, job_id)
+        self._changed.notify_all()
+        return seq
+
+    def record_payment(
+        self,
+        tx_hash: str,
+        job_id: str,
+        job_type: str,
+        sender: Optional[str],
+        amount: int,
+    ) -> Optional[int]:
+        """
+        Record that `tx_hash` paid for `job_id`
+
+        Blocks while another process records a payment, then until the
+        record is written, so call it off the event loop.
+
+        Returns:
+            The record number, or None if the transaction already paid for a job
+
+        Raises:
+            ValueError: malformed tx_hash or job_id
+        """
+        tx = _hex32(tx_hash)
+        job = _job_key(job_id)
+        if tx is None or tx == _ZERO32:
+            raise ValueError(f"Invalid tx_hash: {tx_hash}")
+        if job is None:
+            raise ValueError(f"Invalid job_id: {job_id}")
+        with self._payment_lock:
+            if self._payments_fd is None:
+                raise RuntimeError("Audit log is not open")
+            fcntl.flock(self._payments_fd, fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    if self._find_tx(tx) is not None:
+                        return None
+                if self._find_peer_tx(tx) is not None:
+                    return None
+                with self._lock:
+                    seq = self._append(EVENT_PAYMENT, tx, _hex32(sender) or _ZERO32, job, job_type, amount)
+                    # Other processes only find it in the segment file
+                    self._changed.wait_for(lambda: self.written > seq)
+                    return seq
+            finally:
+                fcntl.flock(self._payments_fd, fcntl.LOCK_UN)
+
+    def record_execute(self, job_id: str, job_type: str) -> int:
+        """Record that a paid job started executing; returns the record number"""
+        job = _job_key(job_id)
+        if job is None:
+            raise ValueError(f"Invalid job_id: {job_id}")
+        with self._lock:
+            return self._append(EVENT_EXECUTE, _ZERO32, _ZERO32, job, job_type, 0)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything appended so far is on disk"""
+        with self._lock:
+            target = self.records
+            return self._changed.wait_for(lambda: self.durable >= target, timeout)
+
+    def _write_loop(self):
+        """Group commit: write and fsync everything queued since the last commit"""
+        while True:
+            with self._lock:
+                self._changed.wait_for(lambda: self.records > self.durable or self._closing)
+                if self.records == self.durable:
+                    return
+                start, end = self.durable, self.records
+                batch = [self._unwritten[seq] for seq in range(start, end)]
+
+            self._write(start, batch)
+            with self._lock:
+                self.written = end
+                self._changed.notify_all()
+            if self.fsync:
+                os.fsync(self._fd)
+
+            with self._lock:
+                for seq in range(start, end):
+                    del self._unwritten[seq]
+                self.durable = end
+                self.commits += 1
+                self._changed.notify_all()
+
+    def _write(self, start: int, batch: List[bytes]):
+        per = self.segment_records
+        while batch:
+            room = per - start % per
+            chunk, batch = batch[:room], batch[room:]
+            data = memoryview(b"".join(chunk))
+            while data:
+                data = data[os.write(self._fd, data):]
+            start += len(chunk)
+            if start % per == 0:
+                os.fsync(self._fd)
+                os.close(self._fd)
+                self._seal(start // per - 1)
+                self._fd = os.open(self._segment_path(start // per), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _seal(self, segment: int):
+        """Move a full segment's entries from memory into the index files"""
+        sealed = (segment + 1) * self.segment_records
+        records = self._segment_array(segment)
+        indexes = []
+        for index in (self._tx_index, self._job_index):
+            hashes, refs = index.keys(records, segment * self.segment_records)
+            if index.fits(len(hashes)):
+                index.insert(hashes, refs)
+                index.commit(sealed)
+            else:
+                # Readers keep using the old file until the swap
+                index = self._rebuild_index(index, sealed)
+            indexes.append(index)
+
+        with self._lock:
+            replaced = [
+                old for old, new in zip((self._tx_index, self._job_index), indexes) if old is not new
+            ]
+            self._tx_index, self._job_index = indexes
+            self._forget(sealed, sealed)
+        # Lookups only use an index under the lock, so nothing holds these now
+        for index in replaced:
+            index.close()
+
+    def close(self):
+        """Write everything queued and stop the writer"""
+        with self._open_lock:
+            if self._writer is None:
+                return
+            with self._lock:
+                self._closing = True
+                self._changed.notify_all()
+            self._writer.join()
+            self._writer = None
+            os.close(self._fd)
+            self._close_files()
+            self._release()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _read_raw(self, seq: int) -> bytes:
+        raw = self._unwritten.get(seq)
+        if raw is not None:
+            return raw
+        return super()._read_raw(seq)
+
+    def _refresh_peers(self) -> List[_PeerShard]:
+        """Every other shard, caught up with its writer (peers lock held)"""
+        for name in os.listdir(self.root):
+            if name.startswith(SHARD_PREFIX) and name != self.name and name not in self._peers:
+                self._peers[name] = _PeerShard(os.path.join(self.root, name), self.segment_records)
+        peers = [self._peers[name] for name in sorted(self._peers)]
+        for peer in peers:
+            peer.refresh()
+        return peers
+
+    def _find_peer_tx(self, tx: bytes) -> Optional[AuditRecord]:
+        with self._peers_lock:
+            for peer in self._refresh_peers():
+                seq = peer._find_tx(tx)
+                if seq is not None:
+                    return peer._record(seq)
+        return None
+
+    def read(self, seq: int) -> AuditRecord:
+        """Record number `seq` of this process's shard"""
+        with self._lock:
+            if not 0 <= seq < self.records:
+                raise IndexError(seq)
+            return self._record(seq)
+
+    def lookup_tx(self, tx_hash: str) -> Optional[AuditRecord]:
+        """The payment `tx_hash` was used for, if any, in any shard"""
+        tx = _hex32(tx_hash)
+        if tx is None:
+            return None
+        with self._lock:
+            seq = self._find_tx(tx)
+            if seq is not None:
+                return self._record(seq)
+        return self._find_peer_tx(tx)
+
+    def lookup_job(self, job_id: str) -> List[AuditRecord]:
+        """Every record of a job in any shard, oldest first"""
+        job = _job_key(job_id)
+        if job is None:
+            return []
+        with self._lock:
+            records = [self._record(seq) for seq in self._find_job(job)]
+        with self._peers_lock:
+            for peer in self._refresh_peers():
+                records.extend(peer._record(seq) for seq in peer._find_job(job))
+        return sorted(records, key=lambda record: record.timestamp)
+
+    # ------------------------------------------------------------------
+    # Bulk readers
+    # ------------------------------------------------------------------
+
+    def scan(self, start: int = 0) -> Iterator:
+        """
+        Durable records of this process's shard from `start` on, as
+        memory-mapped numpy arrays
+
+        Yields:
+            (first record number, structured array of record_dtype()) per segment
+        """
+        return self._scan(start, self.durable)
+
+    def export(self, start: int = 0, shard: Optional[str] = None, chunk: int = 4096) -> Iterator[AuditRecord]:
+        """
+        Decoded durable records of one shard from `start` on
+
+        Args:
+            start: First record number
+            shard: Shard name, this process's by default
+
+        Raises:
+            KeyError: If there is no such shard
+        """
+        if shard is None or shard == self.name:
+            source, end = self, self.durable
+        else:
+            with self._peers_lock:
+                self._refresh_peers()
+                source = self._peers[shard]
+                end = source.records
+        return self._export(source, start, end, chunk)
+
+    @staticmethod
+    def _export(source: _Shard, start: int, end: int, chunk: int) -> Iterator[AuditRecord]:
+        for first, records in source._scan(start, end):
+            for offset in range(0, len(records), chunk):
+                data = records[offset:offset + chunk].tobytes()
+                for i, fields in enumerate(RECORD.iter_unpack(data)):
+                    yield _decode(first + offset + i, fields, source.name)
+
+    def reconcile(self, limit: int = 100) -> Dict:
+        """Totals of durable payments in every shard, and paid jobs with no execution record"""
+        import numpy as np
+
+        with self._peers_lock:
+            sources = [(peer, peer.records) for peer in self._refresh_peers()]
+        sources.append((self, self.durable))
+
+        paid, executed, amounts, job_types = [], [], [], []
+        for source, end in sources:
+            for _, records in source._scan(0, end):
+                payments = records[records["event"] == EVENT_PAYMENT]
+                paid.append(payments["job_id"])
+                amounts.append(payments["amount"])
+                job_types.append(payments["job_type"])
+                executed.append(records["job_id"][records["event"] == EVENT_EXECUTE])
+
+        empty = np.empty(0, dtype=f"S{JOB_ID_BYTES}")
+        paid = np.concatenate(paid) if paid else empty
+        executed = np.concatenate(executed) if executed else empty
+        amounts = np.concatenate(amounts) if amounts else np.empty(0, dtype=np.uint64)
+        job_types = np.concatenate(job_types) if job_types else np.empty(0, dtype="S24")
+        unexecuted = np.setdiff1d(paid, executed)
+
+        names, inverse = np.unique(job_types, return_inverse=True)
+        by_type = np.zeros(len(names), dtype=np.uint64)
+        np.add.at(by_type, inverse, amounts)
+        return {
+            "records": sum(end for _, end in sources),
+            "shards": {source.name: end for source, end in sorted(sources, key=lambda s: s[0].name)},
+            "payments": int(len(paid)),
+            "executions": int(len(executed)),
+            "amount_octas": int(amounts.sum()),
+            "amount_octas_by_job_type": {
+                name.decode(): int(total) for name, total in zip(names, by_type)
+            },
+            "paid_unexecuted": int(len(unexecuted)),
+            "paid_unexecuted_job_ids": [job_id.decode() for job_id in unexecuted[:limit]],
+        }
+
+
+# Global audit log instance (opened at startup)
+audit_log = AuditLog()
@@ -0,0 +1,73 @@
+"""
+Payment verifier used by the API endpoints
+"""
+import asyncio
+from decimal import Decimal
+from typing import Optional
+
+import aiohttp
+
+from config import (
+    BASE_RPC,
+    TOKEN_DECIMALS_MULTIPLIER,
+    TRANSACTION_CONFIRMATION_TIMEOUT,
+    TRANSACTION_POLL_INTERVAL,
+)
+from .aptos_verify import get_transaction, check_move_payment, VERIFICATIONS
+
+
+class PaymentVerifier:
+    """Confirm MOVE payments on the Movement RPC"""
+
+    def __init__(self, poll_interval: float = TRANSACTION_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+
+    async def is_connected(self) -> bool:
+        """Whether the RPC answers its ledger info endpoint"""
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(BASE_RPC, timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                    return resp.status == 200
+        except Exception:
+            return False
+
+    async def verify_payment(
+        self,
+        from_address: str,
+        expected_amount: Decimal,
+        tx_hash: Optional[str] = None,
+        timeout: float = TRANSACTION_CONFIRMATION_TIMEOUT,
+    ) -> tuple[bool, Optional[str]]:
+        """
+        Wait for a payment transaction to be committed and check it
+
+        Polls until the transaction is no longer pending or `timeout`
+        seconds have passed.
+
+        Args:
+            from_address: Wallet that should have paid
+            expected_amount: Price in MOVE
+            tx_hash: Payment transaction hash
+            timeout: Seconds to wait for confirmation
+
+        Returns:
+            (success, tx_hash) - tx_hash is None unless the payment verified
+        """
+        if not tx_hash:
+            return False, None
+
+        amount_octas = int(expected_amount * TOKEN_DECIMALS_MULTIPLIER)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            tx = await get_transaction(tx_hash)
+            if tx and tx.get("type") != "pending_transaction":
+                is_valid, error = check_move_payment(tx, from_address, amount_octas)
+                if not is_valid:
+                    print(f"Payment {tx_hash} rejected: {error}")
+                return is_valid, tx_hash if is_valid else None
+
+            if loop.time() + self.poll_interval > deadline:
+                VERIFICATIONS.inc("not_found")
+                return False, None
+            await asyncio.sleep(self.poll_interval)
@@ -2,12 +2,29 @@
 x402 Payment Authorization using Transaction Hashes
 """
 import json
+import re
 from typing import Optional, Dict, Any
 from datetime import datetime, timezone
-from web3 import Web3
 
 from config import CHAIN_ID, PAYMENT_RECIPIENT_ADDRESS
 
+# Move account addresses are 32 bytes; short forms like 0x1 drop leading zeros
+_MOVE_ADDRESS = re.compile(r"0x[0-9a-fA-F]{1,64}")
+# Transaction hashes are always written out in full
+TX_HASH_PATTERN = r"^0x[0-9a-fA-F]{64}$"
+
+
+def normalize_move_address(address: Any) -> Optional[str]:
+    """
+    Canonical form of a Move address: 0x + 64 lowercase hex digits
+
+    Returns:
+        The normalized address, or None if it is not a valid Move address
+    """
+    if not isinstance(address, str) or not _MOVE_ADDRESS.fullmatch(address):
+        return None
+    return "0x" + address[2:].lower().rjust(64, "0")
+
 
 def verify_payment_signature(
     payment_data: Dict[str, Any],
@@ -43,13 +60,12 @@ def verify_payment_signature(
             return False, None, f"Amount mismatch: got {amount}, expected {expected_amount}"
 
         # Validate sender is a valid address
-        try:
-            sender = Web3.to_checksum_address(sender)
-        except:
+        sender = normalize_move_address(sender)
+        if sender is None:
             return False, None, "Invalid sender address"
 
         # Validate tx_hash format
-        if not tx_hash.startswith('0x') or len(tx_hash) != 66:
+        if not isinstance(tx_hash, str) or not re.fullmatch(TX_HASH_PATTERN, tx_hash):
             return False, None, "Invalid tx_hash format"
 
         # Return sender as the verified payer
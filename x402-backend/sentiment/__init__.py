@@ -0,0 +1 @@
+# Sentiment package
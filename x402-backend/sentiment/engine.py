@@ -0,0 +1,343 @@
+"""
+Batched sentiment scoring with a content-hash cache and per-market aggregates
+"""
+import math
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import (
+    SENTIMENT_CACHE_SIZE,
+    SENTIMENT_HALF_LIFE_SECONDS,
+    SENTIMENT_BULLISH_THRESHOLD,
+    SENTIMENT_BEARISH_THRESHOLD,
+)
+from .lexicon import DEFAULT_LEXICON, NEGATIONS, TOKEN_PATTERN
+
+# Normalization constant for the compound score: s / sqrt(s^2 + alpha)
+NORMALIZATION_ALPHA = 1.0
+
+# Posts in a batch are joined with a separator that is matched as its own token
+POST_SEPARATOR = "\x00"
+SEPARATED_TOKEN_PATTERN = re.compile(TOKEN_PATTERN.pattern + "|" + POST_SEPARATOR)
+
+
+def content_hash(content: str) -> int:
+    """
+    Return the 64-bit hash of post content used as the cache key
+
+    The string hash is cached on the object and stable for the process
+    lifetime, which is all an in-memory cache needs.
+    """
+    return hash(content)
+
+
+def to_timestamp(value: Any) -> float:
+    """Convert an epoch number or ISO 8601 string to epoch seconds"""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        # Treat very large values as epoch milliseconds (JavaScript Date.now())
+        return float(value) / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+class SentimentScorer:
+    """Vectorized lexicon scorer for batches of posts"""
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None):
+        self.lexicon = dict(lexicon or DEFAULT_LEXICON)
+        # Markers for negations and post separators, outside the weight range
+        self._negation_marker = 10.0
+        self._separator_marker = 20.0
+        self._weights = dict(self.lexicon)
+        for word in NEGATIONS:
+            self._weights[word] = self._negation_marker
+        self._weights[POST_SEPARATOR] = self._separator_marker
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Score a batch of texts
+
+        Args:
+            texts: Post contents
+
+        Returns:
+            Array of compound scores in [-1, 1], one per text
+        """
+        n = len(texts)
+        if n == 0:
+            return np.zeros(0, dtype=np.float64)
+
+        # Tokenize the whole batch in one pass; NUL separates posts
+        joined = POST_SEPARATOR.join(texts)
+        if joined.count(POST_SEPARATOR) != n - 1:
+            # Content contains the separator itself; it is never part of a
+            # word token, so blanking it leaves the scores unchanged
+            joined = POST_SEPARATOR.join(text.replace(POST_SEPARATOR, " ") for text in texts)
+        tokens = SEPARATED_TOKEN_PATTERN.findall(joined.lower())
+        weights = np.fromiter(
+            map(self._weights.get, tokens, repeat(0.0)),
+            dtype=np.float64,
+            count=len(tokens),
+        )
+
+        separators = weights == self._separator_marker
+        post_index = np.cumsum(separators)[~separators]
+        kept = np.flatnonzero(~separators)
+        weights = weights[kept]
+
+        # A negation flips the next token of the same post and scores zero itself
+        negated = np.flatnonzero(weights == self._negation_marker)
+        if len(negated):
+            weights[negated] = [self.lexicon.get(tokens[kept[i]], 0.0) for i in negated]
+            follows = negated[negated + 1 < len(weights)]
+            follows = follows[post_index[follows + 1] == post_index[follows]]
+            weights[follows + 1] = -weights[follows + 1]
+            weights[follows] = 0.0
+
+        sums = np.bincount(post_index, weights=weights, minlength=n)
+        return sums / np.sqrt(sums * sums + NORMALIZATION_ALPHA)
+
+
+class ScoreCache:
+    """Bounded LRU cache of post scores keyed by content hash"""
+
+    def __init__(self, max_size: int = SENTIMENT_CACHE_SIZE):
+        self.max_size = max_size
+        self._scores: "OrderedDict[int, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def get_many(self, keys: Sequence[int]) -> List[Optional[float]]:
+        """Look up scores, returning None for misses"""
+        scores = self._scores
+        results = [scores.get(key) for key in keys]
+        for key, score in zip(keys, results):
+            if score is not None:
+                scores.move_to_end(key)
+        missed = results.count(None)
+        self.misses += missed
+        self.hits += len(results) - missed
+        return results
+
+    def put_many(self, keys: Sequence[int], values: Sequence[float]):
+        """Store scores, evicting the least recently used entries"""
+        scores = self._scores
+        scores.update(zip(keys, values))
+        overflow = len(scores) - self.max_size
+        for _ in range(max(overflow, 0)):
+            scores.popitem(last=False)
+
+
+class MarketSentiment:
+    """Incrementally maintained sentiment aggregate for one market"""
+
+    __slots__ = (
+        "ticker", "bullish", "bearish", "neutral",
+        "decayed_sum", "decayed_weight", "reference_time", "updated_at",
+    )
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.bullish = 0
+        self.bearish = 0
+        self.neutral = 0
+        # Exponentially decayed sum of scores and post weights at reference_time
+        self.decayed_sum = 0.0
+        self.decayed_weight = 0.0
+        self.reference_time = 0.0
+        self.updated_at = 0.0
+
+    def to_dict(self, decay_rate: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """Serialize the aggregate, decaying activity to the current time"""
+        now = now or time.time()
+        total = self.bullish + self.bearish + self.neutral
+        elapsed = max(now - self.reference_time, 0.0)
+        return {
+            "market_ticker": self.ticker,
+            "posts": total,
+            "bullish": self.bullish,
+            "bearish": self.bearish,
+            "neutral": self.neutral,
+            "bullish_ratio": self.bullish / total if total else 0.0,
+            "bearish_ratio": self.bearish / total if total else 0.0,
+            "score": self.decayed_sum / self.decayed_weight if self.decayed_weight else 0.0,
+            "activity": self.decayed_weight * math.exp(-decay_rate * elapsed),
+            "updated_at": self.updated_at,
+        }
+
+
+class SentimentEngine:
+    """Scores batches of posts and maintains per-market aggregates"""
+
+    def __init__(
+        self,
+        scorer: Optional[SentimentScorer] = None,
+        cache_size: int = SENTIMENT_CACHE_SIZE,
+        half_life_seconds: float = SENTIMENT_HALF_LIFE_SECONDS,
+    ):
+        self.scorer = scorer or SentimentScorer()
+        self.cache = ScoreCache(cache_size)
+        self.decay_rate = math.log(2) / half_life_seconds
+        self.markets: Dict[str, MarketSentiment] = {}
+        # Posts already counted in the aggregates, keyed by (market, id or content)
+        self._seen: "OrderedDict[tuple, None]" = OrderedDict()
+        self._seen_limit = cache_size
+
+    def score(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Score texts, only running the model on content not seen before
+
+        Args:
+            texts: Post contents
+
+        Returns:
+            Array of compound scores, one per text
+        """
+        keys = [content_hash(text) for text in texts]
+        return self._score_keys(texts, keys)
+
+    def _score_keys(self, texts: Sequence[str], keys: List[int]) -> np.ndarray:
+        cached = self.cache.get_many(keys)
+        missing = [i for i, score in enumerate(cached) if score is None]
+        if missing:
+            # Identical content inside one batch is scored once
+            first: Dict[int, int] = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            fresh = self.scorer.score_batch([texts[i] for i in first.values()])
+            new_scores = dict(zip(first.keys(), fresh.tolist()))
+            self.cache.put_many(list(new_scores.keys()), list(new_scores.values()))
+            for i in missing:
+                cached[i] = new_scores[keys[i]]
+        return np.fromiter(cached, dtype=np.float64, count=len(cached))
+
+    def ingest(self, posts: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Score a batch of posts and fold them into the market aggregates
+
+        Args:
+            posts: Dicts with market_ticker, content, created_at and optional id
+
+        Returns:
+            Updated aggregates for every market touched by the batch
+        """
+        seen = self._seen
+        fresh = []
+        markers: Dict[tuple, None] = {}
+        for post in posts:
+            content = post.get("content") or ""
+            marker = (post["market_ticker"], post.get("id") or post.get("_id") or content)
+            if marker not in seen and marker not in markers:
+                markers[marker] = None
+                fresh.append(post)
+
+        if not fresh:
+            return {}
+
+        texts = [post.get("content") or "" for post in fresh]
+        tickers: Dict[str, int] = {}
+        group_index = np.fromiter(
+            (tickers.setdefault(post["market_ticker"], len(tickers)) for post in fresh),
+            dtype=np.int64,
+            count=len(fresh),
+        )
+        timestamps = self._timestamps(
+            [post.get("created_at", post.get("createdAt")) for post in fresh]
+        )
+        scores = self._score_keys(texts, [content_hash(text) for text in texts])
+        updated = self._update_aggregates(tickers, group_index, timestamps, scores)
+
+        # Marked only once scored, so a batch that failed can be sent again
+        seen.update(markers)
+        overflow = len(seen) - self._seen_limit
+        for _ in range(max(overflow, 0)):
+            seen.popitem(last=False)
+        return updated
+
+    @staticmethod
+    def _timestamps(values: List[Any]) -> np.ndarray:
+        """Convert raw created_at values, vectorized when they are all numeric"""
+        try:
+            timestamps = np.asarray(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            return np.fromiter(map(to_timestamp, values), dtype=np.float64, count=len(values))
+        if np.isnan(timestamps).any():
+            return np.fromiter(map(to_timestamp, values), dtype=np.float64, count=len(values))
+        # Treat very large values as epoch milliseconds (JavaScript Date.now())
+        return np.where(timestamps > 1e11, timestamps / 1000.0, timestamps)
+
+    def _update_aggregates(
+        self,
+        tickers: Dict[str, int],
+        group_index: np.ndarray,
+        timestamps: np.ndarray,
+        scores: np.ndarray,
+    ) -> Dict[str, Dict[str, Any]]:
+        n_groups = len(tickers)
+        bullish = np.bincount(
+            group_index, weights=scores > SENTIMENT_BULLISH_THRESHOLD, minlength=n_groups
+        )
+        bearish = np.bincount(
+            group_index, weights=scores < SENTIMENT_BEARISH_THRESHOLD, minlength=n_groups
+        )
+        totals = np.bincount(group_index, minlength=n_groups)
+
+        # New reference time per market is the latest post it has seen
+        latest = np.full(n_groups, -np.inf)
+        np.maximum.at(latest, group_index, timestamps)
+        previous = np.array(
+            [self.markets[t].reference_time if t in self.markets else -np.inf for t in tickers]
+        )
+        reference = np.maximum(latest, previous)
+
+        decay = np.exp(-self.decay_rate * (reference[group_index] - timestamps))
+        decayed_sums = np.bincount(group_index, weights=scores * decay, minlength=n_groups)
+        decayed_weights = np.bincount(group_index, weights=decay, minlength=n_groups)
+
+        now = time.time()
+        updated = {}
+        for ticker, g in tickers.items():
+            market = self.markets.get(ticker)
+            if market is None:
+                market = self.markets[ticker] = MarketSentiment(ticker)
+            carry = math.exp(-self.decay_rate * (reference[g] - market.reference_time)) \
+                if market.decayed_weight else 0.0
+            market.decayed_sum = market.decayed_sum * carry + decayed_sums[g]
+            market.decayed_weight = market.decayed_weight * carry + decayed_weights[g]
+            market.reference_time = float(reference[g])
+            market.bullish += int(bullish[g])
+            market.bearish += int(bearish[g])
+            market.neutral += int(totals[g] - bullish[g] - bearish[g])
+            market.updated_at = now
+            updated[ticker] = market.to_dict(self.decay_rate, now)
+        return updated
+
+    def get_market(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Return the current aggregate for a market"""
+        market = self.markets.get(ticker)
+        return market.to_dict(self.decay_rate) if market else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache and aggregate statistics"""
+        return {
+            "markets": len(self.markets),
+            "cached_scores": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+
+
+# Global engine instance shared by sentiment jobs
+sentiment_engine = SentimentEngine()
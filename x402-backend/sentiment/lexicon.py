@@ -0,0 +1,82 @@
+"""
+Lexicon for scoring prediction market social posts
+"""
+import re
+from typing import Dict
+
+# Token pattern used by the scorer (words, optionally with an apostrophe)
+TOKEN_PATTERN = re.compile(r"[a-z][a-z']*")
+
+# Word weights in [-1, 1]; positive means the author leans YES / bullish
+DEFAULT_LEXICON: Dict[str, float] = {
+    # Bullish
+    "bullish": 1.0,
+    "moon": 0.8,
+    "mooning": 0.9,
+    "pump": 0.6,
+    "pumping": 0.7,
+    "rally": 0.7,
+    "surge": 0.7,
+    "soaring": 0.8,
+    "buy": 0.5,
+    "buying": 0.5,
+    "long": 0.4,
+    "yes": 0.4,
+    "likely": 0.5,
+    "certain": 0.6,
+    "confident": 0.6,
+    "guaranteed": 0.7,
+    "win": 0.6,
+    "winning": 0.6,
+    "wins": 0.6,
+    "up": 0.3,
+    "higher": 0.4,
+    "rising": 0.5,
+    "strong": 0.5,
+    "great": 0.5,
+    "good": 0.4,
+    "easy": 0.3,
+    "undervalued": 0.6,
+    "cheap": 0.3,
+    "profit": 0.5,
+    "gains": 0.5,
+    "lock": 0.4,
+    "lfg": 0.7,
+    # Bearish
+    "bearish": -1.0,
+    "dump": -0.7,
+    "dumping": -0.8,
+    "crash": -0.9,
+    "crashing": -0.9,
+    "sell": -0.5,
+    "selling": -0.5,
+    "short": -0.4,
+    "no": -0.3,
+    "unlikely": -0.6,
+    "doubt": -0.5,
+    "doubtful": -0.6,
+    "lose": -0.6,
+    "losing": -0.6,
+    "loses": -0.6,
+    "down": -0.3,
+    "lower": -0.4,
+    "falling": -0.5,
+    "weak": -0.5,
+    "bad": -0.4,
+    "terrible": -0.7,
+    "overvalued": -0.6,
+    "overpriced": -0.5,
+    "risky": -0.4,
+    "loss": -0.5,
+    "rekt": -0.8,
+    "scam": -0.9,
+    "rug": -0.9,
+    "fade": -0.5,
+    "never": -0.4,
+}
+
+# Words that flip the sign of the following token
+NEGATIONS = frozenset({
+    "not", "no", "never", "dont", "don't", "isnt", "isn't", "wont", "won't",
+    "cant", "can't", "aint", "ain't", "hardly",
+})
@@ -0,0 +1,82 @@
+"""
+Drain mode for rolling restarts
+
+Draining starts from the admin endpoint (a pre-stop hook) or when the
+server is told to exit. While draining, new job requests are turned away
+and health checks fail so the load balancer moves traffic elsewhere;
+streams already running get until the deadline to finish.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from sse_starlette.sse import AppStatus
+
+from config import DRAIN_TIMEOUT_SECONDS, DRAIN_RETRY_AFTER_SECONDS
+
+# Seconds between checks while waiting for streams to finish
+POLL_INTERVAL = 0.05
+
+
+class Drain:
+    """Drain state shared by the endpoints and the stream transports"""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.deadline: Optional[float] = None  # time.monotonic()
+        self.streams = 0
+
+    @property
+    def active(self) -> bool:
+        # A signalled server drains even before anything called start()
+        return self.started_at is not None or AppStatus.should_exit
+
+    def start(self, timeout: float = DRAIN_TIMEOUT_SECONDS):
+        """Enter drain mode; the first call sets the deadline"""
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+            self.deadline = self.started_at + timeout
+
+    def stop(self) -> bool:
+        """Leave drain mode, e.g. when a deploy is called off; not once the server is exiting"""
+        if AppStatus.should_exit:
+            return False
+        self.started_at = self.deadline = None
+        return True
+
+    def remaining(self) -> float:
+        """Seconds left until the deadline; 0 when not draining"""
+        if self.deadline is None:
+            return 0.0
+        return max(0.0, self.deadline - time.monotonic())
+
+    async def wait_deadline(self):
+        """Start draining if needed and sleep until the deadline"""
+        self.start()
+        while self.remaining() > 0:
+            await asyncio.sleep(self.remaining())
+
+    async def wait_idle(self, busy: Callable[[], int] = lambda: 0) -> bool:
+        """
+        Wait until no streams (and nothing counted by `busy`) are running
+
+        Returns:
+            False if the deadline passed first
+        """
+        while self.streams or busy():
+            if self.remaining() <= 0:
+                return False
+            await asyncio.sleep(POLL_INTERVAL)
+        return True
+
+    def status(self) -> Dict:
+        return {
+            "draining": self.active,
+            "streams": self.streams,
+            "remaining_seconds": round(self.remaining(), 3) if self.started_at is not None else None,
+            "retry_after": DRAIN_RETRY_AFTER_SECONDS,
+        }
+
+
+# Global drain instance
+drain = Drain()
@@ -5,17 +5,27 @@ import asyncio
 from typing import AsyncIterator
 from sse_starlette.sse import EventSourceResponse
 
+from jobs.budget import run_within_budget
+from metrics.jobs import job_started, job_finished, output_size
+from .drain import drain
 
-async def stream_job_output(job) -> AsyncIterator[dict]:
+
+async def stream_job_output(job, transport: str = "sse") -> AsyncIterator[dict]:
     """
     Stream job execution output as SSE events
 
     Args:
         job: Job instance to execute
+        transport: Label for the job's metrics ("sse" or "ws")
 
     Yields:
         SSE event dictionaries
     """
+    started = job_started(job, transport)
+    outcome, events, nbytes = "cancelled", 0, 0
+    drain.streams += 1
+    # "execute" runs until the first chunk, "stream" from there to the end
+    span = job.trace.span("execute", transport=transport)
     try:
         # Send start event
         yield {
@@ -23,14 +33,25 @@ async def stream_job_output(job) -> AsyncIterator[dict]:
             "data": f"Job {job.job_id} started"
         }
 
-        # Stream job output
-        async for output in job.execute():
-            yield {
-                "event": "output",
-                "data": output
-            }
+        # Stream job output, within the job's time and size budget
+        outputs = run_within_budget(job)
+        try:
+            async for output in outputs:
+                if not events:
+                    span.end()
+                    span = job.trace.span("stream", transport=transport)
+                events += 1
+                nbytes += output_size(output)
+                yield {
+                    "event": "output",
+                    "data": output
+                }
+        finally:
+            # Closing this generator tears the job down with it
+            await outputs.aclose()
 
         # Send completion event
+        outcome = "completed"
         yield {
             "event": "complete",
             "data": f"Job {job.job_id} completed"
@@ -38,10 +59,39 @@ async def stream_job_output(job) -> AsyncIterator[dict]:
 
     except Exception as e:
         # Send error event
+        outcome = "failed"
         yield {
             "event": "error",
             "data": str(e)
         }
+    finally:
+        drain.streams -= 1
+        job_finished(job, transport, started, outcome, events, nbytes)
+        span.end(outcome=outcome, events=events, bytes=nbytes)
+        job.trace.finish()
+
+
+class JobEventSourceResponse(EventSourceResponse):
+    """
+    EventSourceResponse that drains on shutdown and always closes its generator
+
+    On client disconnect the response cancels its streaming task, which
+    leaves the generator suspended wherever it was. Closing it here runs
+    the job's cleanup (subprocesses, pool workers) before the request ends
+    instead of whenever the generator is garbage collected.
+    """
+
+    async def listen_for_exit_signal(self) -> None:
+        # On server exit the stream is not cut right away: it gets until
+        # the drain deadline to finish
+        await EventSourceResponse.listen_for_exit_signal()
+        await drain.wait_deadline()
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
 
 
 def create_sse_response(job) -> EventSourceResponse:
@@ -54,4 +104,4 @@ def create_sse_response(job) -> EventSourceResponse:
     Returns:
         EventSourceResponse for FastAPI
     """
-    return EventSourceResponse(stream_job_output(job))
+    return JobEventSourceResponse(stream_job_output(job))
@@ -0,0 +1,173 @@
+"""
+WebSocket transport multiplexing many job streams over one connection
+
+Client messages (JSON):
+    {"op": "subscribe", "job_id": "...", "window": 64}
+    {"op": "ack", "job_id": "...", "count": 16}
+    {"op": "cancel", "job_id": "..."}
+
+Server frames (JSON), tagged by job:
+    {"job_id": "...", "seq": 0, "event": "start" | "output" | "complete" | "error", "data": "..."}
+
+Each stream has a credit window: it may send `window` frames, then waits
+until the client acks some. A slow consumer of one job pauses only that
+job's generator, never the other streams on the connection.
+"""
+import asyncio
+import json
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+
+from config import WS_STREAM_WINDOW, WS_MAX_STREAMS, WS_SEND_QUEUE_SIZE
+from .sse import stream_job_output
+
+
+class JobStream:
+    """One job's output on a multiplexed connection"""
+
+    def __init__(self, job, window: int):
+        self.job = job
+        self.credits = window
+        self.sent = 0
+        self._ready = asyncio.Event()
+        self._ready.set()
+        self.task: Optional[asyncio.Task] = None
+
+    def grant(self, count: int):
+        """Return credits acked by the client"""
+        self.credits += count
+        if self.credits > 0:
+            self._ready.set()
+
+    async def acquire(self):
+        """Wait for a credit to send one frame"""
+        while self.credits <= 0:
+            self._ready.clear()
+            await self._ready.wait()
+        self.credits -= 1
+
+
+class JobMultiplexer:
+    """
+    Serve many job streams over one WebSocket
+
+    Each subscribed job runs the same `stream_job_output` generator as the
+    SSE endpoint in its own task. Frames go through one bounded send queue
+    drained by a single writer, and every task is cancelled when the
+    client disconnects.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        authorize: Callable[[str], object],
+        window: int = WS_STREAM_WINDOW,
+        max_streams: int = WS_MAX_STREAMS,
+    ):
+        """
+        Args:
+            websocket: Connection to serve
+            authorize: Returns the Job for a job_id, or raises HTTPException
+            window: Default per-stream credit window
+            max_streams: Concurrent streams allowed on the connection
+        """
+        self.websocket = websocket
+        self.authorize = authorize
+        self.window = window
+        self.max_streams = max_streams
+        self.streams: Dict[str, JobStream] = {}
+        self._outgoing: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+
+    async def run(self):
+        """Accept the connection and serve it until the client leaves"""
+        await self.websocket.accept()
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                try:
+                    message = json.loads(await self.websocket.receive_text())
+                except ValueError:
+                    await self._send_error(None, 400, "Invalid JSON message")
+                    continue
+                await self._handle(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            tasks = [writer] + [stream.task for stream in self.streams.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _handle(self, message: dict):
+        op = message.get("op") if isinstance(message, dict) else None
+        job_id = message.get("job_id") if isinstance(message, dict) else None
+
+        if op == "subscribe":
+            await self._subscribe(job_id, message.get("window", self.window))
+        elif op == "ack":
+            stream = self.streams.get(job_id)
+            count = message.get("count", 1)
+            if stream is not None and isinstance(count, int) and count > 0:
+                stream.grant(count)
+        elif op == "cancel":
+            stream = self.streams.get(job_id)
+            if stream is not None:
+                stream.task.cancel()
+        else:
+            await self._send_error(job_id, 400, f"Unknown op: {op}")
+
+    async def _subscribe(self, job_id, window):
+        if not isinstance(job_id, str) or not job_id:
+            await self._send_error(None, 400, "Missing 'job_id'")
+            return
+        if job_id in self.streams:
+            await self._send_error(job_id, 409, "Already subscribed")
+            return
+        if len(self.streams) >= self.max_streams:
+            await self._send_error(job_id, 429, f"At most {self.max_streams} streams per connection")
+            return
+        if not isinstance(window, int) or window < 1:
+            await self._send_error(job_id, 400, "Window must be a positive integer")
+            return
+        try:
+            job = self.authorize(job_id)
+        except HTTPException as e:
+            await self._send_error(job_id, e.status_code, e.detail)
+            return
+
+        stream = JobStream(job, window)
+        self.streams[job_id] = stream
+        stream.task = asyncio.create_task(self._pump(job_id, stream))
+
+    async def _pump(self, job_id: str, stream: JobStream):
+        """Move one job's events into the send queue as credits allow"""
+        events = stream_job_output(stream.job, transport="ws")
+        try:
+            async for event in events:
+                await stream.acquire()
+                await self._outgoing.put(json.dumps({
+                    "job_id": job_id,
+                    "seq": stream.sent,
+                    "event": event["event"],
+                    "data": event["data"],
+                }))
+                stream.sent += 1
+        finally:
+            # Closing the generator runs the job's own cleanup on cancel
+            await events.aclose()
+            self.streams.pop(job_id, None)
+
+    async def _write(self):
+        """Single writer, so frames are never interleaved on the socket"""
+        while True:
+            frame = await self._outgoing.get()
+            await self.websocket.send_text(frame)
+
+    async def _send_error(self, job_id: Optional[str], status: int, detail: str):
+        await self._outgoing.put(json.dumps({
+            "job_id": job_id,
+            "event": "error",
+            "status": status,
+            "data": detail,
+        }))
@@ -0,0 +1,146 @@
+"""
+Activity store tests
+"""
+import asyncio
+import json
+import random
+import sys
+
+from jobs.activity import ActivityJob
+from marketdata.activity import ActivityStore
+from marketdata.ingest import ingest_trades
+
+
+def _brute_window(trades, since, until):
+    inside = [t for t in trades if since <= t[0] <= until]
+    volume = sum(t[2] for t in inside)
+    notional = sum(t[1] * t[2] for t in inside)
+    return len(inside), volume, notional / volume if volume else None
+
+
+def test_ring_queries_match_brute_force():
+    """Test last N, since T and windows across ring wrap-around"""
+    print("1. Testing ring buffer queries...")
+    rng = random.Random(7)
+    store = ActivityStore(trades_per_market=100, max_markets=10, global_index_size=1000)
+    trades = []
+    t = 1000.0
+    for _ in range(37):
+        batch = []
+        for _ in range(rng.randint(1, 9)):
+            t += rng.random()
+            batch.append((t, rng.randint(1, 99), rng.randint(1, 50), rng.choice([1, -1])))
+        store.append("A", *zip(*batch))
+        trades.extend(batch)
+    retained = trades[-100:]
+
+    last = store.last_trades("A", 10)
+    assert [r["time"] for r in last] == [r[0] for r in retained[-10:]]
+    assert len(store.last_trades("A", 1000)) == 100
+
+    since = retained[40][0]
+    assert [r["time"] for r in store.trades_since("A", since)] == [r[0] for r in retained[40:]]
+    assert len(store.trades_since("A", since, limit=5)) == 5
+
+    for lo, hi in [(20, 80), (0, 99), (95, 99), (50, 50)]:
+        stats = store.window("A", retained[lo][0], retained[hi][0])
+        count, volume, vwap = _brute_window(retained, retained[lo][0], retained[hi][0])
+        assert stats["trades"] == count
+        assert abs(stats["volume"] - volume) < 1e-6
+        assert abs(stats["vwap"] - vwap) < 1e-6
+    print("   ✓ Ring buffer queries PASS")
+
+
+def test_memory_is_bounded():
+    """Test market eviction and fixed-size buffers"""
+    print("2. Testing bounded memory...")
+    store = ActivityStore(trades_per_market=50, max_markets=3, global_index_size=100)
+    baseline = None
+    for i in range(20):
+        store.append(f"M{i}", [float(i)] * 200, [50] * 200, [1] * 200, [1] * 200)
+        if i == 2:
+            baseline = store.nbytes()
+    assert store.nbytes() == baseline
+    assert store.tickers() == ["M17", "M18", "M19"]
+    assert store.last_trades("M0", 5) == []
+    print("   ✓ Bounded memory PASS")
+
+
+def test_global_tail_skips_evicted_markets():
+    """Test reading across markets from a global cursor"""
+    print("3. Testing global tail...")
+    store = ActivityStore(trades_per_market=10, max_markets=2, global_index_size=100)
+    store.append("A", [1.0, 2.0], [10, 20], [1, 1], [1, -1])
+    store.append("B", [3.0], [30], [1], [1])
+    cursor, rows = store.read_from(0, 100)
+    assert cursor == 3 and [r["market_ticker"] for r in rows] == ["A", "A", "B"]
+    assert rows[1]["side"] == "no"
+    assert store.global_search(2.5) == 2
+
+    store.append("C", [4.0], [40], [1], [1])  # evicts A
+    cursor, rows = store.read_from(0, 100)
+    assert [r["market_ticker"] for r in rows] == ["B", "C"]
+    _, rows = store.read_from(0, 100, tickers=["C"])
+    assert [r["price"] for r in rows] == [40.0]
+    print("   ✓ Global tail PASS")
+
+
+def test_activity_job_tails_new_trades():
+    """Test the paid activity stream"""
+    print("4. Testing activity job...")
+    assert not ActivityJob(job_id="t", params={}).validate_params()[0]
+    for since in ("1700000000", True, [1]):
+        params = {"markets": ["JOB-A"], "since": since}
+        assert ActivityJob(job_id="t", params=params).validate_params() == (False, "since must be a number")
+    assert ActivityJob(job_id="t", params={"markets": ["JOB-A"], "since": 1.5}).validate_params() == (True, "")
+    job = ActivityJob(job_id="t", params={"markets": ["JOB-A"], "limit": 5, "duration": 1})
+    assert job.validate_params() == (True, "")
+    ingest_trades("JOB-A", [
+        {"created_time": "2024-01-01T00:00:00Z", "yes_price": 40, "count": 3, "taker_side": "yes"},
+    ])
+
+    async def run():
+        lines = []
+
+        async def consume():
+            async for line in job.execute():
+                lines.append(json.loads(line))
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        ingest_trades("JOB-A", [
+            {"created_time": "2024-01-01T00:01:00Z", "yes_price": 60, "count": 1, "taker_side": "no"},
+        ])
+        await task
+        return lines
+
+    lines = asyncio.run(run())
+    assert lines[0]["event"] == "snapshot" and len(lines[0]["trades"]) == 1
+    assert lines[1]["event"] == "trades" and lines[1]["trades"][0]["price"] == 60.0
+    print("   ✓ Activity job PASS")
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Activity Store Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_ring_queries_match_brute_force()
+        test_memory_is_bounded()
+        test_global_tail_skips_evicted_markets()
+        test_activity_job_tails_new_trades()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL ACTIVITY TESTS PASSED ✓")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Async job mode tests: background scheduler and result store
+"""
+import asyncio
+import sys
+import time
+from decimal import Decimal
+
+from jobs.base import Job
+from jobs.results import ResultStore, COMPLETED, FAILED, CANCELLED, TRUNCATED
+from jobs.scheduler import JobScheduler
+
+
+class CountJob(Job):
+    """Yields `count` numbered lines, optionally failing or sleeping"""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "count"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        return Decimal(0)
+
+    def validate_params(self) -> tuple[bool, str]:
+        return True, ""
+
+    async def execute(self):
+        for i in range(self.params.get("count", 10)):
+            if self.params.get("fail_at") == i:
+                raise RuntimeError("boom")
+            if self.params.get("interval"):
+                await asyncio.sleep(self.params["interval"])
+            yield f"line {i}\n"
+
+
+def test_background_execution_and_paging():
+    """Test that jobs run without a client and their output can be paged"""
+    print("1. Testing background execution and paging...")
+
+    async def run():
+        store = ResultStore()
+        scheduler = JobScheduler(store, concurrency=4)
+        for i in range(20):
+            scheduler.submit(CountJob(job_id=f"J{i}", params={"count": 250, "interval": 0.001}))
+        assert scheduler.active == 20
+
+        # Pages are readable while the job runs
+        await asyncio.sleep(0.05)
+        page = store.read("J0", 0, 10)
+        assert page["status"] == "running" and page["next_offset"] is not None
+        assert sum(store.get(f"J{i}").status == "running" for i in range(20)) == 4
+
+        while scheduler.active:
+            await asyncio.sleep(0.01)
+        chunks, offset = [], 0
+        while offset is not None:
+            page = store.read("J7", offset, 100)
+            chunks += page["chunks"]
+            offset = page["next_offset"]
+        assert chunks == [f"line {i}\n" for i in range(250)]
+        assert page["status"] == COMPLETED and page["total_chunks"] == 250
+        assert store.read("NOPE", 0, 10) is None
+
+    asyncio.run(run())
+    print("   ✓ Background execution and paging PASS")
+
+
+def test_failures_and_cancellation():
+    """Test failed, cancelled and over-budget jobs"""
+    print("2. Testing failure, cancellation and budgets...")
+
+    async def run():
+        store = ResultStore(max_bytes_per_job=100)
+        scheduler = JobScheduler(store)
+        scheduler.submit(CountJob(job_id="F", params={"count": 5, "fail_at": 2}))
+        scheduler.submit(CountJob(job_id="C", params={"count": 10 ** 6, "interval": 0.01}))
+        scheduler.submit(CountJob(job_id="T", params={"count": 1000}))
+        await asyncio.sleep(0.05)
+        assert scheduler.cancel("C") and not scheduler.cancel("NOPE")
+        await asyncio.sleep(0.01)
+
+        failed = store.get("F")
+        assert failed.status == FAILED and failed.error == "boom" and len(failed.chunks) == 2
+        assert store.get("C").status == CANCELLED
+        truncated = store.get("T")
+        assert truncated.status == TRUNCATED and truncated.size <= 100
+
+        scheduler.submit(CountJob(job_id="S", params={"count": 10 ** 6, "interval": 0.01}))
+        await asyncio.sleep(0.02)
+        await scheduler.shutdown(timeout=1)
+        assert store.get("S").status == CANCELLED and scheduler.active == 0
+
+    asyncio.run(run())
+    print("   ✓ Failure, cancellation and budgets PASS")
+
+
+def test_bounds_and_ttl():
+    """Test count, byte and TTL bounds on stored results"""
+    print("3. Testing result store bounds...")
+
+    async def run():
+        store = ResultStore(ttl=0.05, max_jobs=5, max_total_bytes=2000)
+        scheduler = JobScheduler(store)
+        for i in range(8):
+            scheduler.submit(CountJob(job_id=f"B{i}", params={"count": 10}))
+            await asyncio.sleep(0.001)
+        while scheduler.active:
+            await asyncio.sleep(0.001)
+        assert len(store) == 5 and store.get("B0") is None and store.get("B7") is not None
+
+        # Total bytes: finished results are evicted oldest first
+        for i in range(8, 12):
+            scheduler.submit(CountJob(job_id=f"B{i}", params={"count": 60}))
+            await asyncio.sleep(0.01)
+        assert store.total_bytes <= 2000 and store.get("B11") is not None
+
+        await asyncio.sleep(0.1)
+        assert store.evict_expired() > 0
+        assert len(store) == 0 and store.total_bytes == 0
+
+        # Replacing a result releases its bytes
+        store.append(store.create("R", "count"), "x" * 100)
+        store.create("R", "count")
+        assert len(store) == 1 and store.total_bytes == 0
+
+    asyncio.run(run())
+    print("   ✓ Result store bounds PASS")
+
+
+def test_scheduler_throughput():
+    """Report background jobs completed per second"""
+    print("4. Measuring scheduler throughput...")
+
+    async def run():
+        store = ResultStore()
+        scheduler = JobScheduler(store, concurrency=64)
+        start = time.perf_counter()
+        for i in range(5000):
+            scheduler.submit(CountJob(job_id=f"P{i}", params={"count": 10}))
+        while scheduler.active:
+            await asyncio.sleep(0.005)
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    print(f"   5000 jobs in {elapsed * 1000:.0f} ms ({5000 / elapsed:,.0f} jobs/s)")
+    print("   ✓ Scheduler throughput PASS")
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Async Job Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_background_execution_and_paging()
+        test_failures_and_cancellation()
+        test_bounds_and_ttl()
+        test_scheduler_throughput()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL ASYNC JOB TESTS PASSED ✓")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,480 @@
+"""
+Payment audit log tests: lookups, recovery, group commit, bulk readers and
+replay protection, plus an index rebuild benchmark at 10M records
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+
+from payments.audit_log import (
+    AuditLog, EVENT_PAYMENT, EVENT_EXECUTE, JOB_SEED, RECORD_SIZE,
+    hash_key, hash_keys, record_dtype,
+)
+
+AUDIT_DIR = tempfile.mkdtemp(prefix="x402-audit-")
+LOOKUP_TARGET_US = 50  # per indexed lookup
+WARM_OPEN_TARGET_S = 1.0  # open with index files in place
+
+
+def tx(i: int) -> str:
+    return f"0x{i + 1:064x}"
+
+
+def new_log(name: str, **kwargs) -> AuditLog:
+    kwargs.setdefault("segment_records", 64)
+    log = AuditLog(os.path.join(AUDIT_DIR, name), **kwargs)
+    log.open()
+    return log
+
+
+def fill(log: AuditLog, jobs: int, executed=lambda i: True):
+    for i in range(jobs):
+        assert log.record_payment(tx(i), f"job-{i}", "ping", "0x1", 100000 + i) is not None
+        if executed(i):
+            log.record_execute(f"job-{i}", "ping")
+    assert log.flush(timeout=10)
+
+
+def test_lookups():
+    """Test indexed lookups across sealed and active segments"""
+    print("1. Testing lookups and replay protection...")
+    keys = np.frombuffer(os.urandom(48 * 50), dtype="S48")
+    assert [int(h) for h in hash_keys(keys, JOB_SEED)] == [hash_key(bytes(k).ljust(48, b"\0"), JOB_SEED) for k in keys]
+
+    log = new_log("lookups")
+    fill(log, 1000)
+    # 2000 records in 64-record segments: all but 16 are in index files
+    assert log.durable == 2000 and log._tx_index.covered == 1984 and len(log._tx_recent) == 8
+    assert log._tx_index.entries == 992 and log._job_index.entries == 1984
+
+    for i in (0, 31, 500, 991, 992, 999):
+        record = log.lookup_tx(tx(i))
+        assert record.job_id == f"job-{i}" and record.seq == 2 * i and record.amount == 100000 + i
+        assert record.event == "payment" and record.sender == "0x" + "0" * 63 + "1"
+        assert [r.event for r in log.lookup_job(f"job-{i}")] == ["payment", "execute"]
+    assert log.lookup_tx(tx(1000)) is None and log.lookup_job("job-1000") == []
+    assert log.lookup_tx("not-a-hash") is None and log.lookup_job("x" * 100) == []
+    # Short and full forms are the same transaction
+    assert log.lookup_tx("0x1").job_id == "job-0"
+
+    # Replays are refused whether the hash is indexed on disk or in memory
+    assert log.record_payment(tx(3), "other", "ping", None, 1) is None
+    assert log.record_payment(tx(995), "other", "ping", None, 1) is None
+    for bad in (("0x", "job"), ("0xzz", "job"), ("0x" + "0" * 64, "job"), (tx(5000), ""), (tx(5000), "j" * 49)):
+        try:
+            log.record_payment(bad[0], bad[1], "ping", None, 1)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted {bad}")
+    log.close()
+    print("   ✓ Lookups and replay protection PASS")
+
+
+def test_recovery():
+    """Test reopening, torn tails and index rebuilds"""
+    print("2. Testing recovery...")
+    log = new_log("recovery")
+    fill(log, 500, executed=lambda i: i % 2 == 0)
+    records = log.durable
+    log.close()
+
+    # Reopen with the index files in place
+    log.open()
+    assert log.durable == records and log.lookup_tx(tx(10)).job_id == "job-10"
+    assert log.lookup_tx(tx(499)).job_id == "job-499"
+    log.close()
+
+    # A torn write at the end of the active segment
+    directory = log.directory
+    active = os.path.join(directory, f"seg-{records // 64:06d}.log")
+    with open(active, "ab") as f:
+        f.write(b"\x01" * (RECORD_SIZE + 17))
+    # ...and a last record whose checksum does not match
+    with open(active, "r+b") as f:
+        f.seek(os.path.getsize(active) - RECORD_SIZE - 17 - RECORD_SIZE + 30)
+        f.write(b"\xff")
+    log.open()
+    assert log.durable == records - 1
+    # The dropped record was the last payment; its transaction is unused again
+    assert log.lookup_tx(tx(499)) is None and log.lookup_tx(tx(498)).job_id == "job-498"
+    assert log.record_payment(tx(499), "job-499", "ping", None, 1) is not None
+    assert log.flush(timeout=10)
+    log.close()
+
+    # Missing index files are rebuilt from the segments
+    saved = os.path.join(AUDIT_DIR, "tx.idx.old")
+    shutil.copy(os.path.join(directory, "tx.idx"), saved)
+    os.remove(os.path.join(directory, "tx.idx"))
+    os.remove(os.path.join(directory, "job.idx"))
+    log.open()
+    assert log.lookup_tx(tx(7)).job_id == "job-7" and len(log.lookup_job("job-8")) == 2
+    fill_more = [log.record_payment(tx(600 + i), f"late-{i}", "ping", None, 1) for i in range(200)]
+    assert None not in fill_more and log.flush(timeout=10)
+    log.close()
+
+    # An index file older than the segments catches up from where it stopped
+    shutil.copy(saved, os.path.join(directory, "tx.idx"))
+    log.open()
+    assert log._tx_index.covered == (log.durable // 64) * 64
+    assert log.lookup_tx(tx(650)).job_id == "late-50" and log.lookup_tx(tx(3)).job_id == "job-3"
+    log.close()
+
+    # A second process appends to a shard of its own and sees the first one's payments
+    log.open()
+    other = AuditLog(log.root, segment_records=64)
+    other.open()
+    assert other.directory != log.directory and other.name == "writer-1"
+    assert other.lookup_tx(tx(650)).job_id == "late-50"
+    assert other.record_payment(tx(650), "again", "ping", None, 1) is None
+    # ...including records still in the first one's active segment
+    assert log.record_payment(tx(5000), "fresh", "ping", None, 1) is not None
+    assert other.lookup_tx(tx(5000)).job_id == "fresh"
+    assert other.record_payment(tx(5001), "mine", "ping", None, 1) is not None
+    assert log.lookup_tx(tx(5001)).job_id == "mine" and log.lookup_tx(tx(5001)).shard == "writer-1"
+    log.record_execute("mine", "ping")
+    # Executions are visible to other processes once written
+    assert log.flush(timeout=10)
+    assert [r.event for r in other.lookup_job("mine")] == ["payment", "execute"]
+
+    # Racing processes never both accept one transaction
+    accepted = []
+    racers = [
+        threading.Thread(target=lambda shard=shard: accepted.extend(
+            shard.record_payment(tx(6000 + i), f"race-{shard.name}-{i}", "ping", None, 1) is not None
+            for i in range(300)
+        ))
+        for shard in (log, other)
+    ]
+    for racer in racers:
+        racer.start()
+    for racer in racers:
+        racer.join()
+    assert sum(accepted) == 300
+    log.close()
+    other.close()
+    # A restarted process takes the first free shard again
+    log.open()
+    assert log.name == "writer-0" and log.lookup_tx(tx(6299)) is not None
+    log.close()
+
+    # Growing past the load factor swaps in a larger file
+    log = new_log("growth", segment_records=256)
+    first = log._tx_index
+    fill(log, 3000)
+    assert log._tx_index.capacity > 1024
+    # ...and unmaps the one it replaced
+    assert first is not log._tx_index and first._mm is None
+    assert all(log.lookup_tx(tx(i)).job_id == f"job-{i}" for i in range(0, 3000, 7))
+    log.close()
+    print("   ✓ Recovery PASS")
+
+
+def test_group_commit():
+    """Test that concurrent appends share writes and fsyncs"""
+    print("3. Testing group commit...")
+    log = new_log("group", segment_records=4096)
+    # Payments are serialized across processes; executions are not
+    threads = [
+        threading.Thread(target=lambda t=t: [
+            log.record_execute(f"g{t}-{i}", "ping") for i in range(2000)
+        ])
+        for t in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert log.flush(timeout=30)
+    assert log.durable == 16000 and log.commits < 16000
+    assert [r.event for r in log.lookup_job("g7-1999")] == ["execute"]
+    print(f"   16000 appends in {log.commits} commits")
+    log.close()
+    print("   ✓ Group commit PASS")
+
+
+def test_bulk_readers():
+    """Test memory-mapped scan, export and reconciliation"""
+    print("4. Testing bulk readers...")
+    log = new_log("bulk")
+    fill(log, 300, executed=lambda i: i % 3 != 0)
+    log.record_payment(tx(1000), "other", "backtest", None, 400000)
+    assert log.flush(timeout=10)
+
+    parts = list(log.scan())
+    assert sum(len(records) for _, records in parts) == log.durable
+    assert all(isinstance(records, np.memmap) for _, records in parts)
+    assert [first for first, _ in log.scan(100)][:2] == [100, 128]
+
+    exported = list(log.export())
+    assert [record.seq for record in exported] == list(range(log.durable))
+    assert exported[0] == log.read(0) and exported[-1].job_type == "backtest"
+    assert list(log.export(start=log.durable - 1)) == [exported[-1]]
+
+    summary = log.reconcile(limit=5)
+    assert summary["payments"] == 301 and summary["executions"] == 200
+    assert summary["amount_octas"] == sum(100000 + i for i in range(300)) + 400000
+    assert summary["amount_octas_by_job_type"]["backtest"] == 400000
+    assert summary["paid_unexecuted"] == 101 and len(summary["paid_unexecuted_job_ids"]) == 5
+    log.close()
+    print("   ✓ Bulk readers PASS")
+
+
+class InstantVerifier:
+    """Payment backend that confirms every transaction"""
+
+    async def verify_payment(self, from_address, expected_amount, tx_hash=None, timeout=60):
+        return True, tx_hash
+
+    async def is_connected(self):
+        return True
+
+
+def test_api_replay():
+    """Test that a transaction cannot pay for two jobs through the API"""
+    print("5. Testing API replay protection...")
+    import main
+    from auth import admin, rate_limit
+
+    sender = "0x" + "ab" * 32
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def pay(job_id, tx_hash, mode="stream", job_type="market_data", params=None):
+                header = json.dumps({"tx_hash": tx_hash, "sender": sender, "amount": "0.001"})
+                return await client.post("/api/jobs/request", headers={"X-PAYMENT": header}, json={
+                    "job_type": job_type, "params": params or {"tickers": ["A"]},
+                    "wallet_address": sender, "job_id": job_id, "mode": mode,
+                })
+
+            assert (await pay("api-1", tx(1))).json()["status"] == "authorized"
+            reused = await pay("api-2", tx(1))
+            assert reused.status_code == 409, reused.text
+            assert (await pay("bad id", tx(2))).status_code == 422
+            # A job ID names one job; reusing it spends nothing
+            assert (await pay("api-1", tx(5))).status_code == 409
+            assert main.audit_log.lookup_tx(tx(5)) is None
+
+            # Traditional flow: the hash is checked before and after verification
+            quote = await client.post("/api/jobs/request", json={
+                "job_type": "market_data", "params": {"tickers": ["A"]}, "wallet_address": sender,
+            })
+            job_id = quote.json()["job_id"]
+            confirm = {"job_id": job_id, "tx_hash": tx(1)}
+            assert (await client.post("/api/jobs/verify-payment", json=confirm)).status_code == 409
+            # Malformed hashes are refused before verification, not by the log
+            for bad in ("0x" + "z" * 64, "0x" + "1" * 65, "1" * 66):
+                confirm["tx_hash"] = bad
+                assert (await client.post("/api/jobs/verify-payment", json=confirm)).status_code == 422
+            confirm["tx_hash"] = tx(3)
+            assert (await client.post("/api/jobs/verify-payment", json=confirm)).json()["status"] == "verified"
+
+            # Execution is recorded when the job is handed out
+            assert (await client.get("/api/jobs/rollups/api-1")).status_code == 200
+            admin = {"X-Admin-Token": "test-admin-token"}
+            records = (await client.get("/admin/audit/lookup", params={"job_id": "api-1"}, headers=admin)).json()
+            assert [r["event"] for r in records["records"]] == ["payment", "execute"]
+            assert records["records"][0]["amount"] == 100000 and records["records"][0]["sender"] == sender
+            by_tx = (await client.get("/admin/audit/lookup", params={"tx_hash": tx(3)}, headers=admin)).json()
+            assert by_tx["records"][0]["job_id"] == job_id
+
+            main.audit_log.flush(timeout=10)
+            export = await client.get("/admin/audit/export", headers=admin)
+            lines = [json.loads(line) for line in export.text.splitlines()]
+            assert [line["job_id"] for line in lines] == ["api-1", job_id, "api-1"]
+            summary = (await client.get("/admin/audit/reconcile", headers=admin)).json()
+            assert summary["payments"] == 2 and summary["paid_unexecuted_job_ids"] == [job_id]
+
+            # A payment buys one execution, whichever transport asks
+            assert (await pay("api-3", tx(4))).json()["status"] == "authorized"
+            assert (await client.get("/api/jobs/execute/api-3")).status_code == 200
+            assert (await client.get("/api/jobs/execute/api-3")).status_code == 409
+            assert (await client.get("/api/jobs/rollups/api-3")).status_code == 409
+            records = (await client.get("/admin/audit/lookup", params={"job_id": "api-3"}, headers=admin)).json()
+            assert [r["event"] for r in records["records"]] == ["payment", "execute"]
+
+            # Background jobs keep their ID while the result is stored
+            assert (await pay("api-4", tx(6), "async")).json()["status"] == "accepted"
+            assert (await pay("api-4", tx(7), "async")).status_code == 409
+            assert main.audit_log.lookup_tx(tx(7)) is None
+
+            # Rollups refuse other job types without using up their execution
+            ping = {"host": "localhost", "count": 1}
+            assert (await pay("api-5", tx(8), job_type="ping", params=ping)).json()["status"] == "authorized"
+            assert (await client.get("/api/jobs/rollups/api-5")).status_code == 400
+            assert not main.pending_jobs["api-5"].get("executed")
+            assert main.audit_log.lookup_job("api-5")[-1].event == "payment"
+
+    # Settings bound when config was first imported, by whichever test that was
+    with (
+        patch.object(admin, "ADMIN_TOKEN", "test-admin-token"),
+        patch.object(rate_limit, "RATE_LIMIT_ENABLED", False),
+        patch.object(main, "payment_verifier", InstantVerifier()),
+        patch.object(main, "audit_log", AuditLog(os.path.join(AUDIT_DIR, "app"))),
+    ):
+        try:
+            asyncio.run(run())
+        finally:
+            main.audit_log.close()
+    print("   ✓ API replay protection PASS")
+
+
+def benchmark_appends(count: int = 50000):
+    """Caller-side latency of payments, each held until its record is written, with fsync on"""
+    print(f"Benchmarking {count} appends (fsync on)...")
+    log = new_log("bench-appends", segment_records=1 << 18, fsync=True)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        t = time.perf_counter()
+        log.record_payment(tx(i), f"bench-{i}", "market_data", None, 100000)
+        latencies.append(time.perf_counter() - t)
+    log.flush()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"   {count / elapsed:,.0f} appends/s durable, {log.commits} commits "
+          f"({count / log.commits:.0f} records each)")
+    print(f"   append p50 {latencies[len(latencies) // 2] * 1e6:.1f} µs, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} µs")
+    log.close()
+
+
+def write_synthetic_log(directory: str, records: int, segment_records: int, sample_every: int):
+    """
+    Write `records` payment/execute pairs straight to a shard's segment files
+
+    Every tenth job never executes. Sealed segments are written without
+    checksums, which only the active segment's tail is checked against.
+
+    Returns:
+        Sampled (tx_hash, job_id) pairs for lookups
+    """
+    os.makedirs(directory)
+    rng = np.random.default_rng(7)
+    dtype = record_dtype()
+    samples = []
+    for base in range(0, records, segment_records):
+        n = min(segment_records, records - base)
+        seqs = np.arange(base, base + n)
+        jobs = seqs // 2
+        arr = np.zeros(n, dtype=dtype)
+        paid = seqs % 2 == 0
+        arr["event"] = np.where(paid, EVENT_PAYMENT, EVENT_EXECUTE)
+        # Executions of every tenth job belong to a job that was never paid
+        arr["job_id"] = np.char.add(np.where(~paid & (jobs % 10 == 0), b"lost-", b"job-"), jobs.astype("S20"))
+        arr["job_type"] = b"market_data"
+        arr["amount"] = np.where(paid, 100000, 0)
+        arr["timestamp"] = 1.7e9 + seqs
+        hashes = rng.integers(0, 2 ** 63, size=(n, 4), dtype=np.uint64)
+        hashes[~paid] = 0
+        arr["tx_hash"] = hashes.view("V32").ravel()
+        if base + n == records and n < segment_records:
+            data = arr.view(np.uint8).reshape(n, RECORD_SIZE)
+            for row in range(n):
+                arr["crc"][row] = zlib.crc32(data[row, 4:].tobytes())
+        for row in range(0, n, sample_every):
+            row += row % 2
+            if row < n:
+                samples.append(("0x" + bytes(arr["tx_hash"][row]).hex(), arr["job_id"][row].decode()))
+        arr.tofile(os.path.join(directory, f"seg-{base // segment_records:06d}.log"))
+    return samples
+
+
+def benchmark_rebuild(records: int):
+    """Index rebuild and lookups at `records` records"""
+    segment_records = 1 << 18
+    print(f"Benchmarking index rebuild at {records:,} records...")
+    directory = os.path.join(AUDIT_DIR, "bench-rebuild")
+    start = time.perf_counter()
+    samples = write_synthetic_log(os.path.join(directory, "writer-0"), records, segment_records,
+                                  sample_every=max(records // 2000, 2))
+    print(f"   wrote {records * RECORD_SIZE / 2 ** 30:.2f} GiB in {time.perf_counter() - start:.1f} s")
+
+    log = AuditLog(directory, segment_records=segment_records)
+    start = time.perf_counter()
+    log.open()
+    rebuild = time.perf_counter() - start
+    log.close()
+    print(f"   cold open (index files rebuilt): {rebuild:.2f} s, "
+          f"{records / rebuild / 1e6:.1f}M records/s")
+
+    start = time.perf_counter()
+    log.open()
+    warm = time.perf_counter() - start
+    print(f"   warm open (index files in place): {warm * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    for tx_hash, job_id in samples:
+        record = log.lookup_tx(tx_hash)
+        assert record is not None and record.job_id == job_id
+    tx_us = (time.perf_counter() - start) / len(samples) * 1e6
+    start = time.perf_counter()
+    for _, job_id in samples:
+        assert log.lookup_job(job_id)
+    job_us = (time.perf_counter() - start) / len(samples) * 1e6
+    missing = [f"0x{i:064x}" for i in range(1, 1001)]
+    start = time.perf_counter()
+    assert not any(log.lookup_tx(tx_hash) for tx_hash in missing)
+    miss_us = (time.perf_counter() - start) / len(missing) * 1e6
+    print(f"   lookup by tx_hash {tx_us:.1f} µs, by job_id {job_us:.1f} µs, "
+          f"unknown tx_hash {miss_us:.1f} µs ({len(samples)} samples)")
+
+    start = time.perf_counter()
+    summary = log.reconcile(limit=0)
+    print(f"   reconcile: {time.perf_counter() - start:.1f} s, "
+          f"{summary['payments']:,} payments, {summary['paid_unexecuted']:,} never executed")
+    assert summary["paid_unexecuted"] == (records + 19) // 20
+    log.close()
+    shutil.rmtree(directory)
+
+    ok = warm < WARM_OPEN_TARGET_S and max(tx_us, job_us, miss_us) < LOOKUP_TARGET_US
+    print(f"   targets: warm open <{WARM_OPEN_TARGET_S:.0f} s, lookups <{LOOKUP_TARGET_US} µs "
+          f"{'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=10_000_000, help="records in the rebuild benchmark")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("x402 PoC - Audit Log Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_lookups()
+        test_recovery()
+        test_group_commit()
+        test_bulk_readers()
+        test_api_replay()
+        print()
+        benchmark_appends()
+        passed = benchmark_rebuild(args.records)
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    finally:
+        shutil.rmtree(AUDIT_DIR, ignore_errors=True)
+
+    print()
+    print("=" * 60)
+    print("ALL AUDIT LOG TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
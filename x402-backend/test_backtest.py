@@ -0,0 +1,207 @@
+"""
+Backtest tests and throughput benchmark
+"""
+import asyncio
+import atexit
+import json
+import shutil
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from jobs import backtest
+from jobs.backtest import BacktestJob
+from marketdata.backtest import Strategy, run_backtest
+from marketdata.segments import SegmentWriter, CANDLE_SCHEMA
+
+CANDLES_DIR = tempfile.mkdtemp(prefix="x402-candles-")
+atexit.register(shutil.rmtree, CANDLES_DIR, ignore_errors=True)
+
+BENCHMARK_MARKETS = 2000
+BENCHMARK_BARS = 2000
+TARGET_BARS_PER_SECOND = 10_000_000
+
+STRATEGY = {
+    "side": "yes",
+    "size": 2,
+    "entry": {"price_below": 35, "min_volume": 20, "min_time_to_close": 3000},
+    "exit": {"price_above": 65, "take_profit": 12, "stop_loss": 8,
+             "max_hold_bars": 40, "time_to_close_below": 600},
+}
+
+
+def make_candles(rng, markets, bars):
+    """Random-walk candles, markets back to back"""
+    lengths = rng.integers(bars // 2, bars, markets)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    steps = rng.normal(0, 2, offsets[-1])
+    close = np.empty(offsets[-1])
+    timestamps = np.empty(offsets[-1])
+    for i in range(markets):
+        lo, hi = offsets[i], offsets[i + 1]
+        close[lo:hi] = np.clip(50 + np.cumsum(steps[lo:hi]), 1, 99)
+        timestamps[lo:hi] = 1_700_000_000 + np.arange(hi - lo) * 60.0
+    volume = rng.integers(0, 100, offsets[-1]).astype(float)
+    close_times = timestamps[offsets[1:] - 1] + rng.integers(-3000, 3000, markets)
+    return timestamps, close, volume, offsets, close_times
+
+
+def reference_backtest(strategy, timestamps, close, volume, offsets, close_times):
+    """Bar-by-bar simulation used to check the vectorized engine"""
+    entry_rules, exit_rules = strategy.entry, strategy.exit
+    direction = 1 if strategy.side == "yes" else -1
+    out = []
+    for m in range(len(offsets) - 1):
+        lo, hi = offsets[m], offsets[m + 1]
+        trades = wins = held = 0
+        pnl = peak = drawdown = 0.0
+        position = None
+        for j in range(lo, hi):
+            ttc = close_times[m] - timestamps[j]
+            if position is None:
+                if j == hi - 1:
+                    break
+                if (close[j] <= entry_rules["price_below"] and volume[j] >= entry_rules["min_volume"]
+                        and ttc >= entry_rules["min_time_to_close"]):
+                    position = j
+                continue
+            move = direction * (close[j] - close[position])
+            if (close[j] >= exit_rules["price_above"] or ttc <= exit_rules["time_to_close_below"]
+                    or move >= exit_rules["take_profit"] or move <= -exit_rules["stop_loss"]
+                    or j - position >= exit_rules["max_hold_bars"] or j == hi - 1):
+                result = move * strategy.size
+                trades += 1
+                wins += result > 0
+                pnl += result
+                peak = max(peak, pnl)
+                drawdown = max(drawdown, peak - pnl)
+                held += j - position
+                position = None
+        out.append((trades, wins, round(pnl, 6), round(drawdown, 6), held))
+    return out
+
+
+def test_matches_reference():
+    """Test the vectorized engine against a bar-by-bar loop"""
+    print("1. Testing engine against reference...")
+    rng = np.random.default_rng(7)
+    strategy = Strategy.from_params(STRATEGY)
+    candles = make_candles(rng, 60, 400)
+    results = run_backtest(strategy, *candles)
+    expected = reference_backtest(strategy, *candles)
+    actual = [
+        (int(results["trades"][i]), int(results["wins"][i]), round(float(results["pnl"][i]), 6),
+         round(float(results["max_drawdown"][i]), 6), int(results["bars_held"][i]))
+        for i in range(60)
+    ]
+    assert actual == expected
+    assert sum(r[0] for r in actual) > 100
+
+    no_side = Strategy.from_params({**STRATEGY, "side": "no"})
+    assert run_backtest(no_side, *candles)["trades"].sum() > 0
+
+    for bad in [None, {"entry": {}}, {"entry": {"price_below": -1}},
+                {"entry": {"price_below": 30}, "exit": {"nope": 1}}, {"side": "maybe"}]:
+        try:
+            Strategy.from_params(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted bad strategy {bad}")
+    print("   ✓ Engine matches reference PASS")
+
+
+def test_job_streams_and_cancels():
+    """Test the backtest job over stored candles, and closing it early"""
+    print("2. Testing backtest job...")
+    rng = np.random.default_rng(8)
+    timestamps, close, volume, offsets, close_times = make_candles(rng, 3, 300)
+    candle_history = SegmentWriter(CANDLES_DIR, CANDLE_SCHEMA)
+    for i in range(3):
+        lo, hi = offsets[i], offsets[i + 1]
+        candle_history.append(
+            f"K{i}", timestamp=timestamps[lo:hi], open=close[lo:hi], high=close[lo:hi],
+            low=close[lo:hi], close=close[lo:hi], volume=volume[lo:hi],
+        )
+    candle_history.flush()
+
+    params = {
+        "markets": ["K0", "K1", "K2", "NOPE"],
+        "strategy": STRATEGY,
+        "close_times": {f"K{i}": float(close_times[i]) for i in range(3)},
+    }
+    job = BacktestJob(job_id="t", params=params)
+    assert job.validate_params() == (True, "")
+    assert BacktestJob(job_id="t", params={**params, "strategy": {}}).validate_params()[0] is False
+    assert BacktestJob(job_id="t", params={**params, "close_times": {"K0": "soon"}}).validate_params()[0] is False
+
+    async def collect(job):
+        return [json.loads(line) async for line in job.execute()]
+
+    async def abort():
+        stream = job.execute()
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    # The job reads the app's candles directory, bound when config was imported
+    with patch.object(backtest, "CANDLES_DIR", CANDLES_DIR):
+        lines = asyncio.run(collect(job))
+        first = json.loads(asyncio.run(abort()))
+    expected = reference_backtest(Strategy.from_params(STRATEGY), timestamps, close, volume, offsets, close_times)
+    assert [line["trades"] for line in lines[:3]] == [e[0] for e in expected]
+    assert lines[3]["bars"] == 0 and lines[3]["trades"] == 0
+    assert lines[-1]["event"] == "summary" and lines[-1]["trades"] == sum(e[0] for e in expected)
+    assert first["market_ticker"] == "K0"
+    print("   ✓ Backtest job PASS")
+
+
+def benchmark_backtest():
+    """Benchmark markets x bars simulated per second"""
+    print(f"Benchmarking backtest over {BENCHMARK_MARKETS:,} markets...")
+    rng = np.random.default_rng(9)
+    candles = make_candles(rng, BENCHMARK_MARKETS, BENCHMARK_BARS)
+    bars = int(candles[3][-1])
+    strategy = Strategy.from_params(STRATEGY)
+
+    run_backtest(strategy, *candles)
+    iterations = 5
+    start = time.perf_counter()
+    for _ in range(iterations):
+        results = run_backtest(strategy, *candles)
+    elapsed = (time.perf_counter() - start) / iterations
+    rate = bars / elapsed
+    print(f"   {bars:,} bars, {int(results['trades'].sum()):,} trades in {elapsed * 1000:.1f} ms")
+    print(f"   {rate:,.0f} market-bars/s")
+
+    ok = rate >= TARGET_BARS_PER_SECOND
+    print(f"   target: {TARGET_BARS_PER_SECOND:,} market-bars/s {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Backtest Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_matches_reference()
+        test_job_streams_and_cancels()
+        print()
+        passed = benchmark_backtest()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL BACKTEST TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+"""
+Job budget and teardown tests: wall-clock and output limits, pool CPU and
+memory limits, and 10k aborted streams without leaked processes
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from jobs.base import Job
+from jobs.budget import JobBudget, BudgetExceeded, run_within_budget
+from jobs.ping import PingJob
+from jobs.workers import WorkerPool, WorkerError, worker_pool
+from streaming.sse import create_sse_response, stream_job_output
+
+ABORTED_STREAMS = 10000
+STREAM_CONCURRENCY = 32
+
+
+class TickJob(Job):
+    """Emits `count` chunks of `size` bytes, `interval` seconds apart"""
+
+    closed = 0
+    max_seconds = 60.0
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "tick"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        return Decimal(0)
+
+    @classmethod
+    def budget(cls) -> JobBudget:
+        return JobBudget(cls.max_seconds, 1000)
+
+    def validate_params(self) -> tuple[bool, str]:
+        return True, ""
+
+    async def execute(self):
+        try:
+            for i in range(self.params.get("count", 10)):
+                if self.params.get("interval"):
+                    await asyncio.sleep(self.params["interval"])
+                if self.params.get("raise_timeout") == i:
+                    raise TimeoutError("upstream timed out")
+                yield "x" * self.params.get("size", 10)
+        finally:
+            TickJob.closed += 1
+
+
+class ShellPingJob(PingJob):
+    """PingJob running a shell loop that never exits and has a child of its own"""
+
+    def command(self):
+        return ["sh", "-c", "echo $$; sleep 1000 & while :; do echo tick; sleep 0.05; done"]
+
+
+def spin_batch(seconds: float) -> int:
+    """CPU-bound pool task"""
+    deadline = time.process_time() + seconds
+    n = 0
+    while time.process_time() < deadline:
+        n += 1
+    return n
+
+
+def allocate(nbytes: int) -> int:
+    return len(bytearray(nbytes))
+
+
+class PoolJob(Job):
+    """Streams the results of CPU-bound batches run in the worker pool"""
+
+    closed = 0
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "pool"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        return Decimal(0)
+
+    def validate_params(self) -> tuple[bool, str]:
+        return True, ""
+
+    async def execute(self):
+        try:
+            for _ in range(self.params.get("batches", 3)):
+                yield str(await worker_pool.run(spin_batch, self.params.get("seconds", 0.02)))
+        finally:
+            PoolJob.closed += 1
+
+
+def group_alive(pgid: int) -> bool:
+    """Whether any process of the group is still running (zombies do not count)"""
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        fields = stat[stat.rindex(")") + 2:].split()
+        if int(fields[2]) == pgid and fields[0] != "Z":
+            return True
+    return False
+
+
+def descendants() -> dict:
+    """pid -> (command, state) for every process below this one"""
+    parents, info = {}, {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        command = stat[stat.index("(") + 1:stat.rindex(")")]
+        state, ppid = stat[stat.rindex(")") + 2:].split()[:2]
+        parents[int(name)] = int(ppid)
+        info[int(name)] = (command, state)
+    found, frontier = {}, {os.getpid()}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier}
+        found.update((pid, info[pid]) for pid in frontier)
+    return found
+
+
+def test_time_and_output_budgets():
+    """Test that runs stop at their deadline and output cap"""
+    print("1. Testing wall-clock and output budgets...")
+    TickJob.max_seconds = 0.2
+
+    async def collect(job, hold: float = 0):
+        chunks = []
+        try:
+            async for chunk in run_within_budget(job):
+                chunks.append(chunk)
+                await asyncio.sleep(hold)
+        except BudgetExceeded as e:
+            return chunks, str(e)
+        return chunks, None
+
+    async def run():
+        # Stuck inside an await: cancelled there, at the deadline
+        start = time.perf_counter()
+        chunks, error = await collect(TickJob("stuck", {"count": 3, "interval": 10}))
+        assert chunks == [] and "0.2 s time budget" in error
+        assert 0.15 < time.perf_counter() - start < 1
+
+        # Deadline passes while the consumer holds a chunk
+        chunks, error = await collect(TickJob("held", {"count": 5}), hold=0.3)
+        assert len(chunks) == 1 and "time budget" in error
+
+        chunks, error = await collect(TickJob("big", {"count": 10, "size": 300}))
+        assert len(chunks) == 3 and "1000 byte output budget" in error
+        assert await collect(TickJob("ok", {"count": 3, "interval": 0.01})) == (["x" * 10] * 3, None)
+
+        # A job's own timeout and outside cancellation are not budget errors
+        try:
+            await collect(TickJob("own", {"count": 3, "raise_timeout": 1}))
+            raise AssertionError("TimeoutError swallowed")
+        except TimeoutError:
+            pass
+        task = asyncio.create_task(collect(TickJob("outside", {"count": 3, "interval": 10})))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+            raise AssertionError("cancellation swallowed")
+        except asyncio.CancelledError:
+            pass
+
+        events = [e async for e in stream_job_output(TickJob("sse", {"count": 3, "interval": 10}))]
+        assert [e["event"] for e in events] == ["start", "error"] and "time budget" in events[-1]["data"]
+
+    TickJob.closed = 0
+    asyncio.run(run())
+    assert TickJob.closed == 7
+    TickJob.max_seconds = 60.0
+    print("   ✓ Wall-clock and output budgets PASS")
+
+
+def test_subprocess_teardown():
+    """Test that closing a ping stream kills its whole process group"""
+    print("2. Testing subprocess teardown...")
+
+    async def run(cancel: bool):
+        stream = ShellPingJob("ping", {"host": "localhost"}).execute()
+        await stream.__anext__()
+        pgid = int(await stream.__anext__())
+        assert group_alive(pgid)
+        if cancel:
+            # Cancelled while waiting on the subprocess's output
+            task = asyncio.create_task(stream.__anext__())
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await stream.aclose()
+        return pgid
+
+    for cancel in (False, True):
+        pgid = asyncio.run(run(cancel))
+        # SIGKILL is delivered asynchronously to the backgrounded sleep
+        deadline = time.monotonic() + 2
+        while group_alive(pgid) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not group_alive(pgid)
+    print("   ✓ Subprocess teardown PASS")
+
+
+def test_worker_pool_limits():
+    """Test per-task CPU and memory limits and kill on cancel"""
+    print("3. Testing worker pool limits...")
+    pool = WorkerPool(max_workers=2, memory_bytes=512 * 1024 ** 2)
+
+    async def fails(*args, **kwargs):
+        try:
+            await pool.run(*args, **kwargs)
+        except WorkerError as e:
+            return str(e)
+        raise AssertionError("task should have failed")
+
+    async def run():
+        assert await pool.run(spin_batch, 0.01) > 0
+        assert "0.2 s CPU budget" in await fails(spin_batch, 5, cpu_seconds=0.2)
+        assert "512 MiB worker memory limit" in await fails(allocate, 1024 ** 3)
+        assert "ZeroDivisionError" in await fails(divmod, 1, 0)
+        # Limits fail the task, not the worker
+        assert pool.killed == 0 and pool.workers == 1
+        assert await pool.run(allocate, 64 * 1024 ** 2) == 64 * 1024 ** 2
+
+        # A cancelled task's worker is killed, and replaced on demand
+        pid = pool._idle[0].process.pid
+        try:
+            await asyncio.wait_for(pool.run(spin_batch, 30, cpu_seconds=60), 0.3)
+            raise AssertionError("task should have timed out")
+        except asyncio.TimeoutError:
+            pass
+        assert pool.killed == 1 and pool.workers == 0 and pid not in descendants()
+        results = await asyncio.gather(*(pool.run(spin_batch, 0.01) for _ in range(6)))
+        assert len(results) == 6 and pool.workers == 2
+
+        # Large results arrive whole; the loop keeps running meanwhile
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        assert len(await pool.run(bytes, 64 * 1024 ** 2)) == 64 * 1024 ** 2
+        ticker.cancel()
+        assert ticks > 1
+
+    asyncio.run(run())
+    pool.shutdown()
+    assert pool.workers == 0
+
+    # Without a memory budget the error still reports
+    unlimited = WorkerPool(max_workers=1, memory_bytes=None)
+    try:
+        asyncio.run(unlimited.run(allocate, 2 ** 62))
+    except WorkerError as e:
+        assert "ran out of memory" in str(e)
+    else:
+        raise AssertionError("task should have failed")
+    finally:
+        unlimited.shutdown()
+    print("   ✓ Worker pool limits PASS")
+
+
+async def aborted_stream(job, after: int):
+    """Serve an SSE job stream in process; the client leaves after `after` body chunks"""
+    chunks = 0
+    gone = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal chunks
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks += 1
+            if chunks >= after:
+                gone.set()
+
+    scope = {
+        "type": "http", "method": "GET", "path": f"/api/jobs/execute/{job.job_id}",
+        "headers": [], "query_string": b"", "http_version": "1.1", "scheme": "http",
+        "server": ("test", 80), "client": ("127.0.0.1", 1234), "root_path": "",
+    }
+    await create_sse_response(job)(scope, receive, send)
+
+
+def benchmark_aborted_streams():
+    """Abort 10k streams of subprocess, pool and async jobs; nothing may leak"""
+    print(f"Aborting {ABORTED_STREAMS:,} streams ({STREAM_CONCURRENCY} at a time)...")
+
+    def make_job(i: int) -> Job:
+        kind = i % 3
+        if kind == 0:
+            return ShellPingJob(f"ping-{i}", {"host": "localhost"})
+        if kind == 1:
+            return PoolJob(f"pool-{i}", {"batches": 3, "seconds": 0.005})
+        return TickJob(f"tick-{i}", {"count": 1000, "interval": 0.001})
+
+    async def run():
+        slots = asyncio.Semaphore(STREAM_CONCURRENCY)
+
+        async def one(i):
+            async with slots:
+                # Leave right after "start" (job mid-await) or after the first output
+                await aborted_stream(make_job(i), after=1 + i % 2)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(ABORTED_STREAMS)))
+        elapsed = time.perf_counter() - start
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return elapsed
+
+    # Warm the forkserver, then take the baseline with no pool workers
+    asyncio.run(worker_pool.run(spin_batch, 0.001))
+    worker_pool.shutdown()
+    baseline = descendants()
+    fds = len(os.listdir("/proc/self/fd"))
+    threads = threading.active_count()
+    TickJob.closed = PoolJob.closed = 0
+
+    elapsed = asyncio.run(run())
+    assert worker_pool.workers <= worker_pool.max_workers
+    killed = worker_pool.killed
+    worker_pool.shutdown()
+
+    # Child watcher threads finish right after their process is reaped
+    deadline = time.monotonic() + 5
+    while (descendants() != baseline or threading.active_count() > threads) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    leaked = {pid: info for pid, info in descendants().items() if pid not in baseline}
+    print(f"   {ABORTED_STREAMS / elapsed:,.0f} aborted streams/s, {killed:,} busy pool workers killed")
+    print(f"   leaked: {len(leaked)} processes, {len(os.listdir('/proc/self/fd')) - fds} fds, "
+          f"{threading.active_count() - threads} threads")
+    assert TickJob.closed == ABORTED_STREAMS // 3
+    assert PoolJob.closed == (ABORTED_STREAMS + 1) // 3
+    assert killed > 0
+
+    ok = not leaked and len(os.listdir("/proc/self/fd")) == fds and threading.active_count() <= threads
+    print(f"   target: nothing leaked {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Job Budget Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_time_and_output_budgets()
+        test_subprocess_teardown()
+        test_worker_pool_limits()
+        print()
+        passed = benchmark_aborted_streams()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL BUDGET TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
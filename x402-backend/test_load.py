@@ -0,0 +1,516 @@
+"""
+End-to-end load benchmark against local stand-ins for the Movement RPC
+and the market-data upstream
+
+    python test_load.py --concurrency 32 --flows 2000 --rpc-latency 0.05 --json run.json
+
+Runs three processes: the stand-ins, the app under uvicorn and this load
+driver. Each flow walks request -> 402 -> pay -> verify-payment ->
+execute/SSE (or, with --flow x402, pays first and sends X-PAYMENT).
+Throughput, p50/p95/p99 per stage and the app's memory growth are
+reported; --json writes them out for comparing releases.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+from aiohttp import web
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RECIPIENT = "0x1c3aee2b139c069bac975c7f87c4dce8143285f1ec7df2889f5ae1c08ae1ba53"
+STAGES = ("request", "pay", "verify", "first_output", "stream", "total")
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+class FakeMovementRPC:
+    """
+    Movement RPC subset used by the verifier
+
+    Submitted transfers stay pending for `confirm_delay` seconds. Lookups
+    take `latency` seconds and fail with a 500 at `failure_rate`.
+    """
+
+    def __init__(self, latency: float, failure_rate: float, confirm_delay: float, rng: random.Random):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.confirm_delay = confirm_delay
+        self.rng = rng
+        self.transactions = {}
+        self.stats = Counter()
+
+    def routes(self, app: web.Application):
+        app.router.add_get("/", self.ledger_info)
+        app.router.add_post("/transactions", self.submit)
+        app.router.add_get("/transactions/by_hash/{tx_hash}", self.by_hash)
+
+    async def ledger_info(self, request):
+        return web.json_response({"chain_id": 250, "ledger_version": str(len(self.transactions))})
+
+    async def submit(self, request):
+        body = await request.json()
+        tx_hash = "0x" + uuid.uuid4().hex + uuid.uuid4().hex
+        self.transactions[tx_hash] = (time.monotonic() + self.confirm_delay, body)
+        self.stats["submitted"] += 1
+        return web.json_response({"hash": tx_hash}, status=202)
+
+    async def by_hash(self, request):
+        self.stats["lookups"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rng.random() < self.failure_rate:
+            self.stats["injected_failures"] += 1
+            return web.json_response({"message": "injected failure"}, status=500)
+        tx_hash = request.match_info["tx_hash"]
+        entry = self.transactions.get(tx_hash)
+        if entry is None:
+            return web.json_response({"message": "not found"}, status=404)
+        committed_at, body = entry
+        if time.monotonic() < committed_at:
+            return web.json_response({"type": "pending_transaction", "hash": tx_hash})
+        return web.json_response({
+            "type": "user_transaction",
+            "hash": tx_hash,
+            "version": str(len(self.transactions)),
+            "success": True,
+            "sender": body["sender"],
+            "payload": {
+                "function": "0x1::aptos_account::transfer",
+                "arguments": [body["recipient"], str(body["amount"])],
+            },
+        })
+
+
+class FakeMarketUpstream:
+    """Market-data API whose trade feed has a few fresh trades per market, and a book per market"""
+
+    def __init__(self, latency: float, failure_rate: float, markets: int, rng: random.Random):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.markets = markets
+        self.rng = rng
+        self.stats = Counter()
+
+    def routes(self, app: web.Application):
+        app.router.add_get("/markets/trades", self.trades)
+        app.router.add_get("/markets/{ticker}/orderbook", self.orderbook)
+
+    async def _delay_or_fail(self):
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rng.random() < self.failure_rate:
+            self.stats["injected_failures"] += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+        return None
+
+    async def trades(self, request):
+        failure = await self._delay_or_fail()
+        if failure is not None:
+            return failure
+        now = datetime.now(timezone.utc).isoformat()
+        ticker = request.query.get("ticker")
+        trades = [
+            {
+                "trade_id": uuid.uuid4().hex,
+                "ticker": market,
+                "created_time": now,
+                "yes_price": self.rng.randint(1, 99),
+                "count": self.rng.randint(1, 50),
+                "taker_side": self.rng.choice(("yes", "no")),
+            }
+            for market in ([ticker] if ticker else [f"LOAD-{i}" for i in range(self.markets)])
+            for _ in range(self.rng.randint(1, 5))
+        ]
+        return web.json_response({"trades": trades, "cursor": ""})
+
+    async def orderbook(self, request):
+        failure = await self._delay_or_fail()
+        if failure is not None:
+            return failure
+        mid = self.rng.randint(10, 90)
+        return web.json_response({"orderbook": {
+            "yes": [[mid - i, self.rng.randint(1, 500)] for i in range(1, 4)],
+            "no": [[100 - mid - i, self.rng.randint(1, 500)] for i in range(1, 4)],
+        }})
+
+
+async def serve_fakes(args):
+    """Run both stand-ins and print their URLs as one JSON line"""
+    rng = random.Random(args.seed)
+    rpc = FakeMovementRPC(args.rpc_latency, args.rpc_failure_rate, args.confirm_delay, rng)
+    upstream = FakeMarketUpstream(args.upstream_latency, args.upstream_failure_rate, args.markets, rng)
+
+    urls = {}
+    for name, fake in (("rpc", rpc), ("upstream", upstream)):
+        app = web.Application()
+        fake.routes(app)
+        app.router.add_get("/_stats", lambda request, fake=fake: web.json_response(fake.stats))
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        urls[name] = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    print(json.dumps(urls), flush=True)
+    await asyncio.Event().wait()
+
+
+# ---------------------------------------------------------------------------
+# App under test
+# ---------------------------------------------------------------------------
+
+def serve_app(args):
+    """Run main.app against the stand-ins; the app ingests from the upstream stand-in itself"""
+    os.environ["BASE_RPC"] = args.rpc_url
+    os.environ["MARKET_API_URL"] = args.upstream_url
+    os.environ["INGEST_INTERVAL"] = str(args.ingest_interval)
+    os.environ["HISTORY_DIR"] = args.history_dir
+    os.environ["AUDIT_LOG_DIR"] = os.path.join(args.history_dir, "audit")
+    os.environ["HANDOFF_DIR"] = os.path.join(args.history_dir, "handoff")
+    # One client IP drives all load; admission control would dominate the numbers
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    if args.poll_interval is not None:
+        os.environ["TRANSACTION_POLL_INTERVAL"] = str(args.poll_interval)
+    sys.path.insert(0, HERE)
+
+    import uvicorn
+    from main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def tickers(args):
+    return [f"LOAD-{i}" for i in range(args.markets)]
+
+
+# ---------------------------------------------------------------------------
+# Load driver
+# ---------------------------------------------------------------------------
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LoadDriver:
+    """Drive concurrent paid flows and record per-stage latency"""
+
+    def __init__(self, args, base: str, rpc: str):
+        self.args = args
+        self.base = base
+        self.rpc = rpc
+        self.timings = defaultdict(list)
+        self.errors = Counter()
+        rng = random.Random(args.seed)
+        self.wallets = ["0x" + "%064x" % rng.getrandbits(256) for _ in range(args.wallets)]
+        self.params = json.loads(args.params) if args.params else {"tickers": tickers(args)}
+        self.price = None
+
+    async def pay(self, session, sender: str, amount: str) -> str:
+        start = time.perf_counter()
+        body = {"sender": sender, "recipient": RECIPIENT, "amount": amount}
+        async with session.post(f"{self.rpc}/transactions", json=body) as resp:
+            tx_hash = (await resp.json())["hash"]
+        self.timings["pay"].append(time.perf_counter() - start)
+        return tx_hash
+
+    async def stream(self, session, job_id: str, flow_start: float, record: bool):
+        start = time.perf_counter()
+        first = None
+        async with session.get(f"{self.base}/api/jobs/execute/{job_id}") as resp:
+            if resp.status != 200:
+                raise FlowError("stream", resp.status)
+            async for line in resp.content:
+                if first is None and line.startswith(b"event: output"):
+                    first = time.perf_counter()
+                elif line.startswith(b"event: error"):
+                    raise FlowError("stream", "error event")
+                elif line.startswith(b"event: complete"):
+                    break
+        end = time.perf_counter()
+        if record:
+            self.timings["first_output"].append((first or end) - start)
+            self.timings["stream"].append(end - (first or start))
+            self.timings["total"].append(end - flow_start)
+
+    async def classic_flow(self, session, wallet: str, record: bool):
+        flow_start = start = time.perf_counter()
+        body = {"job_type": self.args.job_type, "params": self.params, "wallet_address": wallet}
+        async with session.post(f"{self.base}/api/jobs/request", json=body) as resp:
+            if resp.status != 402:
+                raise FlowError("request", resp.status)
+            quote = await resp.json()
+        self.timings["request"].append(time.perf_counter() - start)
+
+        tx_hash = await self.pay(session, wallet, quote["payment"]["amount"])
+
+        start = time.perf_counter()
+        confirmation = {"job_id": quote["job_id"], "tx_hash": tx_hash}
+        async with session.post(f"{self.base}/api/jobs/verify-payment", json=confirmation) as resp:
+            if resp.status != 200:
+                raise FlowError("verify", resp.status)
+        self.timings["verify"].append(time.perf_counter() - start)
+
+        await self.stream(session, quote["job_id"], flow_start, record)
+
+    async def x402_flow(self, session, wallet: str, record: bool):
+        flow_start = time.perf_counter()
+        job_id = str(uuid.uuid4())
+        tx_hash = await self.pay(session, wallet, self.price)
+
+        start = time.perf_counter()
+        body = {"job_type": self.args.job_type, "params": self.params,
+                "wallet_address": wallet, "job_id": job_id}
+        header = json.dumps({"tx_hash": tx_hash, "sender": wallet, "amount": self.price})
+        async with session.post(f"{self.base}/api/jobs/request", json=body,
+                                headers={"X-PAYMENT": header}) as resp:
+            if resp.status != 200:
+                raise FlowError("verify", resp.status)
+        self.timings["verify"].append(time.perf_counter() - start)
+
+        await self.stream(session, job_id, flow_start, record)
+
+    async def run_flows(self, session, count: int, record: bool = True):
+        flow = self.x402_flow if self.args.flow == "x402" else self.classic_flow
+        slots = asyncio.Semaphore(self.args.concurrency)
+
+        async def one(i):
+            async with slots:
+                try:
+                    await flow(session, self.wallets[i % len(self.wallets)], record)
+                except FlowError as e:
+                    self.errors[f"{e.stage}:{e.detail}"] += 1
+                except Exception as e:
+                    self.errors[f"client:{type(e).__name__}"] += 1
+
+        await asyncio.gather(*(one(i) for i in range(count)))
+
+    async def run(self, app_pid: int):
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=0)
+        timeout = aiohttp.ClientTimeout(total=120)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async with session.get(f"{self.base}/api/jobs") as resp:
+                jobs = (await resp.json())["jobs"]
+            self.price = jobs[self.args.job_type]["price"] if self.args.job_type in jobs else "0"
+
+            await self.run_flows(session, self.args.warmup, record=False)
+            self.timings.clear()
+            self.errors.clear()
+
+            rss_start = rss_kb(app_pid)
+            start = time.perf_counter()
+            await self.run_flows(session, self.args.flows)
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(0.5)
+            rss_end = rss_kb(app_pid)
+
+        return elapsed, rss_start, rss_end
+
+
+class FlowError(Exception):
+    def __init__(self, stage: str, detail):
+        super().__init__(f"{stage}: {detail}")
+        self.stage = stage
+        self.detail = detail
+
+
+async def fetch_stats(urls):
+    import aiohttp
+
+    stats = {}
+    async with aiohttp.ClientSession() as session:
+        for name, url in urls.items():
+            async with session.get(f"{url}/_stats") as resp:
+                stats[name] = await resp.json()
+    return stats
+
+
+def summarize(driver: LoadDriver, elapsed: float, rss_start: int, rss_end: int, fake_stats) -> dict:
+    completed = len(driver.timings["total"])
+    stages = {}
+    for stage in STAGES:
+        values = driver.timings.get(stage)
+        if values:
+            p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+            stages[stage] = {"count": len(values), "p50_ms": round(float(p50), 2),
+                             "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+    return {
+        "flows": driver.args.flows,
+        "completed": completed,
+        "errors": dict(driver.errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_flows_per_s": round(completed / elapsed, 2) if elapsed else 0.0,
+        "stages": stages,
+        "memory": {
+            "rss_start_kb": rss_start,
+            "rss_end_kb": rss_end,
+            "growth_kb": rss_end - rss_start,
+            "growth_kb_per_1k_flows": round((rss_end - rss_start) * 1000 / max(completed, 1), 1),
+        },
+        "stand_ins": fake_stats,
+    }
+
+
+def print_report(config: dict, result: dict):
+    print(f"   flow={config['flow']} job_type={config['job_type']} "
+          f"concurrency={config['concurrency']} flows={config['flows']}")
+    print(f"   rpc latency={config['rpc_latency']}s failures={config['rpc_failure_rate']:.0%} "
+          f"confirm={config['confirm_delay']}s; upstream latency={config['upstream_latency']}s "
+          f"failures={config['upstream_failure_rate']:.0%}")
+    print()
+    print(f"   {'stage':<13}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in result["stages"].items():
+        print(f"   {stage:<13}{row['count']:>7}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+    print()
+    memory = result["memory"]
+    print(f"   {result['completed']}/{result['flows']} flows in {result['elapsed_s']:.2f}s "
+          f"({result['throughput_flows_per_s']:.1f} flows/s)")
+    print(f"   app RSS {memory['rss_start_kb'] / 1024:.1f} -> {memory['rss_end_kb'] / 1024:.1f} MB "
+          f"({memory['growth_kb_per_1k_flows']:.0f} KB per 1k flows)")
+    if result["errors"]:
+        print(f"   errors: {result['errors']}")
+    stand_ins = result["stand_ins"]
+    print(f"   RPC lookups {stand_ins['rpc'].get('lookups', 0)} "
+          f"(injected failures {stand_ins['rpc'].get('injected_failures', 0)}), "
+          f"upstream requests {stand_ins['upstream'].get('requests', 0)} "
+          f"(injected failures {stand_ins['upstream'].get('injected_failures', 0)})")
+
+
+def run_benchmark(args) -> dict:
+    """Start the stand-ins and the app, drive the load and tear everything down"""
+    history_dir = tempfile.mkdtemp(prefix="x402-load-")
+    common = [
+        "--rpc-latency", str(args.rpc_latency), "--rpc-failure-rate", str(args.rpc_failure_rate),
+        "--confirm-delay", str(args.confirm_delay), "--upstream-latency", str(args.upstream_latency),
+        "--upstream-failure-rate", str(args.upstream_failure_rate), "--seed", str(args.seed),
+        "--markets", str(args.markets), "--ingest-interval", str(args.ingest_interval),
+    ]
+    fakes = subprocess.Popen(
+        [sys.executable, __file__, "--role", "fakes", *common],
+        stdout=subprocess.PIPE, text=True, cwd=HERE,
+    )
+    app = None
+    try:
+        urls = json.loads(fakes.stdout.readline())
+        port = free_port()
+        app_args = [sys.executable, __file__, "--role", "app", *common, "--port", str(port),
+                    "--rpc-url", urls["rpc"], "--upstream-url", urls["upstream"],
+                    "--history-dir", history_dir]
+        if args.poll_interval is not None:
+            app_args += ["--poll-interval", str(args.poll_interval)]
+        app = subprocess.Popen(app_args, cwd=HERE)
+
+        for _ in range(200):
+            try:
+                socket.create_connection(("127.0.0.1", port)).close()
+                break
+            except OSError:
+                if app.poll() is not None:
+                    raise RuntimeError("app exited during startup")
+                time.sleep(0.05)
+        # Let the first ingest round land before measuring
+        time.sleep(max(0.5, args.ingest_interval))
+
+        driver = LoadDriver(args, f"http://127.0.0.1:{port}", urls["rpc"])
+        elapsed, rss_start, rss_end = asyncio.run(driver.run(app.pid))
+        fake_stats = asyncio.run(fetch_stats(urls))
+        return summarize(driver, elapsed, rss_start, rss_end, fake_stats)
+    finally:
+        for process in (app, fakes):
+            if process is not None:
+                process.terminate()
+                process.wait()
+        shutil.rmtree(history_dir, ignore_errors=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--role", choices=("driver", "fakes", "app"), default="driver",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--flow", choices=("classic", "x402"), default="classic",
+                        help="402 then verify-payment, or pay first with X-PAYMENT")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--flows", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--job-type", default="market_data")
+    parser.add_argument("--params", help="job params as JSON (default: all load markets)")
+    parser.add_argument("--markets", type=int, default=20)
+    parser.add_argument("--rpc-latency", type=float, default=0.02)
+    parser.add_argument("--rpc-failure-rate", type=float, default=0.0)
+    parser.add_argument("--confirm-delay", type=float, default=0.05,
+                        help="seconds a submitted payment stays pending")
+    parser.add_argument("--poll-interval", type=float,
+                        help="override TRANSACTION_POLL_INTERVAL in the app")
+    parser.add_argument("--upstream-latency", type=float, default=0.02)
+    parser.add_argument("--upstream-failure-rate", type=float, default=0.0)
+    parser.add_argument("--ingest-interval", type=float, default=1.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write config and results to this file")
+    # App role only
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--rpc-url", help=argparse.SUPPRESS)
+    parser.add_argument("--upstream-url", help=argparse.SUPPRESS)
+    parser.add_argument("--history-dir", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.role == "fakes":
+        asyncio.run(serve_fakes(args))
+        return 0
+    if args.role == "app":
+        serve_app(args)
+        return 0
+
+    print("=" * 60)
+    print("x402 PoC - End-to-End Load Benchmark")
+    print("=" * 60)
+    print()
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("role", "port", "rpc_url", "upstream_url", "history_dir", "json")}
+    result = run_benchmark(args)
+    print_report(config, result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": config, "result": result}, f, indent=2)
+        print(f"   wrote {args.json}")
+
+    failed = args.flows - result["completed"]
+    passed = failed <= args.flows * args.max_error_rate
+    print()
+    print("=" * 60)
+    print("LOAD BENCHMARK COMPLETED ✓" if passed else f"LOAD BENCHMARK FAILED: {failed} flows failed ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Metrics tests and instrumentation overhead benchmark
+"""
+import asyncio
+import sys
+import time
+from decimal import Decimal
+
+import httpx
+from aiohttp import web
+from fastapi import FastAPI
+
+from jobs.base import Job
+from jobs.results import ResultStore
+from jobs.scheduler import JobScheduler
+from metrics.registry import MetricsRegistry, metrics
+from metrics.jobs import job_started, job_finished, output_size
+from metrics.loop_lag import LoopLagMonitor
+from payments import aptos_verify
+from streaming.sse import create_sse_response, stream_job_output
+
+SENDER = "0x" + "ab" * 32
+OVERHEAD_TARGET = 0.01
+
+
+class ChunkJob(Job):
+    """Yields a fixed number of small JSON chunks"""
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "test_chunks"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        return Decimal("0.001")
+
+    def validate_params(self) -> tuple[bool, str]:
+        return True, ""
+
+    async def execute(self):
+        for i in range(self.params.get("count", 10)):
+            if self.params.get("fail_at") == i:
+                raise RuntimeError("boom")
+            yield f'{{"n": {i}, "price": 0.5{i % 10}, "market": "MKT-{i % 7}"}}\n'
+
+
+class FakeRPC:
+    """Movement RPC serving a single successful transfer"""
+
+    def __init__(self):
+        app = web.Application()
+        app.router.add_get("/transactions/by_hash/{tx_hash}", self.transaction)
+        self.runner = web.AppRunner(app)
+
+    async def transaction(self, request):
+        tx_hash = request.match_info["tx_hash"]
+        if tx_hash == "0xmissing":
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response({
+            "hash": tx_hash, "type": "user_transaction", "success": True,
+            "sender": SENDER, "version": "1",
+            "payload": {"function": "0x1::aptos_account::transfer", "arguments": []},
+        })
+
+    async def start(self) -> str:
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def sample(text: str, line_start: str) -> float:
+    """Value of the first exposition line starting with `line_start`"""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_start} not in metrics output")
+
+
+def test_exposition_format():
+    """Test counter, gauge and histogram rendering"""
+    print("1. Testing exposition format...")
+    registry = MetricsRegistry(enabled=True)
+    requests = registry.counter("t_requests_total", "Requests", labels=("path",))
+    latency = registry.histogram("t_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.gauge("t_queue", "Queue depth", labels=("state",), collect=lambda: {("x",): 3})
+
+    requests.inc('a"b')
+    requests.inc('a"b', amount=2)
+    for value in (0.05, 0.1, 0.5, 7):
+        latency.observe(value)
+    assert registry.counter("t_requests_total", "Requests", labels=("path",)) is requests
+    try:
+        registry.gauge("t_requests_total", "Requests")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("conflicting metric was registered")
+
+    text = registry.render()
+    assert "# TYPE t_requests_total counter" in text
+    assert 't_requests_total{path="a\\"b"} 3' in text
+    assert 't_latency_seconds_bucket{le="0.1"} 2' in text
+    assert 't_latency_seconds_bucket{le="1.0"} 3' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "t_latency_seconds_count 4" in text and "t_latency_seconds_sum 7.65" in text
+    assert 't_queue{state="x"} 3' in text
+
+    registry.enabled = False
+    requests.inc('a"b')
+    latency.observe(1)
+    assert requests.value('a"b') == 3 and latency.count() == 4
+    print("   ✓ Exposition format PASS")
+
+
+def test_rpc_and_verification():
+    """Test RPC latency and verification outcome metrics against a fake RPC"""
+    print("2. Testing RPC and verification metrics...")
+
+    async def run():
+        rpc = FakeRPC()
+        aptos_verify.BASE_RPC = await rpc.start()
+        try:
+            assert (await aptos_verify.verify_move_payment("0x1", SENDER, 100))[0]
+            assert not (await aptos_verify.verify_move_payment("0x2", "0x" + "cd" * 32, 100))[0]
+            assert not (await aptos_verify.verify_move_payment("0xmissing", SENDER, 100))[0]
+        finally:
+            await rpc.stop()
+        # Nothing listening any more
+        assert await aptos_verify.get_transaction("0x3") is None
+
+    asyncio.run(run())
+    text = metrics.render()
+    assert sample(text, 'x402_payment_verifications_total{outcome="verified"}') == 1
+    assert sample(text, 'x402_payment_verifications_total{outcome="sender_mismatch"}') == 1
+    assert sample(text, 'x402_payment_verifications_total{outcome="not_found"}') == 1
+    assert sample(text, 'x402_rpc_get_transaction_seconds_count{outcome="found"}') == 2
+    assert sample(text, 'x402_rpc_get_transaction_seconds_count{outcome="not_found"}') == 1
+    assert sample(text, 'x402_rpc_get_transaction_seconds_count{outcome="error"}') == 1
+    print("   ✓ RPC and verification metrics PASS")
+
+
+def test_job_metrics():
+    """Test queue wait, execution time and stream size across transports"""
+    print("3. Testing job metrics...")
+
+    async def run():
+        job = ChunkJob(job_id="m1", params={"count": 25})
+        job.paid_at = time.monotonic() - 2
+        events = [event async for event in stream_job_output(job)]
+        assert len(events) == 27
+
+        failing = ChunkJob(job_id="m2", params={"count": 25, "fail_at": 5})
+        assert [e["event"] async for e in stream_job_output(failing, transport="ws")][-1] == "error"
+
+        scheduler = JobScheduler(ResultStore(), concurrency=1)
+        for i in range(3):
+            queued = ChunkJob(job_id=f"a{i}", params={"count": 1000})
+            queued.paid_at = time.monotonic()
+            scheduler.submit(queued)
+        while scheduler.active:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    text = metrics.render()
+    size = sum(output_size(chunk) for chunk in [
+        f'{{"n": {i}, "price": 0.5{i % 10}, "market": "MKT-{i % 7}"}}\n' for i in range(25)])
+    labels = 'job_type="test_chunks",transport="sse"'
+    assert sample(text, f"x402_job_queue_wait_seconds_sum{{{labels}}}") >= 2
+    assert sample(text, f'x402_job_execution_seconds_count{{{labels},outcome="completed"}}') == 1
+    assert sample(text, f"x402_stream_events_sum{{{labels}}}") == 25
+    assert sample(text, f"x402_stream_bytes_sum{{{labels}}}") == size
+    assert sample(text, 'x402_job_execution_seconds_count{job_type="test_chunks",'
+                        'transport="ws",outcome="failed"}') == 1
+    assert sample(text, 'x402_stream_events_sum{job_type="test_chunks",transport="ws"}') == 5
+    async_labels = 'job_type="test_chunks",transport="async"'
+    assert sample(text, f"x402_job_queue_wait_seconds_count{{{async_labels}}}") == 3
+    assert sample(text, f"x402_stream_events_sum{{{async_labels}}}") == 3000
+    assert output_size("é") == 2
+    print("   ✓ Job metrics PASS")
+
+
+def test_loop_lag():
+    """Test that blocking the event loop shows up as lag"""
+    print("4. Testing event loop lag...")
+    monitor = LoopLagMonitor(interval=0.01)
+    lag = metrics.get("x402_event_loop_lag_seconds")
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # blocks the loop
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(run())
+    text = metrics.render()
+    assert lag.count() >= 5
+    assert sample(text, 'x402_event_loop_lag_seconds_bucket{le="0.1"}') < lag.count()
+    assert lag.sum() >= 0.15
+    print(f"   {lag.count()} probes, {lag.sum() * 1000:.0f} ms total lag")
+    print("   ✓ Event loop lag PASS")
+
+
+def benchmark_overhead():
+    """
+    Instrumentation cost of one paid request relative to the request itself
+
+    A request is one payment verification against a local fake RPC (two
+    transaction lookups, as verify_payment does) plus a 20-chunk job
+    streamed over SSE through the ASGI stack.
+    """
+    print("Benchmarking instrumentation overhead...")
+    requests, chunks = 300, 20
+    app = FastAPI()
+
+    @app.get("/run")
+    async def run_job():
+        job = ChunkJob(job_id="bench", params={"count": chunks})
+        job.paid_at = time.monotonic()
+        return create_sse_response(job)
+
+    async def request(client):
+        result = await aptos_verify.verify_payment("0xbench", SENDER, 100)
+        assert result["verified"]
+        response = await client.get("/run")
+        assert response.text.count("event: output") == chunks
+
+    async def measure():
+        rpc = FakeRPC()
+        aptos_verify.BASE_RPC = await rpc.start()
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                for _ in range(20):
+                    await request(client)
+                start = time.perf_counter()
+                for _ in range(requests):
+                    await request(client)
+                return (time.perf_counter() - start) / requests
+        finally:
+            await rpc.stop()
+
+    per_request = asyncio.run(measure())
+
+    # Exactly the instrumentation one such request performs
+    job = ChunkJob(job_id="bench", params={})
+    chunk = '{"n": 1, "price": 0.51, "market": "MKT-1"}\n'
+    rpc_latency = metrics.get("x402_rpc_get_transaction_seconds")
+    verifications = metrics.get("x402_payment_verifications_total")
+    rounds = 20000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _ in range(2):
+            t = time.perf_counter()
+            rpc_latency.observe(time.perf_counter() - t, "found")
+        verifications.inc("verified")
+        job.paid_at = time.monotonic()
+        started = job_started(job, "sse")
+        events = nbytes = 0
+        for _ in range(chunks):
+            events += 1
+            nbytes += output_size(chunk)
+        job_finished(job, "sse", started, "completed", events, nbytes)
+    per_request_metrics = (time.perf_counter() - start) / rounds
+
+    overhead = per_request_metrics / per_request
+    print(f"   request {per_request * 1000:.2f} ms, instrumentation {per_request_metrics * 1e6:.1f} us")
+    print(f"   overhead {overhead:.3%}")
+    start = time.perf_counter()
+    for _ in range(100):
+        metrics.render()
+    print(f"   scrape render {(time.perf_counter() - start) * 10:.2f} ms")
+    ok = overhead < OVERHEAD_TARGET
+    print(f"   target: <{OVERHEAD_TARGET:.0%} {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Metrics Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_exposition_format()
+        test_rpc_and_verification()
+        test_job_metrics()
+        test_loop_lag()
+        print()
+        passed = benchmark_overhead()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL METRICS TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
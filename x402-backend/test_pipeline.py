@@ -0,0 +1,235 @@
+"""
+Pipeline job tests
+"""
+import asyncio
+import json
+import sys
+import time
+from decimal import Decimal
+
+from config import PIPELINE_BUFFER_SIZE
+from jobs.base import Job
+from jobs.registry import job_registry
+from jobs.pipeline import PipelineJob, PipelineError
+from marketdata.activity import activity_store
+
+
+class SourceJob(Job):
+    """Yields numbered JSON records, recording how many were produced"""
+
+    produced = 0
+    closed = False
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "test_source"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        return Decimal("0.001")
+
+    def validate_params(self) -> tuple[bool, str]:
+        return True, ""
+
+    async def execute(self):
+        SourceJob.produced = 0
+        SourceJob.closed = False
+        try:
+            for i in range(self.params.get("count", 10)):
+                if self.params.get("fail_at") == i:
+                    raise RuntimeError("source broke")
+                SourceJob.produced += 1
+                yield json.dumps({
+                    "n": i, "even": i % 2 == 0,
+                    "market_ticker": "PIPE-S", "content": f"great win number {i}",
+                }) + "\n"
+                await asyncio.sleep(0)
+        finally:
+            SourceJob.closed = True
+
+
+class SlowSinkJob(Job):
+    """Consumes input slowly, echoing it"""
+
+    consumed = 0
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "test_sink"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        return Decimal("0.002")
+
+    @classmethod
+    def accepts_input(cls) -> bool:
+        return True
+
+    def validate_params(self) -> tuple[bool, str]:
+        return True, ""
+
+    async def execute(self):
+        SlowSinkJob.consumed = 0
+        async for line in self.input_stream:
+            SlowSinkJob.consumed += 1
+            await asyncio.sleep(self.params.get("delay", 0))
+            yield line + "\n"
+
+
+def setup_module():
+    job_registry.register(SourceJob)
+    job_registry.register(SlowSinkJob)
+
+
+def teardown_module():
+    # Other test modules share the global registry
+    job_registry.unregister(SourceJob.get_name())
+    job_registry.unregister(SlowSinkJob.get_name())
+
+
+async def collect(job, limit=None):
+    out = []
+    stream = job.execute()
+    try:
+        async for chunk in stream:
+            out.append(chunk)
+            if limit is not None and len(out) >= limit:
+                break
+    finally:
+        await stream.aclose()
+    return out
+
+
+def test_composition_and_pricing():
+    """Test a registered-job chain, its price and validation"""
+    print("1. Testing composition and pricing...")
+    now = time.time()
+    activity_store.append("PIPE-A", [now - 2, now - 1], [40, 45], [3, 4], [1, -1])
+    job = PipelineJob(job_id="p", params={"stages": [
+        {"job_type": "activity", "params": {"markets": ["PIPE-A"], "duration": 0}},
+        {"job_type": "transform", "params": {"fields": ["event", "market_ticker"], "format": "csv"}},
+    ]})
+    assert job.validate_params() == (True, "")
+    assert job.price() == job_registry.get_job_class("activity").get_price() \
+        + job_registry.get_job_class("transform").get_price()
+    assert asyncio.run(collect(job)) == ["event,market_ticker\n", "snapshot,PIPE-A\n"]
+
+    # Posts streamed into the sentiment stage
+    job = PipelineJob(job_id="s", params={"stages": [
+        {"job_type": "test_source", "params": {"count": 5}},
+        {"job_type": "transform", "params": {"where": {"even": True}}},
+        {"job_type": "sentiment", "params": {}},
+    ]})
+    assert job.validate_params() == (True, "")
+    aggregates = [json.loads(line) for line in asyncio.run(collect(job))]
+    assert [(a["market_ticker"], a["posts"]) for a in aggregates] == [("PIPE-S", 3)]
+
+    bad = [
+        [{"job_type": "activity", "params": {"markets": ["X"]}}],
+        [{"job_type": "test_source"}, {"job_type": "activity", "params": {"markets": ["X"]}}],
+        [{"job_type": "test_source"}, {"job_type": "pipeline", "params": {}}],
+        [{"job_type": "test_source"}, {"job_type": "nope"}],
+        [{"job_type": "test_source"}, {"job_type": "transform", "params": {"format": "xml"}}],
+        [{"job_type": "test_source"}, "transform"],
+    ]
+    for stages in bad:
+        is_valid, error = PipelineJob(job_id="b", params={"stages": stages}).validate_params()
+        assert not is_valid, stages
+    print("   ✓ Composition and pricing PASS")
+
+
+def test_backpressure():
+    """Test that a slow stage bounds how far earlier stages run ahead"""
+    print("2. Testing backpressure...")
+    job = PipelineJob(job_id="bp", params={"stages": [
+        {"job_type": "test_source", "params": {"count": 10000}},
+        {"job_type": "test_sink", "params": {"delay": 0.001}},
+    ]})
+    lines = asyncio.run(collect(job, limit=50))
+    assert len(lines) == 50
+    # Source is at most one queue (plus the chunk being put) ahead of the sink
+    assert SourceJob.produced - SlowSinkJob.consumed <= PIPELINE_BUFFER_SIZE + 2
+    assert SourceJob.closed
+    print(f"   source ran {SourceJob.produced - SlowSinkJob.consumed} chunks ahead"
+          f" (buffer {PIPELINE_BUFFER_SIZE})")
+    print("   ✓ Backpressure PASS")
+
+
+def test_cancellation_and_failure():
+    """Test that closing the pipeline or a failing stage stops every stage"""
+    print("3. Testing cancellation and failure...")
+    job = PipelineJob(job_id="c", params={"stages": [
+        {"job_type": "test_source", "params": {"count": 10 ** 9}},
+        {"job_type": "test_sink", "params": {}},
+        {"job_type": "transform", "params": {}},
+    ]})
+
+    async def cancel_midway():
+        task = asyncio.create_task(collect(job))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_midway())
+    assert SourceJob.closed and SourceJob.produced > 0
+
+    failing = PipelineJob(job_id="f", params={"stages": [
+        {"job_type": "test_source", "params": {"count": 100, "fail_at": 30}},
+        {"job_type": "test_sink", "params": {}},
+    ]})
+    try:
+        asyncio.run(collect(failing))
+    except PipelineError as e:
+        assert "Stage 0 (test_source) failed: source broke" in str(e)
+    else:
+        raise AssertionError("stage failure was not raised")
+    print("   ✓ Cancellation and failure PASS")
+
+
+def test_throughput():
+    """Report chunks per second through a three-stage pipeline"""
+    print("4. Measuring throughput...")
+    count = 50000
+    job = PipelineJob(job_id="t", params={"stages": [
+        {"job_type": "test_source", "params": {"count": count}},
+        {"job_type": "test_sink", "params": {}},
+        {"job_type": "transform", "params": {"fields": ["n"]}},
+    ]})
+    start = time.perf_counter()
+    lines = asyncio.run(collect(job))
+    elapsed = time.perf_counter() - start
+    assert len(lines) == count and json.loads(lines[-1]) == {"n": count - 1}
+    print(f"   {count:,} records in {elapsed * 1000:.0f} ms ({count / elapsed:,.0f} records/s)")
+    print("   ✓ Throughput PASS")
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Pipeline Tests")
+    print("=" * 60)
+    print()
+
+    setup_module()
+    try:
+        test_composition_and_pricing()
+        test_backpressure()
+        test_cancellation_and_failure()
+        test_throughput()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    finally:
+        teardown_module()
+
+    print()
+    print("=" * 60)
+    print("ALL PIPELINE TESTS PASSED ✓")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Rate limiter tests and burst benchmark
+"""
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import HTTPException
+
+from auth.rate_limit import RateLimiter, check_rate_limit, rate_limiter
+from config import RATE_LIMITS, RATE_LIMIT_JOB_TYPES
+
+BURST_REQUESTS = 50000
+
+
+def test_token_bucket():
+    """Test burst capacity, refill and retry hints"""
+    print("1. Testing token bucket...")
+    limiter = RateLimiter()
+    admitted = [limiter.check("w", rate=2, burst=5, now=100.0) == 0 for _ in range(8)]
+    assert admitted == [True] * 5 + [False] * 3
+    assert abs(limiter.check("w", rate=2, burst=5, now=100.0) - 0.5) < 1e-9
+
+    # Half a second refills one token; a long idle period caps at burst
+    assert limiter.check("w", rate=2, burst=5, now=100.5) == 0
+    assert limiter.check("w", rate=2, burst=5, now=100.5) > 0
+    assert sum(limiter.check("w", rate=2, burst=5, now=1000.0) == 0 for _ in range(10)) == 5
+
+    # Buckets are independent
+    assert limiter.check("other", rate=2, burst=5, now=1000.0) == 0
+    print("   ✓ Token bucket PASS")
+
+
+def test_endpoint_limits():
+    """Test wallet and IP keys, job type overrides and the 429 response"""
+    print("2. Testing endpoint limits...")
+    rate_limiter._buckets.clear()
+    _, burst = RATE_LIMITS["request"]
+    for _ in range(burst):
+        check_rate_limit("request", wallet="0xA", client_ip="10.0.0.1", job_type="ping")
+    try:
+        check_rate_limit("request", wallet="0xa", client_ip="10.0.0.2", job_type="ping")
+    except HTTPException as e:
+        assert e.status_code == 429 and int(e.headers["Retry-After"]) >= 1
+    else:
+        raise AssertionError("wallet over its limit was admitted")
+
+    # Same IP, other wallets: the IP bucket is shared and also empty
+    try:
+        check_rate_limit("request", wallet="0xB", client_ip="10.0.0.1", job_type="ping")
+    except HTTPException as e:
+        assert e.status_code == 429
+    else:
+        raise AssertionError("IP over its limit was admitted")
+
+    # ...and the rejection spent none of 0xB's tokens
+    for _ in range(burst):
+        check_rate_limit("request", wallet="0xB", client_ip="10.0.0.4", job_type="ping")
+
+    # Job type overrides have their own, tighter buckets
+    _, backtest_burst = RATE_LIMIT_JOB_TYPES["backtest"]
+    admitted = 0
+    for _ in range(backtest_burst + 3):
+        try:
+            check_rate_limit("request", wallet="0xC", client_ip="10.0.0.3", job_type="backtest")
+            admitted += 1
+        except HTTPException:
+            pass
+    assert admitted == backtest_burst
+    check_rate_limit("execute", wallet="0xA", client_ip="10.0.0.1")
+    print("   ✓ Endpoint limits PASS")
+
+
+def test_verify_payment_limits():
+    """Test that a payment confirmation rejected by its wallet spends no IP token"""
+    print("3. Testing payment confirmation limits...")
+    import main
+
+    rate_limiter._buckets.clear()
+    _, burst = RATE_LIMITS["verify_payment"]
+    main.pending_jobs["rl-1"] = {
+        "wallet_address": "0xD",
+        "expiry": datetime.now(timezone.utc) + timedelta(minutes=5),
+        "paid": True,
+    }
+    for _ in range(burst):
+        check_rate_limit("verify_payment", wallet="0xD", client_ip="10.0.0.9")
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app, client=("10.0.0.5", 1234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            confirm = {"job_id": "rl-1", "tx_hash": "0x" + "1" * 64}
+            response = await client.post("/api/jobs/verify-payment", json=confirm)
+            assert response.status_code == 429, response.text
+
+    try:
+        asyncio.run(run())
+    finally:
+        del main.pending_jobs["rl-1"]
+    for _ in range(burst):
+        check_rate_limit("verify_payment", wallet="0xE", client_ip="10.0.0.5")
+    print("   ✓ Payment confirmation limits PASS")
+
+
+def test_bounded_state():
+    """Test idle-bucket eviction and the hard bucket cap"""
+    print("4. Testing bounded limiter state...")
+    limiter = RateLimiter(max_buckets=10 ** 6)
+    # 200k distinct one-off clients over 100 s; each refills within 1 s
+    for i in range(200000):
+        limiter.check(f"client-{i}", rate=10, burst=10, now=i * 0.0005)
+    assert len(limiter) < 5000, len(limiter)
+
+    capped = RateLimiter(max_buckets=1000)
+    for i in range(50000):
+        capped.check(i, rate=0.001, burst=10, now=0.0)
+    assert len(capped) <= 1000
+    print(f"   idle eviction kept {len(limiter)} of 200,000 buckets; hard cap {len(capped)}")
+    print("   ✓ Bounded limiter state PASS")
+
+
+def benchmark_burst():
+    """Replay a synthetic 50k req/s burst: one flooding wallet among many normal ones"""
+    print(f"Benchmarking {BURST_REQUESTS:,} requests in one second...")
+    rng = random.Random(1)
+    rate, burst = RATE_LIMITS["request"]
+    limiter = RateLimiter()
+    requests = []
+    for i in range(BURST_REQUESTS):
+        if i % 5:
+            requests.append(("flood", "10.9.9.9"))
+        else:
+            n = rng.randrange(5000)
+            requests.append((f"wallet-{n}", f"10.1.{n // 250}.{n % 250}"))
+
+    admitted = {"flood": 0, "normal": 0}
+    start = time.perf_counter()
+    for i, (wallet, ip) in enumerate(requests):
+        now = i / BURST_REQUESTS
+        wait = limiter.check_all((("request", "wallet", wallet), ("request", "ip", ip)), rate, burst, now)
+        if not wait:
+            admitted["flood" if wallet == "flood" else "normal"] += 1
+    elapsed = time.perf_counter() - start
+
+    normal = BURST_REQUESTS // 5
+    print(f"   flood wallet admitted {admitted['flood']} of {BURST_REQUESTS - normal:,}")
+    print(f"   normal wallets admitted {admitted['normal']:,} of {normal:,}")
+    print(f"   {elapsed / BURST_REQUESTS * 1e6:.2f} us per request "
+          f"({BURST_REQUESTS / elapsed:,.0f} checks/s), {len(limiter):,} buckets")
+    assert admitted["flood"] <= burst + rate + 1
+    assert admitted["normal"] >= normal * 0.99
+
+    ok = BURST_REQUESTS / elapsed >= BURST_REQUESTS
+    print(f"   target: {BURST_REQUESTS:,} req/s {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Rate Limit Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_token_bucket()
+        test_endpoint_limits()
+        test_verify_payment_limits()
+        test_bounded_state()
+        print()
+        passed = benchmark_burst()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL RATE LIMIT TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Market rollup and ingest feed tests
+"""
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from jobs.market_data import MarketDataJob
+from marketdata.rollups import RollupStore
+
+HOUR = 3600
+
+
+def test_rolling_volume_and_vwap():
+    """Test 24h volume/VWAP and expiry of old buckets"""
+    print("1. Testing rolling volume and VWAP...")
+    store = RollupStore()
+    t0 = 1_700_000_000
+    store.record_trades("A", [t0, t0 + 10], [40, 50], [10, 30], now=t0 + 10)
+    rollup = store.get("A", now=t0 + 10)
+    assert rollup["volume_24h"] == 40
+    assert rollup["vwap_24h"] == (40 * 10 + 50 * 30) / 40
+    assert rollup["last_price"] == 50
+    assert rollup["price_change_24h"] == 10
+
+    store.record_trades("A", [t0 + 20 * HOUR], [70], [10], now=t0 + 20 * HOUR)
+    assert store.get("A", now=t0 + 20 * HOUR)["volume_24h"] == 50
+
+    # After 25h only the third trade is still inside the window
+    rollup = store.get("A", now=t0 + 25 * HOUR)
+    assert rollup["volume_24h"] == 10
+    assert rollup["vwap_24h"] == 70
+    assert rollup["price_change_24h"] == 0
+    assert store.get("A", now=t0 + 50 * HOUR)["volume_24h"] == 0
+    print("   ✓ Rolling volume and VWAP PASS")
+
+
+def test_implied_probability_from_book():
+    """Test implied probability from the order book mid, falling back to last price"""
+    print("2. Testing implied probability...")
+    store = RollupStore()
+    store.record_trades("B", [time.time()], [30], [1])
+    assert store.get("B")["implied_probability"] == 0.3
+    store.record_orderbook("B", yes_levels=[[40, 5], [42, 1]], no_levels=[[55, 3]])
+    rollup = store.get("B")
+    assert rollup["best_bid"] == 42 and rollup["best_ask"] == 45
+    assert rollup["implied_probability"] == (42 + 45) / 200
+    print("   ✓ Implied probability PASS")
+
+
+def test_bulk_encoding():
+    """Test the bulk buffer and the market_data job"""
+    print("3. Testing bulk encoding...")
+    store = RollupStore(initial_capacity=4)
+    now = time.time()
+    for i in range(3000):
+        store.record_trades(f"T{i}", [now], [i % 100], [1], now=now)
+    document = json.loads(store.encode_many(["T5", "NOPE", "T2999"], now=now))
+    assert [r["market_ticker"] for r in document["rollups"]] == ["T5", "T2999"]
+    assert document["missing"] == ["NOPE"]
+
+    everything = store.encode_many(now=now)
+    assert store.encode_many(now=now) is everything  # served from the cached buffer
+    store.record_trades("T1", [now], [99], [1], now=now)
+    assert json.loads(store.encode_many(now=now))["rollups"][1]["last_price"] == 99
+
+    tickers = [f"T{i}" for i in range(3000)]
+    start = time.perf_counter()
+    for _ in range(20):
+        store.encode_many(tickers, now=now)
+    elapsed = (time.perf_counter() - start) / 20
+    print(f"   bulk read of {len(tickers)} rollups: {elapsed * 1000:.2f} ms")
+
+    job = MarketDataJob(job_id="t", params={"tickers": ["NOPE"]})
+    assert job.validate_params() == (True, "")
+
+    async def collect():
+        return [chunk async for chunk in job.execute()]
+
+    assert json.loads("".join(asyncio.run(collect())))["missing"] == ["NOPE"]
+    print("   ✓ Bulk encoding PASS")
+
+
+def test_market_feed():
+    """Test that the feed ingests each upstream trade once and refreshes order books"""
+    print("4. Testing market feed...")
+    import aiohttp
+    from aiohttp import web
+    import marketdata.feed as feed_module
+    from marketdata.activity import activity_store
+    from marketdata.rollups import rollup_store
+
+    now = int(time.time())
+    upstream = {"trades": [], "fail": False, "books": []}
+
+    def trade(trade_id, ticker, t, price):
+        created = datetime.fromtimestamp(t, timezone.utc).isoformat()
+        upstream["trades"].insert(0, {"trade_id": trade_id, "ticker": ticker, "created_time": created,
+                                      "yes_price": price, "count": 10, "taker_side": "yes"})
+
+    async def trades(request):
+        if upstream["fail"]:
+            return web.json_response({"error": "down"}, status=500)
+        # Newest first from min_ts on, paged by offset cursors like the real feed
+        min_ts = int(request.query["min_ts"])
+        matching = [t for t in upstream["trades"]
+                    if datetime.fromisoformat(t["created_time"]).timestamp() >= min_ts]
+        offset, limit = int(request.query.get("cursor", 0)), int(request.query["limit"])
+        cursor = str(offset + limit) if offset + limit < len(matching) else ""
+        return web.json_response({"trades": matching[offset:offset + limit], "cursor": cursor})
+
+    async def orderbook(request):
+        upstream["books"].append(request.match_info["ticker"])
+        return web.json_response({"orderbook": {"yes": [[40, 5]], "no": [[55, 3]]}})
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/markets/trades", trades)
+        app.router.add_get("/markets/{ticker}/orderbook", orderbook)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        feed = feed_module.MarketFeed(base, interval=0)
+        feed.since = now - 10
+        try:
+            async with aiohttp.ClientSession() as session:
+                trade("old", "FEED-A", now - 60, 10)
+                trade("a1", "FEED-A", now - 5, 30)
+                trade("b1", "FEED-B", now - 3, 60)
+                trade("a2", "FEED-A", now - 3, 50)
+                # Two trades per page: the poll follows the cursor
+                with patch.object(feed_module, "INGEST_PAGE_SIZE", 2):
+                    assert await feed.poll(session) == 3
+                assert sorted(upstream["books"]) == ["FEED-A", "FEED-B"]
+
+                # Trades of the newest second come back; only the new one is ingested
+                trade("b2", "FEED-B", now - 3, 70)
+                assert await feed.poll(session) == 1
+                assert await feed.poll(session) == 0
+                trade("a3", "FEED-A", now - 1, 20)
+                assert await feed.poll(session) == 1 and feed.trades == 5
+
+                upstream["fail"] = True
+                try:
+                    await feed.poll(session)
+                    raise AssertionError("upstream failure not raised")
+                except aiohttp.ClientResponseError:
+                    pass
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+    assert [t["price"] for t in activity_store.last_trades("FEED-A", 10)] == [30, 50, 20]
+    assert [t["price"] for t in activity_store.last_trades("FEED-B", 10)] == [60, 70]
+    rollup = rollup_store.get("FEED-A")
+    assert rollup["volume_24h"] == 30 and rollup["last_price"] == 20
+    assert rollup["best_bid"] == 40 and rollup["best_ask"] == 45
+    print("   ✓ Market feed PASS")
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Rollup Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_rolling_volume_and_vwap()
+        test_implied_probability_from_book()
+        test_bulk_encoding()
+        test_market_feed()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL ROLLUP TESTS PASSED ✓")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
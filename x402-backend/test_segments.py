@@ -0,0 +1,247 @@
+"""
+Historical segment tests and range scan benchmark
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from marketdata.candles import CandleBuilder
+from marketdata.segments import (
+    SegmentWriter, SegmentReader, compact, TRADE_SCHEMA, CANDLE_SCHEMA,
+)
+
+BENCHMARK_MARKETS = 200
+BENCHMARK_ROWS_PER_MARKET = 20000
+BENCHMARK_SEGMENT_ROWS = 500000
+
+
+def make_trades(rng, n, t0=1_700_000_000.0):
+    return dict(
+        timestamp=t0 + np.sort(rng.random(n)) * 86400,
+        price=rng.integers(1, 100, n).astype(float),
+        size=rng.integers(1, 50, n).astype(float),
+        side=rng.integers(1, 3, n),
+    )
+
+
+def test_append_and_scan():
+    """Test sealing, pruning and zero-copy scans against the source rows"""
+    print("1. Testing append and range scans...")
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SegmentWriter(tmp, TRADE_SCHEMA, segment_rows=1000)
+        source = {}
+        for day in range(3):
+            for ticker in ["A", "B", "C"]:
+                rows = make_trades(rng, 400, t0=1_700_000_000.0 + day * 86400)
+                writer.append(ticker, **rows)
+                for column, values in rows.items():
+                    source.setdefault(ticker, {}).setdefault(column, []).append(values)
+        writer.flush()
+        assert writer.pending_rows == 0
+
+        reader = SegmentReader(tmp, TRADE_SCHEMA)
+        assert len(reader.segments) == 3  # sealed every third append
+        assert reader.tickers() == ["A", "B", "C"]
+
+        expected = {column: np.concatenate(parts) for column, parts in source["B"].items()}
+        start, end = 1_700_000_000.0 + 50000, 1_700_000_000.0 + 150000
+        mask = (expected["timestamp"] >= start) & (expected["timestamp"] <= end)
+        result = reader.scan("B", start, end)
+        assert np.array_equal(result["timestamp"], expected["timestamp"][mask])
+        assert np.array_equal(result["price"], expected["price"][mask])
+        assert result["side"].dtype == np.int8
+
+        # A range inside one segment is served as a view of the mapped file
+        inside = reader.scan("A", 1_700_000_000.0, 1_700_000_000.0 + 3600, columns=["price"])
+        assert isinstance(inside["price"].base, np.memmap) or isinstance(inside["price"], np.memmap)
+        assert len(reader.scan("NOPE")["price"]) == 0
+        assert len(reader.scan("A", 0, 1)["timestamp"]) == 0
+    print("   ✓ Append and range scans PASS")
+
+
+def test_compaction():
+    """Test that compaction merges segments without changing scan results"""
+    print("2. Testing compaction...")
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SegmentWriter(tmp, CANDLE_SCHEMA, segment_rows=100, compact_every=0)
+        for i in range(10):
+            for ticker in ["X", "Y"]:
+                n = 60
+                close = rng.random(n)
+                writer.append(
+                    ticker,
+                    timestamp=1_700_000_000.0 + i * 6000 + np.arange(n) * 60,
+                    open=close, high=close, low=close, close=close,
+                    volume=np.ones(n),
+                )
+        writer.flush()
+
+        reader = SegmentReader(tmp, CANDLE_SCHEMA)
+        before = reader.scan("Y")
+        segments_before = len(reader.segments)
+        removed = compact(tmp, CANDLE_SCHEMA, target_rows=500)
+        assert removed == segments_before
+
+        # Open segments stay readable after their files are deleted
+        assert np.array_equal(reader.scan("Y")["close"], before["close"])
+        reader.refresh()
+        assert len(reader.segments) == 3
+        after = reader.scan("Y")
+        assert np.array_equal(after["timestamp"], before["timestamp"])
+        assert np.array_equal(after["close"], before["close"])
+        assert compact(tmp, CANDLE_SCHEMA, target_rows=500) == 0
+        assert sorted(os.listdir(tmp)) == ["manifest.json"] + [os.path.basename(s.path) for s in reader.segments]
+    print("   ✓ Compaction PASS")
+
+
+def test_background_sealing():
+    """Test that seals and compactions on one dataset never lose a segment"""
+    print("3. Testing background sealing...")
+    rng = np.random.default_rng(4)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SegmentWriter(tmp, TRADE_SCHEMA, segment_rows=100, compact_every=4)
+        for _ in range(10):
+            writer.append("A", **make_trades(rng, 100))
+        writer.flush()
+        # Compacted after the 4th and 8th seal
+        reader = SegmentReader(tmp, TRADE_SCHEMA)
+        assert len(reader.segments) == 3
+        assert len(reader.scan("A")["price"]) == 1000
+
+        # Concurrent compactions of the same directory
+        writer = SegmentWriter(tmp, TRADE_SCHEMA, segment_rows=50, compact_every=0)
+        stop = threading.Event()
+
+        def compact_loop():
+            while not stop.is_set():
+                compact(tmp, TRADE_SCHEMA, target_rows=400)
+
+        compactor = threading.Thread(target=compact_loop)
+        compactor.start()
+        try:
+            for _ in range(100):
+                writer.append("B", **make_trades(rng, 50))
+            writer.flush()
+        finally:
+            stop.set()
+            compactor.join()
+        reader.refresh()
+        assert len(reader.scan("B")["price"]) == 5000
+        assert len(reader.scan("A")["price"]) == 1000
+    print("   ✓ Background sealing PASS")
+
+
+def test_candles():
+    """Test candles built from trade batches against a brute-force aggregation"""
+    print("4. Testing candles from trades...")
+    rng = np.random.default_rng(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SegmentWriter(tmp, CANDLE_SCHEMA)
+        builder = CandleBuilder(writer, seconds=60)
+        trades = make_trades(rng, 3000)
+        for part in np.array_split(np.arange(3000), 37):
+            builder.record_trades("C", trades["timestamp"][part], trades["price"][part], trades["size"][part])
+        # Trades behind the open candle are too late
+        builder.record_trades("C", [1_600_000_000.0], [1.0], [1.0])
+        assert writer.pending_rows > 0 and len(builder) == 1
+        builder.flush()
+        writer.flush()
+        assert len(builder) == 0
+
+        candles = SegmentReader(tmp, CANDLE_SCHEMA).scan("C")
+        starts = np.floor(trades["timestamp"] / 60) * 60
+        expected = np.unique(starts)
+        assert np.array_equal(candles["timestamp"], expected)
+        for i in rng.integers(0, len(expected), 20):
+            inside = starts == expected[i]
+            assert candles["open"][i] == trades["price"][inside][0]
+            assert candles["close"][i] == trades["price"][inside][-1]
+            assert candles["high"][i] == trades["price"][inside].max()
+            assert candles["low"][i] == trades["price"][inside].min()
+            assert candles["volume"][i] == trades["size"][inside].sum()
+    print("   ✓ Candles from trades PASS")
+
+
+def _drop_page_cache(directory):
+    """Ask the kernel to evict a dataset's files from the page cache"""
+    for root, _, files in os.walk(directory):
+        for name in files:
+            fd = os.open(os.path.join(root, name), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def benchmark_range_scans():
+    """Benchmark cold and warm range scans over a multi-segment dataset"""
+    total = BENCHMARK_MARKETS * BENCHMARK_ROWS_PER_MARKET
+    print(f"Benchmarking range scans over {total:,} trades...")
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SegmentWriter(tmp, TRADE_SCHEMA, segment_rows=BENCHMARK_SEGMENT_ROWS, compact_every=0)
+        start = time.perf_counter()
+        # Interleave markets in daily batches, as the ingest side would
+        batches = 24
+        per_batch = BENCHMARK_ROWS_PER_MARKET // batches
+        for day in range(batches):
+            for m in range(BENCHMARK_MARKETS):
+                writer.append(f"M{m}", **make_trades(rng, per_batch, t0=1_700_000_000.0 + day * 86400))
+        writer.flush()
+        print(f"   write: {total / (time.perf_counter() - start):,.0f} rows/s")
+
+        tickers = [f"M{m}" for m in rng.integers(0, BENCHMARK_MARKETS, 50)]
+        span = (1_700_000_000.0 + 5 * 86400, 1_700_000_000.0 + 15 * 86400)
+
+        def run():
+            reader = SegmentReader(tmp, TRADE_SCHEMA)
+            rows = 0
+            start = time.perf_counter()
+            for ticker in tickers:
+                result = reader.scan(ticker, *span, columns=["timestamp", "price", "size"])
+                rows += len(result["price"])
+                float(result["price"].sum())  # touch the pages
+            return rows, time.perf_counter() - start
+
+        if hasattr(os, "posix_fadvise"):
+            _drop_page_cache(tmp)
+        rows, cold = run()
+        warm = min(run()[1] for _ in range(5))
+        print(f"   segments: {len(SegmentReader(tmp, TRADE_SCHEMA).segments)}, scanned rows: {rows:,}")
+        print(f"   cold: {cold * 1000:.1f} ms ({rows / cold:,.0f} rows/s)")
+        print(f"   warm: {warm * 1000:.1f} ms ({rows / warm:,.0f} rows/s)")
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - History Segment Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_append_and_scan()
+        test_compaction()
+        test_background_sealing()
+        test_candles()
+        print()
+        benchmark_range_scans()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL SEGMENT TESTS PASSED ✓")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Sentiment engine tests and throughput benchmark
+"""
+import asyncio
+import random
+import sys
+import time
+
+from jobs.sentiment import SentimentJob
+from sentiment.engine import SentimentEngine, SentimentScorer
+
+BENCHMARK_POSTS = 200000
+TARGET_POSTS_PER_SECOND = 100000
+
+
+def test_scorer_polarity():
+    """Test that lexicon words drive the score sign"""
+    print("1. Testing scorer polarity...")
+    scores = SentimentScorer().score_batch([
+        "Very bullish, this will moon",
+        "Total crash incoming, selling everything",
+        "The market opens tomorrow",
+        "I am not bullish on this",
+        "",
+    ])
+    assert scores[0] > 0.05
+    assert scores[1] < -0.05
+    assert scores[2] == 0.0
+    assert scores[3] < -0.05
+    assert scores[4] == 0.0
+
+    # The batch separator inside a post is ignored, not recursed on
+    scores = SentimentScorer().score_batch(["bullish\x00moon", "crash", "\x00"])
+    assert scores[0] > 0.05 and scores[1] < -0.05 and scores[2] == 0.0
+    print("   ✓ Scorer polarity PASS")
+
+
+def test_cache_scores_new_posts_only():
+    """Test that repeated content is served from the cache"""
+    print("2. Testing content-hash cache...")
+    engine = SentimentEngine()
+    engine.score(["bullish", "bearish", "bullish"])
+    assert engine.cache.misses == 3
+    assert len(engine.cache) == 2
+    engine.score(["bullish", "bearish", "rally"])
+    assert engine.cache.hits == 2
+    assert len(engine.cache) == 3
+    print("   ✓ Content-hash cache PASS")
+
+
+def test_incremental_aggregates():
+    """Test that aggregates update incrementally and decay over time"""
+    print("3. Testing incremental aggregates...")
+    engine = SentimentEngine(half_life_seconds=100)
+    engine.ingest([
+        {"market_ticker": "A", "content": "bullish", "created_at": 1000, "id": "1"},
+        {"market_ticker": "A", "content": "bearish crash", "created_at": 1000, "id": "2"},
+        {"market_ticker": "B", "content": "nothing here", "created_at": 1000, "id": "3"},
+    ])
+    a = engine.get_market("A")
+    assert a["posts"] == 2 and a["bullish"] == 1 and a["bearish"] == 1
+    assert engine.get_market("B")["neutral"] == 1
+
+    # Duplicate post ids are not counted twice
+    engine.ingest([{"market_ticker": "A", "content": "bullish", "created_at": 1000, "id": "1"}])
+    assert engine.get_market("A")["posts"] == 2
+
+    # A batch that fails to score is not remembered as seen
+    failed = {"market_ticker": "C", "content": "bullish", "created_at": "not a date", "id": "5"}
+    try:
+        engine.ingest([failed])
+        raise AssertionError("bad created_at accepted")
+    except ValueError:
+        pass
+    assert engine.ingest([dict(failed, created_at=1000)])["C"]["posts"] == 1
+
+    # A newer bullish post outweighs older posts after one half-life
+    updated = engine.ingest([
+        {"market_ticker": "A", "content": "bullish", "created_at": 1100, "id": "4"},
+    ])
+    assert updated["A"]["posts"] == 3
+    assert updated["A"]["score"] > 0
+    assert abs(updated["A"]["bullish_ratio"] - 2 / 3) < 1e-9
+    print("   ✓ Incremental aggregates PASS")
+
+
+def test_sentiment_job():
+    """Test sentiment job validation and output"""
+    print("4. Testing sentiment job...")
+    job = SentimentJob(job_id="test", params={})
+    assert not job.validate_params()[0]
+
+    job = SentimentJob(job_id="test", params={
+        "posts": [{"market_ticker": "JOB-TEST", "content": "strong yes", "created_at": 1}],
+        "markets": ["JOB-EMPTY"],
+    })
+    assert job.validate_params() == (True, "")
+
+    async def collect():
+        return [line async for line in job.execute()]
+
+    output = "".join(asyncio.run(collect()))
+    assert '"market_ticker": "JOB-TEST"' in output
+    assert '"market_ticker": "JOB-EMPTY"' in output
+    print("   ✓ Sentiment job PASS")
+
+
+def benchmark_throughput():
+    """Benchmark cold (all new) and warm (all cached) ingest throughput"""
+    print("Benchmarking sentiment ingest...")
+    rng = random.Random(42)
+    vocabulary = ["the", "market", "will", "bullish", "bearish", "not", "yes", "no",
+                  "likely", "price", "crash", "moon", "vote", "rate", "fed", "win"]
+    posts = [
+        {
+            "market_ticker": f"MKT-{rng.randrange(1000)}",
+            "content": " ".join(rng.choices(vocabulary, k=rng.randint(5, 25))) + f" #{i}",
+            "created_at": 1700000000 + i,
+            "id": str(i),
+        }
+        for i in range(BENCHMARK_POSTS)
+    ]
+
+    engine = SentimentEngine(cache_size=BENCHMARK_POSTS)
+    start = time.perf_counter()
+    for offset in range(0, BENCHMARK_POSTS, 5000):
+        engine.ingest(posts[offset:offset + 5000])
+    cold = BENCHMARK_POSTS / (time.perf_counter() - start)
+
+    # Same content under new ids: scoring is skipped, aggregates still update
+    for post in posts:
+        post["id"] += "-repost"
+    start = time.perf_counter()
+    for offset in range(0, BENCHMARK_POSTS, 5000):
+        engine.ingest(posts[offset:offset + 5000])
+    warm = BENCHMARK_POSTS / (time.perf_counter() - start)
+
+    print(f"   cold: {cold:,.0f} posts/s")
+    print(f"   warm: {warm:,.0f} posts/s")
+    print(f"   target: {TARGET_POSTS_PER_SECOND:,} posts/s "
+          f"{'PASS' if cold >= TARGET_POSTS_PER_SECOND else 'FAIL'}")
+    return cold >= TARGET_POSTS_PER_SECOND
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Sentiment Engine Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_scorer_polarity()
+        test_cache_scores_new_posts_only()
+        test_incremental_aggregates()
+        test_sentiment_job()
+        print()
+        passed = benchmark_throughput()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL SENTIMENT TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Startup tests: Move address validation, lazy imports and cold start benchmark
+"""
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+from fastapi import FastAPI
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Unroutable: connecting hangs, as with a dead RPC node or market API
+DEAD_RPC = "http://10.255.255.1/v1"
+DEAD_MARKET_API = "http://10.255.255.1/trade-api/v2"
+COLD_START_TARGET_MS = 300
+# Budget for app code on top of the framework when the framework alone misses the target
+APP_OVERHEAD_BUDGET_MS = 100
+RUNS = 7
+# Created by the app under test; not at import, uvicorn imports this module too
+AUDIT_DIR = os.path.join(tempfile.gettempdir(), f"x402-startup-{os.getpid()}")
+# Each run's unpaid 402 job is handed off on exit; keep that out of the repo and the next run
+HANDOFF_DIR = AUDIT_DIR + "-handoff"
+
+# Bare framework baseline for the benchmark (`uvicorn test_startup:bare_app`)
+bare_app = FastAPI()
+
+
+@bare_app.get("/")
+async def bare_root():
+    return {"status": "running"}
+
+
+def test_move_addresses():
+    """Test native Move address validation"""
+    print("1. Testing Move address validation...")
+    from payments.x402_auth import normalize_move_address, verify_payment_signature
+
+    full = "0x" + "Ab" * 32
+    assert normalize_move_address(full) == "0x" + "ab" * 32
+    assert normalize_move_address("0x1") == "0x" + "0" * 63 + "1"
+    for bad in ("", "0x", "ab" * 32, "0x" + "a" * 65, "0xzz", None, 42, "0x" + "a" * 40 + " "):
+        assert normalize_move_address(bad) is None, bad
+
+    tx_hash = "0x" + "1" * 64
+    payment = {"tx_hash": tx_hash, "sender": full, "amount": "0.001"}
+    assert verify_payment_signature(payment, "job", "0.001") == (True, "0x" + "ab" * 32, None)
+    # 20-byte EVM addresses are not Move accounts
+    evm = dict(payment, sender="0x" + "ab" * 20)
+    assert verify_payment_signature(evm, "job", "0.001")[0] is True
+    assert verify_payment_signature(dict(payment, sender="0xnope"), "job", "0.001")[2] == "Invalid sender address"
+    assert verify_payment_signature(dict(payment, amount="1"), "job", "0.001")[0] is False
+
+    from payments.aptos_verify import check_move_payment
+    tx = {"hash": tx_hash, "type": "user_transaction", "success": True, "sender": "0x00ab" + "cd" * 30,
+          "payload": {"function": "0x1::aptos_account::transfer"}}
+    assert check_move_payment(tx, "0xab" + "cd" * 30, 100000) == (True, None)
+    assert check_move_payment(tx, "0xab" + "cd" * 31, 100000)[0] is False
+    print("   ✓ Move address validation PASS")
+
+
+def imported_modules(code: str, modules) -> list:
+    """Modules from `modules` that are loaded after running `code` in a fresh interpreter"""
+    probe = f"{code}\nimport json, sys\nprint(json.dumps([m for m in {list(modules)!r} if m in sys.modules]))"
+    out = subprocess.run([sys.executable, "-c", probe], cwd=HERE, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_lazy_imports():
+    """Test that importing the app loads no job modules or payment backends"""
+    print("2. Testing lazy imports...")
+    heavy = ("web3", "numpy", "aiohttp", "jobs.sentiment", "jobs.backtest", "payments.base_token")
+    assert imported_modules("import main", heavy) == []
+    assert imported_modules("import payments.x402_auth", ("web3",)) == []
+
+    from jobs.registry import job_registry, DEFAULT_JOBS
+    loaded = imported_modules(
+        "from jobs.registry import job_registry\njob_registry.get_job_class('transform')",
+        ("jobs.transform", "jobs.sentiment"),
+    )
+    assert loaded == ["jobs.transform"]
+
+    # Lookups racing a background preload always find the job type
+    missing = []
+    preload = threading.Thread(target=job_registry.load_all)
+    preload.start()
+    for _ in range(200):
+        for name in DEFAULT_JOBS:
+            if job_registry.get_job_class(name) is None:
+                missing.append(name)
+    preload.join()
+    assert missing == []
+    assert sorted(job_registry.list_jobs()) == sorted(DEFAULT_JOBS)
+
+    # With no market API to ingest from, jobs reading ingested data are not sold
+    from jobs import registry
+    with patch.object(registry, "MARKET_API_URL", ""):
+        offered = registry.JobRegistry()
+    assert all(offered.get_job_class(name) is None for name in registry.INGESTED_JOB_TYPES)
+    assert offered.get_job_class("ping") is not None
+    print("   ✓ Lazy imports PASS")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url: str, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if data else {}
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data, headers), timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def cold_start(app: str, paid_request: bool = False):
+    """
+    Spawn uvicorn and time until it answers
+
+    Returns:
+        (ms to first response, ms to first 402 or None, health body)
+    """
+    port = free_port()
+    env = {**os.environ, "BASE_RPC": DEAD_RPC, "MARKET_API_URL": DEAD_MARKET_API, "AUDIT_LOG_DIR": AUDIT_DIR, "HANDOFF_DIR": HANDOFF_DIR}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            try:
+                status, health = request(f"{base}/")
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if server.poll() is not None:
+                    raise AssertionError(f"{app} exited during startup")
+                time.sleep(0.002)
+        first = (time.perf_counter() - start) * 1000
+        first_402 = None
+        if paid_request:
+            status, body = request(f"{base}/api/jobs/request", {
+                "job_type": "market_data", "params": {"tickers": ["A"]}, "wallet_address": "0x1",
+            })
+            assert status == 402 and body["message"] == "Payment Required"
+            first_402 = (time.perf_counter() - start) * 1000
+        return first, first_402, health
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def test_non_blocking_lifespan():
+    """Test that a dead RPC node or market API does not delay startup"""
+    print("3. Testing non-blocking startup...")
+    first, first_402, health = cold_start("main:app", paid_request=True)
+    # aiohttp's connect timeout alone is 5 s; startup finished long before
+    assert first < 3000 and health["connected"] is False
+    print(f"   first response after {first:.0f} ms, first 402 after {first_402:.0f} ms")
+    print("   ✓ Non-blocking startup PASS")
+
+
+def benchmark_cold_start():
+    """Median cold start to first response, app vs a bare FastAPI app"""
+    print(f"Benchmarking cold start to first request ({RUNS} runs each)...")
+    # Interleaved so host noise hits both sides alike
+    bare_runs, runs = [], []
+    for _ in range(RUNS):
+        bare_runs.append(cold_start("test_startup:bare_app")[0])
+        runs.append(cold_start("main:app", paid_request=True))
+    bare = statistics.median(bare_runs)
+    app = statistics.median(run[0] for run in runs)
+    paid = statistics.median(run[1] for run in runs)
+    overhead = statistics.median(run[0] - b for run, b in zip(runs, bare_runs))
+    print(f"   bare FastAPI + uvicorn: {bare:.0f} ms")
+    print(f"   x402 app: {app:.0f} ms to first response (+{overhead:.0f} ms), {paid:.0f} ms to first 402")
+
+    if app < COLD_START_TARGET_MS:
+        print(f"   target: <{COLD_START_TARGET_MS} ms PASS")
+        return True
+    if bare >= COLD_START_TARGET_MS:
+        ok = overhead < APP_OVERHEAD_BUDGET_MS
+        print(f"   framework alone exceeds {COLD_START_TARGET_MS} ms on this host; "
+              f"app overhead <{APP_OVERHEAD_BUDGET_MS} ms {'PASS' if ok else 'FAIL'}")
+        return ok
+    print(f"   target: <{COLD_START_TARGET_MS} ms FAIL")
+    return False
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - Startup Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_move_addresses()
+        test_lazy_imports()
+        test_non_blocking_lifespan()
+        print()
+        passed = benchmark_cold_start()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    finally:
+        shutil.rmtree(AUDIT_DIR, ignore_errors=True)
+        shutil.rmtree(HANDOFF_DIR, ignore_errors=True)
+
+    print()
+    print("=" * 60)
+    print("ALL STARTUP TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+WebSocket job multiplexing tests and SSE comparison benchmark
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+from fastapi import FastAPI, HTTPException, WebSocket
+
+from jobs.base import Job
+from streaming.sse import create_sse_response
+from streaming.websocket import JobMultiplexer
+
+BENCHMARK_STREAMS = 200
+
+
+class TickJob(Job):
+    """Emits `count` lines, `interval` seconds apart"""
+
+    closed = []
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "tick"
+
+    @classmethod
+    def get_price(cls) -> Decimal:
+        return Decimal(0)
+
+    def validate_params(self) -> tuple[bool, str]:
+        return True, ""
+
+    async def execute(self):
+        try:
+            for i in range(self.params.get("count", 5)):
+                if self.params.get("interval"):
+                    await asyncio.sleep(self.params["interval"])
+                yield f"{self.job_id}:{i}"
+        finally:
+            TickJob.closed.append(self.job_id)
+
+
+def make_app(jobs=None, **job_params) -> FastAPI:
+    """App serving TickJobs over SSE and the multiplexed WebSocket"""
+    app = FastAPI()
+
+    def authorize(job_id: str):
+        if jobs is not None:
+            if job_id not in jobs:
+                raise HTTPException(status_code=404, detail="Job not found")
+            return jobs[job_id]
+        return TickJob(job_id=job_id, params=job_params)
+
+    @app.get("/sse/{job_id}")
+    async def sse(job_id: str):
+        return create_sse_response(authorize(job_id))
+
+    @app.websocket("/ws")
+    async def ws(websocket: WebSocket):
+        await JobMultiplexer(websocket, authorize).run()
+
+    return app
+
+
+# Long-running streams for the benchmark server (`uvicorn test_websocket:bench_app`)
+bench_app = make_app(count=1000, interval=0.5)
+
+
+def receive_until(ws, done):
+    frames = []
+    while not done(frames):
+        frames.append(ws.receive_json())
+    return frames
+
+
+def test_multiplexing():
+    """Test that frames from many jobs are tagged and ordered per job"""
+    print("1. Testing multiplexed streams...")
+    from fastapi.testclient import TestClient
+
+    jobs = {f"J{i}": TickJob(job_id=f"J{i}", params={"count": 20}) for i in range(5)}
+    client = TestClient(make_app(jobs))
+    with client.websocket_connect("/ws") as ws:
+        for job_id in jobs:
+            ws.send_json({"op": "subscribe", "job_id": job_id, "window": 100})
+        ws.send_json({"op": "subscribe", "job_id": "NOPE"})
+        ws.send_json({"op": "bogus"})
+        frames = receive_until(ws, lambda f: sum(x["event"] == "complete" for x in f) == 5 and len(f) >= 112)
+
+    errors = [f for f in frames if f["event"] == "error"]
+    assert sorted(e["status"] for e in errors) == [400, 404]
+    for job_id in jobs:
+        mine = [f for f in frames if f["job_id"] == job_id]
+        assert [f["seq"] for f in mine] == list(range(22))
+        assert mine[0]["event"] == "start" and mine[-1]["event"] == "complete"
+        assert [f["data"] for f in mine[1:-1]] == [f"{job_id}:{i}" for i in range(20)]
+    print("   ✓ Multiplexed streams PASS")
+
+
+def test_flow_control():
+    """Test that an unacked stream pauses without blocking the others"""
+    print("2. Testing per-stream flow control...")
+    from fastapi.testclient import TestClient
+
+    jobs = {
+        "SLOW": TickJob(job_id="SLOW", params={"count": 50}),
+        "FAST": TickJob(job_id="FAST", params={"count": 200}),
+    }
+    client = TestClient(make_app(jobs))
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"op": "subscribe", "job_id": "SLOW", "window": 3})
+        ws.send_json({"op": "subscribe", "job_id": "FAST", "window": 1000})
+        frames = receive_until(ws, lambda f: any(x["job_id"] == "FAST" and x["event"] == "complete" for x in f))
+        time.sleep(0.05)
+        ws.send_json({"op": "subscribe", "job_id": "FAST"})  # completed streams can be replaced
+        frames += [ws.receive_json()]
+        assert sum(f["job_id"] == "SLOW" for f in frames) == 3
+
+        # Credits let the paused stream continue from where it stopped
+        ws.send_json({"op": "ack", "job_id": "SLOW", "count": 10})
+        more = receive_until(ws, lambda f: sum(x["job_id"] == "SLOW" for x in f) == 10)
+        assert [f["seq"] for f in more if f["job_id"] == "SLOW"] == list(range(3, 13))
+
+        ws.send_json({"op": "subscribe", "job_id": "SLOW"})
+        assert receive_until(ws, lambda f: any(x["event"] == "error" for x in f))[-1]["status"] == 409
+    print("   ✓ Per-stream flow control PASS")
+
+
+def test_cancel_and_disconnect():
+    """Test that cancel and disconnect close the job generators"""
+    print("3. Testing cancellation...")
+    from fastapi.testclient import TestClient
+
+    TickJob.closed.clear()
+    jobs = {f"C{i}": TickJob(job_id=f"C{i}", params={"count": 10 ** 6, "interval": 0.01}) for i in range(3)}
+    client = TestClient(make_app(jobs))
+    with client.websocket_connect("/ws") as ws:
+        for job_id in jobs:
+            ws.send_json({"op": "subscribe", "job_id": job_id, "window": 10 ** 6})
+        receive_until(ws, lambda f: len(f) >= 10)
+        ws.send_json({"op": "cancel", "job_id": "C0"})
+        time.sleep(0.1)
+        assert TickJob.closed == ["C0"]
+    time.sleep(0.1)
+    assert sorted(TickJob.closed) == ["C0", "C1", "C2"]
+    print("   ✓ Cancellation PASS")
+
+
+def _server_usage(pid: int):
+    """(RSS in KB, open sockets) of a process"""
+    with open(f"/proc/{pid}/status") as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+    sockets = sum(
+        os.readlink(f"/proc/{pid}/fd/{fd}").startswith("socket:")
+        for fd in os.listdir(f"/proc/{pid}/fd")
+    )
+    return rss, sockets
+
+
+async def _open_sse(session, base, n):
+    responses = []
+    for i in range(n):
+        resp = await session.get(f"{base}/sse/S{i}")
+        await resp.content.readline()
+        responses.append(resp)
+    return responses
+
+
+async def _open_ws(session, base, n):
+    ws = await session.ws_connect(f"{base}/ws")
+    for i in range(n):
+        await ws.send_json({"op": "subscribe", "job_id": f"W{i}"})
+    started = 0
+    while started < n:
+        frame = json.loads((await ws.receive()).data)
+        started += frame["event"] == "start"
+    return ws
+
+
+def _measure(mode: str, n: int):
+    import aiohttp
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "test_websocket:bench_app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    base = f"http://127.0.0.1:{port}"
+
+    async def run():
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port)).close()
+                break
+            except OSError:
+                await asyncio.sleep(0.05)
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            baseline = _server_usage(server.pid)
+            handle = await (_open_sse(session, base, n) if mode == "sse" else _open_ws(session, base, n))
+            await asyncio.sleep(1.0)
+            loaded = _server_usage(server.pid)
+            if mode == "sse":
+                for resp in handle:
+                    resp.close()
+            else:
+                await handle.close()
+        return baseline, loaded
+
+    try:
+        (rss0, sockets0), (rss1, sockets1) = asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait()
+    return (rss1 - rss0) / n, sockets1 - sockets0
+
+
+def benchmark_connections():
+    """Compare connections and server memory per active stream, SSE vs WebSocket"""
+    print(f"Benchmarking {BENCHMARK_STREAMS} active streams, SSE vs WebSocket...")
+    results = {}
+    for mode in ("sse", "ws"):
+        kb_per_stream, connections = _measure(mode, BENCHMARK_STREAMS)
+        results[mode] = kb_per_stream
+        print(f"   {mode:>3}: {connections} server connections, {kb_per_stream:.1f} KB RSS per stream")
+    return results["ws"] <= results["sse"]
+
+
+def main():
+    print("=" * 60)
+    print("x402 PoC - WebSocket Multiplexing Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_multiplexing()
+        test_flow_control()
+        test_cancel_and_disconnect()
+        print()
+        passed = benchmark_connections()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL WEBSOCKET TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Configuration for the x402 Prediction Market Backend on Movement M1
+"""
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Network Configuration - Movement M1
+MOVEMENT_RPC = os.getenv("MOVEMENT_RPC", "https://mevm.devnet.imola.movementlabs.xyz")
+TOKEN_ADDRESS = os.getenv("TOKEN_ADDRESS", "0x0000000000000000000000000000000000000000")
+PAYMENT_RECIPIENT_ADDRESS = os.getenv("RECIPIENT_ADDRESS", "")
+
+# Server Configuration
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8990"))
+CORS_ORIGINS = ["*"]  # For development; restrict in production
+
+# Catalog Configuration
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "data/catalog.json")
+CATALOG_REFRESH_INTERVAL = int(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))  # seconds between mtime checks
+CATALOG_DEFAULT_PAGE_SIZE = 50
+CATALOG_MAX_PAGE_SIZE = 500
+
+# Upstream Market API Configuration
+UPSTREAM_API_URL = os.getenv("KALSHI_API_URL", "https://api.elections.kalshi.com/trade-api/v2")
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))  # seconds per request
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))  # pooled keep-alive connections
+
+# Event Page Configuration
+EVENT_PAGE_TTL = {  # seconds each part is served fresh
+    "event": 30,
+    "metadata": 300,
+    "markets": 10,
+    "orderbook": 2,
+    "candlesticks": 60,
+    "trades": 5,
+}
+EVENT_PAGE_STALE_SECONDS = 60  # past TTL, serve stale while refreshing in background
+EVENT_PAGE_CACHE_SIZE = 10000  # cached parts
+EVENT_PAGE_MAX_MARKETS = 20  # markets with orderbook/trades per page
+
+# Feed Configuration
+FEED_DB_PATH = os.getenv("FEED_DB_PATH", "data/feed.db")
+FEED_DEFAULT_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+FEED_CACHE_PAGES = int(os.getenv("FEED_CACHE_PAGES", "10000"))  # encoded pages kept in memory
+FEED_COMMENT_BATCH_SIZE = 500  # comments per insert transaction
+FEED_COMMENT_BATCH_WAIT = 0.005  # seconds a comment waits for others to batch with
+FEED_MAX_POST_LENGTH = 2000
+FEED_MAX_COMMENT_LENGTH = 500
+FEED_MAX_COMMENTS_PER_REQUEST = 100
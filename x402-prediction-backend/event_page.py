@@ -0,0 +1,167 @@
+"""
+Event page aggregation
+
+Everything the frontend needs to render one event page is fetched from
+the upstream API concurrently and composed into a single JSON document.
+Each part is cached on its own TTL, so the page costs at most the
+slowest uncached part.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import EVENT_PAGE_TTL, EVENT_PAGE_STALE_SECONDS, EVENT_PAGE_MAX_MARKETS
+from storage import catalog
+from upstream import upstream, part_cache, UpstreamError
+
+# Candlestick period_interval (minutes) -> default lookback (seconds)
+CANDLE_LOOKBACK = {1: 6 * 3600, 60: 7 * 86400, 1440: 90 * 86400}
+
+# Event and market tickers; they go into upstream URL paths as they are
+TICKER_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,127}")
+
+
+class PartResult:
+    """Outcome of one part fetch"""
+
+    def __init__(self, value: Optional[bytes] = None, stale: bool = False,
+                 error: Optional[UpstreamError] = None):
+        self.value = value
+        self.stale = stale
+        self.error = error
+
+
+async def fetch_part(part: str, path: str, params: Optional[Dict[str, str]] = None) -> PartResult:
+    """Fetch one part through the cache, capturing failures instead of raising"""
+    key = (part, path, tuple(sorted((params or {}).items())))
+    try:
+        value, stale = await part_cache.get(
+            key,
+            ttl=EVENT_PAGE_TTL[part],
+            stale=EVENT_PAGE_STALE_SECONDS,
+            fetch=lambda: upstream.get(path, params),
+        )
+        return PartResult(value, stale)
+    except UpstreamError as e:
+        return PartResult(error=e)
+
+
+def valid_ticker(ticker: Any) -> bool:
+    return isinstance(ticker, str) and TICKER_PATTERN.fullmatch(ticker) is not None
+
+
+def market_tickers(tickers: Iterable[Any]) -> List[str]:
+    """Well-formed tickers, each once and in order, at most EVENT_PAGE_MAX_MARKETS"""
+    unique = dict.fromkeys(ticker for ticker in tickers if valid_ticker(ticker))
+    return list(unique)[:EVENT_PAGE_MAX_MARKETS]
+
+
+def catalog_tickers(event_ticker: str) -> List[str]:
+    """Market tickers of an event from the local catalog, in volume order"""
+    markets = catalog.snapshot.markets
+    rows = markets.facets["event_ticker"].get(event_ticker.lower())
+    return [] if rows is None else [markets.keys[row] for row in rows]
+
+
+def tickers_from_event(body: bytes) -> List[str]:
+    """Market tickers nested in an upstream /events/{ticker} response"""
+    document = json.loads(body)
+    markets = document.get("markets") or (document.get("event") or {}).get("markets") or []
+    return [m["ticker"] for m in markets if m.get("ticker")]
+
+
+def _market_parts(tickers: List[str], period_interval: int, now: float) -> Dict[str, "asyncio.Future"]:
+    """Start the per-market part fetches"""
+    # Align the candle window to the period so the cache key is stable
+    period = period_interval * 60
+    end_ts = int(now // period * period)
+    start_ts = end_ts - CANDLE_LOOKBACK[period_interval]
+    parts = {
+        "candlesticks": asyncio.ensure_future(fetch_part("candlesticks", "/markets/candlesticks", {
+            "market_tickers": ",".join(tickers),
+            "start_ts": str(start_ts),
+            "end_ts": str(end_ts),
+            "period_interval": str(period_interval),
+        })),
+    }
+    for ticker in tickers:
+        parts[f"orderbook:{ticker}"] = asyncio.ensure_future(
+            fetch_part("orderbook", f"/markets/{ticker}/orderbook")
+        )
+        parts[f"trades:{ticker}"] = asyncio.ensure_future(
+            fetch_part("trades", "/markets/trades", {"ticker": ticker, "limit": "50"})
+        )
+    return parts
+
+
+def _splice(result: Optional[PartResult]) -> bytes:
+    return result.value if result is not None and result.value is not None else b"null"
+
+
+async def build_event_page(
+    event_ticker: str,
+    tickers: Optional[List[str]] = None,
+    period_interval: int = 60,
+) -> Tuple[int, bytes]:
+    """
+    Fetch and compose an event page
+
+    Market tickers come from the request, then the local catalog; only if
+    both are empty does the page wait on the event part to learn them.
+    Malformed and repeated tickers are dropped from each source.
+
+    Returns:
+        (status_code, JSON body)
+    """
+    now = time.time()
+    tickers = market_tickers(tickers or catalog_tickers(event_ticker))
+
+    parts = {
+        "event": asyncio.ensure_future(
+            fetch_part("event", f"/events/{event_ticker}", {"with_nested_markets": "true"})
+        ),
+        "metadata": asyncio.ensure_future(fetch_part("metadata", f"/events/{event_ticker}/metadata")),
+        "markets": asyncio.ensure_future(
+            fetch_part("markets", "/markets", {"event_ticker": event_ticker, "limit": "200"})
+        ),
+    }
+    try:
+        if not tickers:
+            event = await parts["event"]
+            if event.value is not None:
+                tickers = market_tickers(tickers_from_event(event.value))
+        if tickers:
+            parts.update(_market_parts(tickers, period_interval, now))
+        await asyncio.gather(*parts.values())
+    finally:
+        # A disconnected client cancels the page but not the shared fetches
+        for future in parts.values():
+            future.cancel()
+
+    results = {name: future.result() for name, future in parts.items()}
+    event = results["event"]
+    if event.error is not None and event.error.status == 404:
+        return 404, b'{"detail":"Event not found"}'
+
+    errors = {name: str(r.error) for name, r in results.items() if r.error is not None}
+    stale = sorted(name for name, r in results.items() if r.stale)
+    body = b"".join([
+        b'{"event_ticker":', json.dumps(event_ticker).encode(),
+        b',"event":', _splice(event),
+        b',"metadata":', _splice(results["metadata"]),
+        b',"markets":', _splice(results["markets"]),
+        b',"candlesticks":', _splice(results.get("candlesticks")),
+        b',"orderbooks":{', b",".join(
+            json.dumps(t).encode() + b":" + _splice(results[f"orderbook:{t}"]) for t in tickers
+        ),
+        b'},"trades":{', b",".join(
+            json.dumps(t).encode() + b":" + _splice(results[f"trades:{t}"]) for t in tickers
+        ),
+        b'},"stale":', json.dumps(stale).encode(),
+        b',"errors":', json.dumps(errors).encode(),
+        b',"elapsed_ms":', json.dumps(round((time.time() - now) * 1000, 1)).encode(),
+        b"}",
+    ])
+    return 200, body
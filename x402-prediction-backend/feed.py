@@ -0,0 +1,316 @@
+"""
+Social feed: posts and comments per market in a local SQLite store
+
+Pages use keyset pagination: the cursor is the last id of the previous
+page, so a page is one range read on the (market, id) or (post_id, id)
+index however deep it is, and pages do not shift as new posts arrive.
+Encoded pages are cached in memory and dropped when their market or post
+is written. Comments from concurrent requests are queued and inserted in
+batches, one transaction per batch.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from config import (
+    FEED_CACHE_PAGES, FEED_COMMENT_BATCH_SIZE, FEED_COMMENT_BATCH_WAIT,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    market TEXT NOT NULL,
+    author TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    comment_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS posts_by_market ON posts (market, id);
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES posts (id),
+    author TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comments_by_post ON comments (post_id, id);
+"""
+
+POST_FIELDS = ("id", "market", "author", "body", "created_at", "comment_count")
+COMMENT_FIELDS = ("id", "post_id", "author", "body", "created_at")
+
+
+class PageCache:
+    """
+    LRU cache of encoded pages, grouped by the market or post they show
+
+    Writers invalidate a scope after committing. A reader only caches a
+    page if no invalidation happened since it started reading, so a page
+    read just before a commit is never cached after it.
+    """
+
+    def __init__(self, max_entries: int = FEED_CACHE_PAGES):
+        self.max_entries = max_entries
+        self.invalidations = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, bytes]]" = OrderedDict()
+        self._scopes: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, scope: Hashable, value: bytes, since: int):
+        """Cache a page read after invalidation number `since`"""
+        with self._lock:
+            if since != self.invalidations:
+                return
+            if key not in self._entries:
+                self._scopes.setdefault(scope, set()).add(key)
+            self._entries[key] = (scope, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (old_scope, _) = self._entries.popitem(last=False)
+                keys = self._scopes[old_scope]
+                keys.discard(old_key)
+                if not keys:
+                    del self._scopes[old_scope]
+
+    def invalidate(self, *scopes: Hashable):
+        with self._lock:
+            self.invalidations += 1
+            for scope in scopes:
+                for key in self._scopes.pop(scope, ()):
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"pages": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class FeedStore:
+    """
+    Posts and comments in SQLite (WAL), with cached keyset-paginated pages
+
+    Reads use their own connection and never wait on a writer; writes are
+    serialized on a second connection and may run from worker threads.
+    """
+
+    def __init__(self, cache_pages: int = FEED_CACHE_PAGES):
+        self.path: Optional[str] = None
+        self.cache = PageCache(cache_pages)
+        self._read: Optional[sqlite3.Connection] = None
+        self._write: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._read is not None
+
+    def open(self, path: str):
+        """Open (creating if needed) the feed database"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        write.execute("PRAGMA journal_mode=WAL")
+        # WAL with synchronous=NORMAL is durable across process crashes
+        write.execute("PRAGMA synchronous=NORMAL")
+        write.executescript(SCHEMA)
+        read = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        read.execute("PRAGMA query_only=ON")
+        self.path, self._write, self._read = path, write, read
+
+    def close(self):
+        if self._read is not None:
+            self._read.close()
+            self._write.close()
+            self._read = self._write = None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add_post(self, market: str, author: str, body: str) -> Dict:
+        """Insert a post; returns it as served in pages"""
+        created_at = time.time()
+        with self._write_lock:
+            cursor = self._write.execute(
+                "INSERT INTO posts (market, author, body, created_at) VALUES (?, ?, ?, ?)",
+                (market, author, body, created_at),
+            )
+            post_id = cursor.lastrowid
+        self.cache.invalidate(("market", market))
+        return dict(zip(POST_FIELDS, (post_id, market, author, body, created_at, 0)))
+
+    def add_comments(self, comments: List[Tuple[int, str, str]]) -> List[Optional[Dict]]:
+        """
+        Insert (post_id, author, body) comments in one transaction
+
+        Returns:
+            The stored comments in input order; None for unknown posts
+        """
+        created_at = time.time()
+        post_ids = sorted({post_id for post_id, _, _ in comments})
+        with self._write_lock:
+            db = self._write
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                markets = {}
+                # Chunked to stay under SQLite's bound parameter limit
+                for i in range(0, len(post_ids), 500):
+                    chunk = post_ids[i:i + 500]
+                    markets.update(db.execute(
+                        f"SELECT id, market FROM posts WHERE id IN ({','.join('?' * len(chunk))})", chunk,
+                    ).fetchall())
+                # Ids are assigned here so the batch can return them
+                next_id = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM comments").fetchone()[0]
+                stored, rows, counts = [], [], {}
+                for post_id, author, body in comments:
+                    if post_id not in markets:
+                        stored.append(None)
+                        continue
+                    row = (next_id, post_id, author, body, created_at)
+                    next_id += 1
+                    rows.append(row)
+                    stored.append(dict(zip(COMMENT_FIELDS, row)))
+                    counts[post_id] = counts.get(post_id, 0) + 1
+                db.executemany("INSERT INTO comments VALUES (?, ?, ?, ?, ?)", rows)
+                db.executemany(
+                    "UPDATE posts SET comment_count = comment_count + ? WHERE id = ?",
+                    [(n, post_id) for post_id, n in counts.items()],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+        # Post pages show comment counts, so the markets' pages go too
+        scopes = [("post", post_id) for post_id in counts]
+        scopes += [("market", market) for market in {markets[post_id] for post_id in counts}]
+        if scopes:
+            self.cache.invalidate(*scopes)
+        return stored
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def posts_page(self, market: str, cursor: Optional[int], limit: int) -> bytes:
+        """Newest posts of a market with id below `cursor`, as JSON"""
+        key = ("posts", market, cursor, limit)
+        page = self.cache.get(key)
+        if page is not None:
+            return page
+        since = self.cache.invalidations
+        rows = self._read.execute(
+            "SELECT id, market, author, body, created_at, comment_count FROM posts"
+            " WHERE market = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (market, cursor if cursor is not None else 1 << 62, limit + 1),
+        ).fetchall()
+        page = self._encode("posts", POST_FIELDS, rows, limit, {"market": market})
+        self.cache.put(key, ("market", market), page, since)
+        return page
+
+    def comments_page(self, post_id: int, cursor: Optional[int], limit: int) -> Optional[bytes]:
+        """Oldest comments of a post with id above `cursor`, as JSON; None if no such post"""
+        key = ("comments", post_id, cursor, limit)
+        page = self.cache.get(key)
+        if page is not None:
+            return page
+        since = self.cache.invalidations
+        rows = self._read.execute(
+            "SELECT id, post_id, author, body, created_at FROM comments"
+            " WHERE post_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (post_id, cursor or 0, limit + 1),
+        ).fetchall()
+        if not rows and self._read.execute("SELECT 1 FROM posts WHERE id = ?", (post_id,)).fetchone() is None:
+            return None
+        page = self._encode("comments", COMMENT_FIELDS, rows, limit, {"post_id": post_id})
+        self.cache.put(key, ("post", post_id), page, since)
+        return page
+
+    @staticmethod
+    def _encode(name: str, fields: Tuple[str, ...], rows: list, limit: int, head: Dict) -> bytes:
+        # One extra row was read to tell whether another page follows
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return json.dumps({
+            **head,
+            name: [dict(zip(fields, row)) for row in rows[:limit]],
+            "next_cursor": next_cursor,
+        }, separators=(",", ":")).encode()
+
+    def stats(self) -> Dict[str, int]:
+        if not self.is_open:
+            return {"open": False}
+        posts, comments = self._read.execute(
+            "SELECT (SELECT COUNT(*) FROM posts), (SELECT COUNT(*) FROM comments)"
+        ).fetchone()
+        return {"posts": posts, "comments": comments, **self.cache.stats()}
+
+
+class CommentBatcher:
+    """
+    Groups comments from concurrent requests into batched inserts
+
+    A comment waits up to `wait` seconds for others to join its batch;
+    batches are flushed one after another from a worker thread.
+    """
+
+    def __init__(self, store: FeedStore, batch_size: int = FEED_COMMENT_BATCH_SIZE,
+                 wait: float = FEED_COMMENT_BATCH_WAIT):
+        self.store = store
+        self.batch_size = batch_size
+        self.wait = wait
+        self.batches = 0
+        self._pending: List[Tuple[Tuple[int, str, str], asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def add(self, post_id: int, author: str, body: str) -> Optional[Dict]:
+        """Insert a comment; returns it, or None if the post does not exist"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((post_id, author, body), future))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        await asyncio.sleep(self.wait)
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            try:
+                stored = await asyncio.to_thread(self.store.add_comments, [item for item, _ in batch])
+            except Exception as e:
+                stored = e
+            self.batches += 1
+            for i, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if isinstance(stored, Exception):
+                    future.set_exception(stored)
+                else:
+                    future.set_result(stored[i])
+        self._flusher = None
+
+    async def drain(self):
+        """Wait for queued comments to be written"""
+        if self._flusher is not None:
+            await asyncio.shield(self._flusher)
+
+
+# Global feed instances
+feed = FeedStore()
+comment_batcher = CommentBatcher(feed)
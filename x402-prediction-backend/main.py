@@ -0,0 +1,282 @@
+"""
+x402 Prediction Market - FastAPI Backend
+"""
+import asyncio
+import json
+import os
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from contextlib import asynccontextmanager
+
+from config import (
+    HOST, PORT, CORS_ORIGINS,
+    CATALOG_SNAPSHOT_PATH, CATALOG_REFRESH_INTERVAL,
+    CATALOG_DEFAULT_PAGE_SIZE, CATALOG_MAX_PAGE_SIZE,
+    FEED_DB_PATH, FEED_DEFAULT_PAGE_SIZE, FEED_MAX_PAGE_SIZE,
+)
+from models import NewPost, NewComment, CommentBatch
+from storage import catalog, CatalogTable
+from feed import feed, comment_batcher
+from upstream import upstream, part_cache
+from event_page import build_event_page, valid_ticker, CANDLE_LOOKBACK
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown events"""
+    # Startup
+    print("Starting x402 Prediction Market Backend...")
+    if os.path.exists(CATALOG_SNAPSHOT_PATH):
+        snapshot = await asyncio.to_thread(catalog.load_file, CATALOG_SNAPSHOT_PATH)
+        print(f"Loaded catalog: {snapshot.stats()}")
+    else:
+        print(f"WARNING: Catalog snapshot not found at {CATALOG_SNAPSHOT_PATH}")
+    if not feed.is_open:
+        await asyncio.to_thread(feed.open, FEED_DB_PATH)
+
+    # Start background catalog refresh task
+    refresh_task = asyncio.create_task(refresh_catalog())
+
+    yield
+
+    # Shutdown
+    print("Shutting down x402 Prediction Market Backend...")
+    refresh_task.cancel()
+    await upstream.close()
+    await comment_batcher.drain()
+    feed.close()
+
+
+# Create FastAPI app
+app = FastAPI(
+    title="x402 Prediction Market",
+    description="Prediction market data behind x402 payments",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def _page_response(
+    table: CatalogTable,
+    name: str,
+    version: int,
+    query: Optional[str],
+    filters: dict,
+    sort: Optional[str],
+    order: str,
+    offset: int,
+    limit: int,
+) -> Response:
+    """Run a catalog search and serialize the page from pre-encoded rows"""
+    try:
+        total, rows = table.search(
+            query=query,
+            filters=filters,
+            sort=sort,
+            descending=order != "asc",
+            offset=offset,
+            limit=limit,
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+
+    next_offset = offset + len(rows) if offset + len(rows) < total else None
+    body = (
+        b'{"' + name.encode() + b'":' + table.encode(rows.tolist())
+        + b',"total":' + str(total).encode()
+        + b',"next_offset":' + json.dumps(next_offset).encode()
+        + b',"snapshot":' + str(version).encode() + b"}"
+    )
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/")
+async def root():
+    """Health check endpoint"""
+    return {
+        "service": "x402 Prediction Market",
+        "status": "running",
+        "catalog": catalog.snapshot.stats(),
+        "event_page_cache": part_cache.stats(),
+        "feed": feed.stats(),
+    }
+
+
+@app.get("/api/catalog/markets")
+async def search_markets(
+    q: Optional[str] = None,
+    category: List[str] = Query(default=[]),
+    tags: List[str] = Query(default=[]),
+    status: List[str] = Query(default=[]),
+    event_ticker: List[str] = Query(default=[]),
+    series_ticker: List[str] = Query(default=[]),
+    sort: Optional[str] = None,
+    order: str = "desc",
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=CATALOG_DEFAULT_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+):
+    """Search markets by text, category, tags, status, event and series"""
+    snapshot = catalog.snapshot
+    return _page_response(
+        snapshot.markets, "markets", snapshot.version, q,
+        {
+            "category": category,
+            "tags": tags,
+            "status": status,
+            "event_ticker": event_ticker,
+            "series_ticker": series_ticker,
+        },
+        sort, order, offset, limit,
+    )
+
+
+@app.get("/api/catalog/markets/{ticker}")
+async def get_market(ticker: str):
+    """Get one market by ticker"""
+    encoded = catalog.snapshot.markets.get(ticker)
+    if encoded is None:
+        raise HTTPException(status_code=404, detail="Market not found")
+    return Response(content=b'{"market":' + encoded + b"}", media_type="application/json")
+
+
+@app.get("/api/catalog/events")
+async def search_events(
+    q: Optional[str] = None,
+    category: List[str] = Query(default=[]),
+    tags: List[str] = Query(default=[]),
+    series_ticker: List[str] = Query(default=[]),
+    sort: Optional[str] = None,
+    order: str = "desc",
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=CATALOG_DEFAULT_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+):
+    """Search events by text, category, tags and series"""
+    snapshot = catalog.snapshot
+    return _page_response(
+        snapshot.events, "events", snapshot.version, q,
+        {"category": category, "tags": tags, "series_ticker": series_ticker},
+        sort, order, offset, limit,
+    )
+
+
+@app.get("/api/catalog/series")
+async def search_series(
+    q: Optional[str] = None,
+    category: List[str] = Query(default=[]),
+    tags: List[str] = Query(default=[]),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=CATALOG_DEFAULT_PAGE_SIZE, ge=1, le=CATALOG_MAX_PAGE_SIZE),
+):
+    """Search series by text, category and tags"""
+    snapshot = catalog.snapshot
+    return _page_response(
+        snapshot.series, "series", snapshot.version, q,
+        {"category": category, "tags": tags},
+        None, "desc", offset, limit,
+    )
+
+
+@app.get("/api/catalog/tags")
+async def tags_by_categories():
+    """Tags grouped by category, in the upstream tags_by_categories shape"""
+    return {"tags_by_categories": catalog.snapshot.tags_by_categories}
+
+
+@app.get("/api/events/{event_ticker}/page")
+async def event_page(
+    event_ticker: str,
+    tickers: List[str] = Query(default=[]),
+    period_interval: int = 60,
+):
+    """Event, metadata, markets, candlesticks, orderbooks and trades in one response"""
+    invalid = [ticker for ticker in [event_ticker, *tickers] if not valid_ticker(ticker)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid tickers: {invalid[:10]}")
+    if period_interval not in CANDLE_LOOKBACK:
+        raise HTTPException(
+            status_code=400,
+            detail=f"period_interval must be one of {sorted(CANDLE_LOOKBACK)}",
+        )
+    status, body = await build_event_page(event_ticker, tickers, period_interval)
+    return Response(content=body, status_code=status, media_type="application/json")
+
+
+def _json(body: bytes, status_code: int = 200) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+@app.get("/api/feed/{market}/posts")
+async def feed_posts(
+    market: str,
+    cursor: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=FEED_DEFAULT_PAGE_SIZE, ge=1, le=FEED_MAX_PAGE_SIZE),
+):
+    """Newest posts of a market; pass next_cursor back for the next page"""
+    return _json(feed.posts_page(market, cursor, limit))
+
+
+@app.post("/api/feed/{market}/posts", status_code=201)
+async def create_post(market: str, post: NewPost):
+    """Add a post to a market's feed"""
+    return await asyncio.to_thread(feed.add_post, market, post.author, post.body)
+
+
+@app.get("/api/feed/posts/{post_id}/comments")
+async def post_comments(
+    post_id: int,
+    cursor: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=FEED_DEFAULT_PAGE_SIZE, ge=1, le=FEED_MAX_PAGE_SIZE),
+):
+    """Comments of a post, oldest first; pass next_cursor back for the next page"""
+    page = feed.comments_page(post_id, cursor, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return _json(page)
+
+
+@app.post("/api/feed/posts/{post_id}/comments", status_code=201)
+async def create_comment(post_id: int, comment: NewComment):
+    """Comment on a post; batched with concurrent comments into one insert"""
+    stored = await comment_batcher.add(post_id, comment.author, comment.body)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return stored
+
+
+@app.post("/api/feed/posts/{post_id}/comments/batch", status_code=201)
+async def create_comments(post_id: int, batch: CommentBatch):
+    """Add several comments to a post in one transaction"""
+    stored = await asyncio.to_thread(
+        feed.add_comments, [(post_id, c.author, c.body) for c in batch.comments]
+    )
+    if stored[0] is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return {"comments": stored}
+
+
+# Reload the catalog when the snapshot file changes
+async def refresh_catalog():
+    """Background task that swaps in a new snapshot when the file changes"""
+    while True:
+        await asyncio.sleep(CATALOG_REFRESH_INTERVAL)
+        try:
+            if await asyncio.to_thread(catalog.refresh_if_changed, CATALOG_SNAPSHOT_PATH):
+                print(f"Reloaded catalog: {catalog.snapshot.stats()}")
+        except Exception as e:
+            print(f"Error reloading catalog: {e}")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=HOST, port=PORT)
@@ -0,0 +1,72 @@
+"""
+Data models for the prediction market catalog and social feed
+"""
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+from config import FEED_MAX_POST_LENGTH, FEED_MAX_COMMENT_LENGTH, FEED_MAX_COMMENTS_PER_REQUEST
+
+
+class Series(BaseModel):
+    """A recurring family of events (upstream /series shape)"""
+    model_config = ConfigDict(extra="allow")
+
+    ticker: str
+    title: str = ""
+    category: str = ""
+    frequency: str = ""
+    tags: List[str] = []
+
+
+class Market(BaseModel):
+    """A single tradable market (upstream /markets shape)"""
+    model_config = ConfigDict(extra="allow")
+
+    ticker: str
+    event_ticker: str = ""
+    title: str = ""
+    subtitle: str = ""
+    yes_sub_title: Optional[str] = None
+    category: str = ""
+    status: str = ""
+    close_time: Optional[str] = None
+    last_price: Optional[float] = None
+    volume: Optional[float] = None
+    volume_24h: Optional[float] = None
+    liquidity: Optional[float] = None
+
+
+class Event(BaseModel):
+    """A group of related markets (upstream /events shape)"""
+    model_config = ConfigDict(extra="allow")
+
+    event_ticker: str
+    series_ticker: str = ""
+    title: str = ""
+    sub_title: str = ""
+    category: str = ""
+    markets: List[Market] = []
+
+
+class CatalogFile(BaseModel):
+    """On-disk catalog snapshot"""
+    series: List[Series] = []
+    events: List[Event] = []
+    markets: List[Market] = []
+
+
+class NewPost(BaseModel):
+    """A post submitted to a market's feed"""
+    author: str = Field(min_length=1, max_length=128)
+    body: str = Field(min_length=1, max_length=FEED_MAX_POST_LENGTH)
+
+
+class NewComment(BaseModel):
+    """A comment on a post"""
+    author: str = Field(min_length=1, max_length=128)
+    body: str = Field(min_length=1, max_length=FEED_MAX_COMMENT_LENGTH)
+
+
+class CommentBatch(BaseModel):
+    """Several comments on one post, inserted together"""
+    comments: List[NewComment] = Field(min_length=1, max_length=FEED_MAX_COMMENTS_PER_REQUEST)
@@ -0,0 +1,407 @@
+"""
+Local market catalog: columnar snapshot storage with inverted indexes
+"""
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import CatalogFile
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Most vocabulary terms a trailing query prefix may expand to
+MAX_PREFIX_EXPANSIONS = 64
+
+# Posting lists covering more than 1/DENSE_FRACTION of a table also get a
+# boolean row mask, so common terms and facets intersect with a vector AND
+DENSE_FRACTION = 32
+
+EMPTY_ROWS = np.zeros(0, dtype=np.int32)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase search tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def parse_time(value: Optional[str]) -> float:
+    """Convert an ISO 8601 time to epoch seconds (NaN when missing)"""
+    if not value:
+        return float("nan")
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return float("nan")
+
+
+def intersect(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersect two sorted row arrays by binary searching the smaller one"""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return EMPTY_ROWS
+    positions = np.searchsorted(b, a)
+    positions[positions == len(b)] = 0
+    return a[b[positions] == a]
+
+
+def union(postings: Sequence[np.ndarray]) -> np.ndarray:
+    """Union of sorted row arrays"""
+    if not postings:
+        return EMPTY_ROWS
+    if len(postings) == 1:
+        return postings[0]
+    return np.unique(np.concatenate(postings))
+
+
+class Candidates:
+    """Rows matching one query clause, as a sorted array and/or a row mask"""
+
+    __slots__ = ("rows", "mask", "size")
+
+    def __init__(self, rows: Optional[np.ndarray] = None, mask: Optional[np.ndarray] = None):
+        self.rows = rows
+        self.mask = mask
+        self.size = len(rows) if rows is not None else int(np.count_nonzero(mask))
+
+
+class CatalogTable:
+    """
+    Columnar table for one catalog entity
+
+    Rows are numbered in default sort order (e.g. volume descending), so
+    the sorted posting lists of the inverted indexes are already result
+    ordered and a page is a slice. Each row keeps its pre-encoded JSON.
+    """
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        key_field: str,
+        text_fields: Callable[[Dict[str, Any]], Iterable[Optional[str]]],
+        facet_fields: Dict[str, Callable[[Dict[str, Any]], Iterable[str]]],
+        numeric_fields: Dict[str, Callable[[Dict[str, Any]], Optional[float]]],
+        order_by: Optional[str] = None,
+    ):
+        numeric = {
+            name: np.array(
+                [np.nan if (v := getter(r)) is None else float(v) for r in records],
+                dtype=np.float64,
+            )
+            for name, getter in numeric_fields.items()
+        }
+        if order_by:
+            # Descending by the order column, missing values last
+            order = np.argsort(-np.nan_to_num(numeric[order_by], nan=-np.inf), kind="stable")
+        else:
+            order = np.argsort(np.array([r[key_field] for r in records], dtype=object), kind="stable")
+        records = [records[i] for i in order]
+
+        self.order_by = order_by
+        self.keys: List[str] = [r[key_field] for r in records]
+        self.rows: Dict[str, int] = {key: row for row, key in enumerate(self.keys)}
+        self.encoded: List[bytes] = [json.dumps(r).encode() for r in records]
+        self.numeric = {name: column[order] for name, column in numeric.items()}
+
+        text_postings: Dict[str, List[int]] = defaultdict(list)
+        facet_postings: Dict[str, Dict[str, List[int]]] = {name: defaultdict(list) for name in facet_fields}
+        for row, record in enumerate(records):
+            tokens = set()
+            for text in text_fields(record):
+                tokens.update(tokenize(text))
+            for token in tokens:
+                text_postings[token].append(row)
+            for name, getter in facet_fields.items():
+                for value in {v.lower() for v in getter(record) if v}:
+                    facet_postings[name][value].append(row)
+
+        self.text_index = {t: np.array(rows, dtype=np.int32) for t, rows in text_postings.items()}
+        self.vocabulary = sorted(self.text_index)
+        self.facets = {
+            name: {v: np.array(rows, dtype=np.int32) for v, rows in values.items()}
+            for name, values in facet_postings.items()
+        }
+        self.text_masks = self._dense_masks(self.text_index)
+        self.facet_masks = {name: self._dense_masks(index) for name, index in self.facets.items()}
+
+    def _dense_masks(self, index: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Row masks for the posting lists that are too long to intersect by search"""
+        threshold = max(len(self.keys) // DENSE_FRACTION, 1)
+        masks = {}
+        for key, rows in index.items():
+            if len(rows) >= threshold:
+                mask = np.zeros(len(self.keys), dtype=bool)
+                mask[rows] = True
+                masks[key] = mask
+        return masks
+
+    def _candidates(self, keys: Sequence[str], index: Dict[str, np.ndarray],
+                    masks: Dict[str, np.ndarray]) -> Candidates:
+        """Union of the posting lists of `keys`"""
+        if len(keys) == 1:
+            return Candidates(index.get(keys[0], EMPTY_ROWS), masks.get(keys[0]))
+        if keys and all(key in masks for key in keys):
+            mask = masks[keys[0]].copy()
+            for key in keys[1:]:
+                mask |= masks[key]
+            return Candidates(mask=mask)
+        return Candidates(union([index[key] for key in keys if key in index]))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _text_candidates(self, query: str) -> List[Candidates]:
+        tokens = tokenize(query)
+        candidates = [self._candidates([t], self.text_index, self.text_masks) for t in tokens[:-1]]
+        if tokens:
+            # The last token also matches as a prefix (search as you type)
+            last = tokens[-1]
+            start = bisect.bisect_left(self.vocabulary, last)
+            terms = []
+            for term in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(last):
+                    break
+                terms.append(term)
+            candidates.append(self._candidates(terms, self.text_index, self.text_masks))
+        return candidates
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        filters: Optional[Dict[str, Sequence[str]]] = None,
+        sort: Optional[str] = None,
+        descending: bool = True,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[int, np.ndarray]:
+        """
+        Filtered, sorted, paginated search
+
+        Args:
+            query: Free text; all tokens must match, the last one as a prefix
+            filters: Facet name -> accepted values (OR within, AND across facets)
+            sort: Numeric column to sort by (default: table order)
+            descending: Sort direction for `sort`
+            offset: Rows to skip
+            limit: Page size
+
+        Returns:
+            (total matches, row numbers of the requested page)
+        """
+        candidates: List[Candidates] = []
+        if query:
+            candidates.extend(self._text_candidates(query))
+        for name, values in (filters or {}).items():
+            if not values:
+                continue
+            index = self.facets.get(name)
+            if index is None:
+                raise KeyError(f"Unknown filter: {name}")
+            candidates.append(self._candidates(
+                [v.lower() for v in values], index, self.facet_masks[name]
+            ))
+        rows = self._intersect(candidates)
+
+        if sort and not (sort == self.order_by and descending):
+            column = self.numeric.get(sort)
+            if column is None:
+                raise KeyError(f"Unknown sort field: {sort}")
+            values = column[rows]
+            # Missing values sort last in either direction
+            keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+            rows = rows[np.argsort(keys, kind="stable")]
+
+        return len(rows), rows[offset:offset + limit]
+
+    def _intersect(self, candidates: List[Candidates]) -> np.ndarray:
+        """Rows present in every candidate set, in table order"""
+        if not candidates:
+            return np.arange(len(self.keys), dtype=np.int32)
+        candidates.sort(key=lambda c: c.size)
+        sparse = [c.rows for c in candidates if c.mask is None]
+        dense = [c.mask for c in candidates if c.mask is not None]
+
+        if sparse:
+            # Binary search the short lists, then probe the masks per row
+            rows = sparse[0]
+            for other in sparse[1:]:
+                if len(rows) == 0:
+                    return EMPTY_ROWS
+                rows = intersect(rows, other)
+            for mask in dense:
+                rows = rows[mask[rows]]
+            return rows
+
+        mask = dense[0]
+        for other in dense[1:]:
+            mask = mask & other
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def encode(self, rows: Iterable[int]) -> bytes:
+        """Join the pre-encoded JSON of rows into a JSON array"""
+        encoded = self.encoded
+        return b"[" + b",".join([encoded[row] for row in rows]) + b"]"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Pre-encoded JSON of one row"""
+        row = self.rows.get(key)
+        return None if row is None else self.encoded[row]
+
+
+class CatalogSnapshot:
+    """Immutable, fully indexed view of one catalog file"""
+
+    def __init__(self, data: CatalogFile, version: int = 0, source: Optional[str] = None):
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+        series = [s.model_dump(exclude_none=True) for s in data.series]
+        series_by_ticker = {s["ticker"]: s for s in series}
+
+        events = []
+        markets: Dict[str, Dict[str, Any]] = {}
+        event_by_ticker: Dict[str, Dict[str, Any]] = {}
+        for model in data.events:
+            event = model.model_dump(exclude_none=True, exclude={"markets"})
+            events.append(event)
+            event_by_ticker[event["event_ticker"]] = event
+            for market in model.markets:
+                markets[market.ticker] = market.model_dump(exclude_none=True)
+        # Top-level markets take precedence over nested copies
+        for market in data.markets:
+            markets[market.ticker] = market.model_dump(exclude_none=True)
+
+        def series_of(record):
+            return series_by_ticker.get(record.get("series_ticker", ""), {})
+
+        def event_of(market):
+            return event_by_ticker.get(market.get("event_ticker", ""), {})
+
+        event_volume: Dict[str, float] = defaultdict(float)
+        for market in markets.values():
+            event_volume[market.get("event_ticker", "")] += market.get("volume") or 0.0
+
+        self.series = CatalogTable(
+            series,
+            key_field="ticker",
+            text_fields=lambda s: (s.get("title"), s.get("ticker")),
+            facet_fields={
+                "category": lambda s: [s.get("category", "")],
+                "tags": lambda s: s.get("tags", []),
+                "frequency": lambda s: [s.get("frequency", "")],
+            },
+            numeric_fields={},
+        )
+        self.events = CatalogTable(
+            events,
+            key_field="event_ticker",
+            text_fields=lambda e: (e.get("title"), e.get("sub_title"), e.get("event_ticker")),
+            facet_fields={
+                "category": lambda e: [e.get("category") or series_of(e).get("category", "")],
+                "series_ticker": lambda e: [e.get("series_ticker", "")],
+                "tags": lambda e: series_of(e).get("tags", []),
+            },
+            numeric_fields={"volume": lambda e: event_volume.get(e["event_ticker"], 0.0)},
+            order_by="volume",
+        )
+        self.markets = CatalogTable(
+            list(markets.values()),
+            key_field="ticker",
+            text_fields=lambda m: (
+                m.get("title"), m.get("subtitle"), m.get("yes_sub_title"),
+                m.get("ticker"), event_of(m).get("title"),
+            ),
+            facet_fields={
+                "category": lambda m: [
+                    m.get("category") or event_of(m).get("category")
+                    or series_of(event_of(m)).get("category", "")
+                ],
+                "status": lambda m: [m.get("status", "")],
+                "event_ticker": lambda m: [m.get("event_ticker", "")],
+                "series_ticker": lambda m: [event_of(m).get("series_ticker", "")],
+                "tags": lambda m: series_of(event_of(m)).get("tags", []),
+            },
+            numeric_fields={
+                "volume": lambda m: m.get("volume"),
+                "volume_24h": lambda m: m.get("volume_24h"),
+                "liquidity": lambda m: m.get("liquidity"),
+                "last_price": lambda m: m.get("last_price"),
+                "close_time": lambda m: parse_time(m.get("close_time")),
+            },
+            order_by="volume",
+        )
+
+        tags_by_categories: Dict[str, set] = defaultdict(set)
+        for s in series:
+            tags_by_categories[s.get("category", "")].update(s.get("tags", []))
+        self.tags_by_categories = {
+            category: sorted(tags) for category, tags in sorted(tags_by_categories.items()) if category
+        }
+
+    @classmethod
+    def empty(cls) -> "CatalogSnapshot":
+        return cls(CatalogFile())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "series": len(self.series),
+            "events": len(self.events),
+            "markets": len(self.markets),
+        }
+
+
+class CatalogStore:
+    """
+    Holder of the current catalog snapshot
+
+    Readers take `store.snapshot` once per request and use only that
+    object. A refresh builds a complete new snapshot off to the side and
+    publishes it with a single reference assignment, so readers never wait
+    and never see a half-built index.
+    """
+
+    def __init__(self):
+        self.snapshot = CatalogSnapshot.empty()
+        self._version = 0
+        self._file_signature: Optional[Tuple[float, int]] = None
+        # Serializes writers only; readers never take it
+        self._load_lock = threading.Lock()
+
+    def load_file(self, path: str) -> CatalogSnapshot:
+        """Build a snapshot from a JSON catalog file and publish it"""
+        with self._load_lock:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                data = CatalogFile.model_validate_json(f.read())
+            snapshot = CatalogSnapshot(data, version=self._version + 1, source=path)
+            self._version = snapshot.version
+            self._file_signature = (stat.st_mtime, stat.st_size)
+            self.snapshot = snapshot
+            return snapshot
+
+    def refresh_if_changed(self, path: str) -> bool:
+        """Reload the catalog file if it changed since the last load"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if (stat.st_mtime, stat.st_size) == self._file_signature:
+            return False
+        self.load_file(path)
+        return True
+
+
+# Global catalog instance
+catalog = CatalogStore()
@@ -0,0 +1,201 @@
+"""
+Market catalog tests and search latency benchmark
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from models import CatalogFile
+from storage import CatalogSnapshot, CatalogStore
+
+BENCHMARK_MARKETS = 50000
+TARGET_QUERY_MS = 1.0
+
+CATEGORIES = ["Politics", "Economics", "Sports", "Crypto", "Climate"]
+WORDS = ["fed", "rate", "cut", "election", "senate", "bitcoin", "price", "above",
+         "below", "rain", "nyc", "super", "bowl", "winner", "cpi", "inflation"]
+
+
+def make_catalog(n_markets: int, seed: int = 1) -> dict:
+    """Build a synthetic catalog in the upstream API shape"""
+    rng = random.Random(seed)
+    series = [
+        {"ticker": f"S{i}", "title": f"Series {i}", "category": CATEGORIES[i % 5],
+         "tags": [f"tag{i % 7}", f"tag{i % 11}"]}
+        for i in range(50)
+    ]
+    events = [
+        {"event_ticker": f"E{i}", "series_ticker": f"S{i % 50}",
+         "title": " ".join(rng.choices(WORDS, k=4)), "category": CATEGORIES[i % 50 % 5]}
+        for i in range(n_markets // 10)
+    ]
+    markets = [
+        {"ticker": f"M{i}", "event_ticker": f"E{i % len(events)}",
+         "title": " ".join(rng.choices(WORDS, k=6)),
+         "status": rng.choice(["open", "open", "open", "closed"]),
+         "volume": rng.randrange(0, 100000),
+         "close_time": f"2026-{rng.randint(1, 12):02d}-01T00:00:00Z"}
+        for i in range(n_markets)
+    ]
+    return {"series": series, "events": events, "markets": markets}
+
+
+def test_search_filters_and_pagination():
+    """Test text, facet and sort queries against a brute-force scan"""
+    print("1. Testing filtered search...")
+    raw = make_catalog(2000)
+    snapshot = CatalogSnapshot(CatalogFile.model_validate(raw))
+    markets = snapshot.markets
+    events = {e["event_ticker"]: e for e in raw["events"]}
+    series = {s["ticker"]: s for s in raw["series"]}
+
+    total, rows = markets.search(query="fed rate", filters={"status": ["open"]}, limit=5000)
+    # Market text includes its event title
+    words = {m["ticker"]: m["title"].split() + events[m["event_ticker"]]["title"].split()
+             for m in raw["markets"]}
+    expected = [
+        m for m in raw["markets"]
+        if m["status"] == "open" and "fed" in words[m["ticker"]]
+        and any(w.startswith("rate") for w in words[m["ticker"]])
+    ]
+    assert total == len(expected)
+    volumes = markets.numeric["volume"][rows]
+    assert list(volumes) == sorted(volumes, reverse=True)
+
+    total, _ = markets.search(filters={"tags": ["tag3"], "category": ["politics"]})
+    expected = [
+        m for m in raw["markets"]
+        if "tag3" in series[events[m["event_ticker"]]["series_ticker"]]["tags"]
+        and events[m["event_ticker"]]["category"] == "Politics"
+    ]
+    assert total == len(expected)
+
+    _, first = markets.search(sort="close_time", descending=False, limit=10)
+    _, second = markets.search(sort="close_time", descending=False, offset=10, limit=10)
+    closes = markets.numeric["close_time"]
+    assert closes[first].max() <= closes[second].min()
+
+    page = json.loads(markets.encode(first))
+    assert len(page) == 10 and "ticker" in page[0]
+    assert "politics" in [c.lower() for c in snapshot.tags_by_categories]
+    print("   ✓ Filtered search PASS")
+
+
+def test_atomic_snapshot_swap():
+    """Test that readers keep working on a consistent snapshot during reloads"""
+    print("2. Testing atomic snapshot swap...")
+    store = CatalogStore()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.json")
+        with open(path, "w") as f:
+            json.dump(make_catalog(5000, seed=1), f)
+        store.load_file(path)
+        assert not store.refresh_if_changed(path)
+
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                snapshot = store.snapshot
+                total, rows = snapshot.markets.search(filters={"status": ["open"]}, limit=50)
+                if len(rows) and max(rows) >= len(snapshot.markets):
+                    errors.append("row outside snapshot")
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for seed in range(2, 5):
+            with open(path, "w") as f:
+                json.dump(make_catalog(1000 * seed, seed=seed), f)
+            os.utime(path, (time.time() + seed, time.time() + seed))
+            assert store.refresh_if_changed(path)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    assert not errors
+    assert store.snapshot.version == 4 and len(store.snapshot.markets) == 4000
+    print("   ✓ Atomic snapshot swap PASS")
+
+
+def test_api_endpoints():
+    """Test the catalog HTTP endpoints"""
+    print("3. Testing catalog endpoints...")
+    from fastapi.testclient import TestClient
+    from main import app
+    from storage import catalog
+
+    catalog.snapshot = CatalogSnapshot(CatalogFile.model_validate(make_catalog(500)), version=7)
+    client = TestClient(app)
+    resp = client.get("/api/catalog/markets", params={"status": "open", "limit": 3})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert len(data["markets"]) == 3 and data["next_offset"] == 3 and data["snapshot"] == 7
+    assert client.get("/api/catalog/markets", params={"sort": "nope"}).status_code == 400
+    assert client.get("/api/catalog/markets/M1").json()["market"]["ticker"] == "M1"
+    assert client.get("/api/catalog/markets/NOPE").status_code == 404
+    assert "tags_by_categories" in client.get("/api/catalog/tags").json()
+    print("   ✓ Catalog endpoints PASS")
+
+
+def benchmark_search():
+    """Benchmark mean search latency over a large catalog"""
+    print(f"Benchmarking search over {BENCHMARK_MARKETS:,} markets...")
+    start = time.perf_counter()
+    snapshot = CatalogSnapshot(CatalogFile.model_validate(make_catalog(BENCHMARK_MARKETS)))
+    print(f"   snapshot build: {time.perf_counter() - start:.2f} s")
+
+    markets = snapshot.markets
+    queries = [
+        dict(query="bitcoin price above"),
+        dict(query="fed", filters={"status": ["open"], "category": ["economics"]}),
+        dict(filters={"tags": ["tag2", "tag5"], "status": ["open"]}),
+        dict(query="sen", filters={"status": ["open"]}, offset=100),
+        dict(filters={"category": ["sports"]}, sort="close_time", descending=False),
+    ]
+    results = []
+    for params in queries:
+        iterations = 200
+        start = time.perf_counter()
+        for _ in range(iterations):
+            _, rows = markets.search(limit=50, **params)
+            markets.encode(rows.tolist())
+        elapsed_ms = (time.perf_counter() - start) / iterations * 1000
+        results.append(elapsed_ms)
+        print(f"   {elapsed_ms:.3f} ms  {params}")
+
+    ok = max(results[:4]) < TARGET_QUERY_MS
+    print(f"   target: filtered searches under {TARGET_QUERY_MS} ms {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("x402 Prediction Market - Catalog Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_search_filters_and_pagination()
+        test_atomic_snapshot_swap()
+        test_api_endpoints()
+        print()
+        passed = benchmark_search()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL CATALOG TESTS PASSED ✓" if passed else "BENCHMARK BELOW TARGET ✗")
+    print("=" * 60)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
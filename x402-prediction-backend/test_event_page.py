@@ -0,0 +1,222 @@
+"""
+Event page aggregation tests against a local fake upstream
+"""
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+
+from aiohttp import web
+
+import config
+from event_page import build_event_page, market_tickers
+from upstream import upstream, part_cache
+
+# Per-route latency of the fake upstream (seconds)
+DELAYS = {"event": 0.05, "metadata": 0.04, "markets": 0.06,
+          "orderbook": 0.03, "candlesticks": 0.12, "trades": 0.05}
+TICKERS = ["EV-A", "EV-B", "EV-C"]
+
+
+class FakeUpstream:
+    """Minimal upstream API with fixed latency per route"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.fail = set()
+        self.version = 0
+        app = web.Application()
+        app.router.add_get("/events/{event}", self.route("event"))
+        app.router.add_get("/events/{event}/metadata", self.route("metadata"))
+        app.router.add_get("/markets", self.route("markets"))
+        app.router.add_get("/markets/candlesticks", self.route("candlesticks"))
+        app.router.add_get("/markets/trades", self.route("trades"))
+        app.router.add_get("/markets/{ticker}/orderbook", self.route("orderbook"))
+        self.runner = web.AppRunner(app)
+
+    def route(self, part):
+        async def handler(request):
+            self.calls[part] += 1
+            await asyncio.sleep(DELAYS[part])
+            if part in self.fail:
+                return web.json_response({"error": "boom"}, status=500)
+            event = request.match_info.get("event")
+            if part == "event" and event == "MISSING":
+                return web.json_response({"error": "not found"}, status=404)
+            body = {"part": part, "version": self.version, **request.match_info, **request.query}
+            if part == "event":
+                body["markets"] = [{"ticker": t} for t in TICKERS]
+            return web.json_response(body)
+        return handler
+
+    async def start(self) -> str:
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def run(test):
+    """Run a test coroutine with a fresh fake upstream and cache"""
+    async def wrapper():
+        fake = FakeUpstream()
+        upstream.base_url = await fake.start()
+        part_cache.clear()
+        try:
+            await test(fake)
+        finally:
+            await upstream.close()
+            await fake.stop()
+    asyncio.run(wrapper())
+
+
+async def _test_fan_out(fake):
+    start = time.perf_counter()
+    status, body = await build_event_page("EV")
+    elapsed = time.perf_counter() - start
+    page = json.loads(body)
+    assert status == 200
+    assert page["event"]["part"] == "event" and page["metadata"]["part"] == "metadata"
+    assert sorted(page["orderbooks"]) == TICKERS and page["trades"]["EV-B"]["ticker"] == "EV-B"
+    assert page["candlesticks"]["market_tickers"] == ",".join(TICKERS)
+    assert page["errors"] == {} and page["stale"] == []
+
+    # Tickers learned from the event, then the market parts in parallel
+    slowest_chain = DELAYS["event"] + DELAYS["candlesticks"]
+    serial = DELAYS["event"] + DELAYS["metadata"] + DELAYS["markets"] + DELAYS["candlesticks"] \
+        + len(TICKERS) * (DELAYS["orderbook"] + DELAYS["trades"])
+    print(f"   cold page: {elapsed * 1000:.0f} ms (slowest chain {slowest_chain * 1000:.0f} ms,"
+          f" serial {serial * 1000:.0f} ms)")
+    assert elapsed < slowest_chain + 0.08
+
+    # Known tickers skip the event dependency: latency is the slowest part
+    part_cache.clear()
+    start = time.perf_counter()
+    await build_event_page("EV", tickers=TICKERS)
+    elapsed = time.perf_counter() - start
+    print(f"   cold page with tickers: {elapsed * 1000:.0f} ms (slowest part"
+          f" {max(DELAYS.values()) * 1000:.0f} ms)")
+    assert elapsed < max(DELAYS.values()) + 0.06
+
+    start = time.perf_counter()
+    await build_event_page("EV", tickers=TICKERS)
+    elapsed = time.perf_counter() - start
+    print(f"   warm page: {elapsed * 1000:.2f} ms")
+    assert elapsed < 0.01
+
+
+def test_fan_out_latency():
+    """Test that a page costs the slowest part, not the sum"""
+    print("1. Testing concurrent fan-out...")
+    run(_test_fan_out)
+    print("   ✓ Concurrent fan-out PASS")
+
+
+async def _test_stale_while_revalidate(fake):
+    ttl = dict(config.EVENT_PAGE_TTL)
+    await build_event_page("EV", tickers=TICKERS)
+    calls = fake.calls["orderbook"]
+
+    # Expire only the orderbooks: the page is served stale and refreshed once
+    fake.version = 1
+    config.EVENT_PAGE_TTL["orderbook"] = 0
+    try:
+        status, body = await build_event_page("EV", tickers=TICKERS)
+        page = json.loads(body)
+        assert page["orderbooks"]["EV-A"]["version"] == 0
+        assert page["stale"] == [f"orderbook:{t}" for t in TICKERS]
+        assert page["metadata"]["version"] == 0 and "metadata" not in page["stale"]
+        await asyncio.sleep(DELAYS["orderbook"] + 0.05)
+        assert fake.calls["orderbook"] == calls + len(TICKERS)
+    finally:
+        config.EVENT_PAGE_TTL.update(ttl)
+
+    page = json.loads((await build_event_page("EV", tickers=TICKERS))[1])
+    assert page["orderbooks"]["EV-A"]["version"] == 1 and page["stale"] == []
+
+    # Concurrent misses share one upstream request per part
+    part_cache.clear()
+    before = fake.calls["metadata"]
+    await asyncio.gather(*[build_event_page("EV", tickers=TICKERS) for _ in range(20)])
+    assert fake.calls["metadata"] == before + 1
+
+
+def test_stale_while_revalidate():
+    """Test per-part TTLs, stale serving and request coalescing"""
+    print("2. Testing stale-while-revalidate...")
+    run(_test_stale_while_revalidate)
+    print("   ✓ Stale-while-revalidate PASS")
+
+
+async def _test_failures(fake):
+    fake.fail.add("trades")
+    page = json.loads((await build_event_page("EV", tickers=TICKERS))[1])
+    assert page["trades"]["EV-A"] is None and "trades:EV-A" in page["errors"]
+    assert page["event"]["part"] == "event"
+
+    # Errors are not cached
+    fake.fail.clear()
+    page = json.loads((await build_event_page("EV", tickers=TICKERS))[1])
+    assert page["trades"]["EV-A"]["part"] == "trades" and page["errors"] == {}
+
+    status, _ = await build_event_page("MISSING")
+    assert status == 404
+
+    import httpx
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/api/events/EV/page", params={"tickers": TICKERS})
+        assert resp.status_code == 200 and sorted(resp.json()["orderbooks"]) == TICKERS
+        resp = await client.get("/api/events/EV/page", params={"period_interval": 7})
+        assert resp.status_code == 400
+        assert (await client.get("/api/events/MISSING/page")).status_code == 404
+
+        # Tickers go into upstream paths: malformed ones are refused, repeats fetched once
+        for bad in ("EV-A/../../events", "EV-A?limit=1", "", "-EV"):
+            resp = await client.get("/api/events/EV/page", params={"tickers": ["EV-A", bad]})
+            assert resp.status_code == 400, bad
+        assert (await client.get("/api/events/EV%3Fx=1/page")).status_code == 400
+        part_cache.clear()
+        orderbooks = fake.calls["orderbook"]
+        resp = await client.get("/api/events/EV/page", params={"tickers": ["EV-B", "EV-A", "EV-B"]})
+        assert list(resp.json()["orderbooks"]) == ["EV-B", "EV-A"]
+        assert fake.calls["orderbook"] == orderbooks + 2
+    # Tickers from the catalog or the event are filtered the same way
+    assert market_tickers(["A", "A", "B/c", None, "C.1", "A"]) == ["A", "C.1"]
+
+
+def test_partial_failures():
+    """Test that a failing part degrades to null instead of failing the page"""
+    print("3. Testing partial failures and endpoint...")
+    run(_test_failures)
+    print("   ✓ Partial failures PASS")
+
+
+def main():
+    print("=" * 60)
+    print("x402 Prediction Market - Event Page Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_fan_out_latency()
+        test_stale_while_revalidate()
+        test_partial_failures()
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+
+    print()
+    print("=" * 60)
+    print("ALL EVENT PAGE TESTS PASSED ✓")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Pooled client for the upstream market API with a per-part response cache
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import aiohttp
+
+from config import (
+    UPSTREAM_API_URL, UPSTREAM_TIMEOUT, UPSTREAM_MAX_CONNECTIONS, EVENT_PAGE_CACHE_SIZE,
+)
+
+
+class UpstreamError(Exception):
+    """Upstream request failed or returned a non-2xx status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class UpstreamClient:
+    """
+    Keep-alive connection pool to the upstream API
+
+    Responses are returned as raw JSON bytes so callers can splice them
+    into their own documents without a decode/encode round trip.
+    """
+
+    def __init__(self, base_url: str = UPSTREAM_API_URL,
+                 max_connections: int = UPSTREAM_MAX_CONNECTIONS,
+                 timeout: float = UPSTREAM_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept": "application/json"},
+            )
+        return self._session
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> bytes:
+        """
+        GET a JSON resource
+
+        Raises:
+            UpstreamError: On connection errors, timeouts and non-2xx responses
+        """
+        try:
+            async with self._get_session().get(self.base_url + path, params=params) as resp:
+                body = await resp.read()
+                if resp.status >= 400:
+                    raise UpstreamError(resp.status, f"Upstream returned {resp.status} for {path}")
+                return body
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise UpstreamError(502, f"Upstream request failed for {path}: {e!r}")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class PartCache:
+    """
+    LRU cache of upstream parts with per-entry TTL and stale-while-revalidate
+
+    A fresh entry is served directly. Within `stale` seconds past its TTL
+    it is still served, and one background refresh is started. Older or
+    missing entries are fetched inline; concurrent misses for the same key
+    share one upstream request. Failures are never cached.
+    """
+
+    def __init__(self, max_entries: int = EVENT_PAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(
+        self,
+        key: Hashable,
+        ttl: float,
+        stale: float,
+        fetch: Callable[[], Awaitable[bytes]],
+    ) -> Tuple[bytes, bool]:
+        """
+        Returns:
+            (value, is_stale)
+
+        Raises:
+            UpstreamError: If the entry had to be fetched and the fetch failed
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value, False
+            if age < ttl + stale:
+                self.stale_hits += 1
+                self._refresh(key, fetch)
+                return value, True
+
+        self.misses += 1
+        # Shielded so a cancelled request doesn't abort a fetch others await
+        return await asyncio.shield(self._refresh(key, fetch)), False
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[bytes]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, fetch))
+            # Background refresh errors are dropped; the next miss retries
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+        try:
+            value = await fetch()
+        finally:
+            self._inflight.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+
+# Global upstream client and part cache
+upstream = UpstreamClient()
+part_cache = PartCache()